@@ -0,0 +1,329 @@
+"""
+Headless benchmarks for MagnetSting.
+
+Builds synthetic registries of different sizes and measures command registration, command dispatch, command
+suggestions, help banner rendering, alias loading/saving and the overhead of each file runner, without a terminal.
+Results are written as JSON so they can be compared across versions:
+
+    python3 benchmarks/bench_magnetsting.py --output before.json
+    python3 benchmarks/bench_magnetsting.py --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from magnetsting import MagnetSting  # noqa: E402
+
+
+def _single_function(additional_data: tuple = None):
+    pass
+
+
+def _args_function(command_args: list = None, additional_data: tuple = None):
+    pass
+
+
+def build_registry(size: int = None, group_count: int = 10, alias_count: int = 0, alias_file: str = None,
+                   nested_depth: int = 5) -> MagnetSting:
+    """
+    Create an instance of MagnetSting with a synthetic registry. Half of the commands are top-level commands and the
+    other half is spread over the command groups. A chain of nested command groups ("nest0 nest1 ...") is added on top,
+    with a few commands at every level.
+    :param size: The total number of commands.
+    :param group_count: The number of command groups.
+    :param alias_count: The number of aliases.
+    :param alias_file: The alias file of the instance.
+    :param nested_depth: The number of levels of nested command groups.
+    :return: The instance, with its built-in commands added and aliases loaded.
+    """
+    mast = MagnetSting(alias_file=alias_file, help_on_start=False)
+
+    for group_number in range(group_count):
+        mast.add_command_group(group_name=f"group{group_number}", group_help=f"synthetic group {group_number}")
+
+    parent_group = None
+    for level in range(nested_depth):
+        mast.add_command_group(group_name=f"nest{level}", group_help=f"nested group {level}", parent_group=parent_group)
+        parent_group = f"nest{level}" if parent_group is None else f"{parent_group} nest{level}"
+        for command_number in range(max(size // 100, 1)):
+            mast.add_command_type_args(command_name=f"deep{command_number}", command_help="synthetic nested command",
+                                       command_group=parent_group, command_function=_args_function)
+
+    for command_number in range(size // 2):
+        if command_number % 2 == 0:
+            mast.add_command_type_single(command_name=f"cmd{command_number}", command_help="synthetic single command",
+                                         command_function=_single_function)
+        else:
+            mast.add_command_type_args(command_name=f"cmd{command_number}", command_help="synthetic args command",
+                                       command_function=_args_function)
+
+    for command_number in range(size - size // 2):
+        mast.add_command_type_args(command_name=f"member{command_number}", command_help="synthetic group command",
+                                   command_group=f"group{command_number % group_count}",
+                                   command_function=_args_function)
+
+    mast._add_builtin_commands()
+
+    with open(alias_file, "w") as jw:
+        json.dump({f"alias{alias_number}": f"cmd{(alias_number * 2 + 1) % (size // 2)} fixed"
+                   for alias_number in range(alias_count)}, jw)
+    mast._load_aliases()
+
+    return mast
+
+
+def measure_registration(size: int = None, alias_file: str = None) -> dict:
+    """
+    Register single-type commands one by one, the most common way commands are added. Tracing memory slows
+    registration down, so the time and the memory taken by the registry are measured in separate runs.
+    :param size: The number of commands.
+    :param alias_file: The alias file of the instance.
+    :return: A `dict` of the total time in microseconds and the memory taken by the registry in KiB.
+    """
+    def register() -> tuple:
+        mast = MagnetSting(alias_file=alias_file, help_on_start=False)
+        start_time = time.perf_counter()
+        for command_number in range(size):
+            mast.add_command_type_single(command_name=f"cmd{command_number}", command_help="synthetic single command",
+                                         command_function=_single_function)
+        return mast, (time.perf_counter() - start_time) * 1e6
+
+    tracemalloc.start()
+    try:
+        # Keep the instance until its memory has been measured
+        mast, _ = register()
+        memory_kib = tracemalloc.get_traced_memory()[0] / 1024
+    finally:
+        tracemalloc.stop()
+
+    del mast
+    return {"total_us": register()[1], "memory_kib": memory_kib}
+
+
+def measure_manifest(size: int = None, alias_file: str = None) -> dict:
+    """
+    Register the same single-type commands as `measure_registration`, all at once from a manifest.
+    :param size: The number of commands.
+    :param alias_file: The alias file of the instance.
+    :return: A `dict` of the total time in microseconds.
+    """
+    manifest = [{"type": "single", "name": f"cmd{command_number}", "help": "synthetic single command",
+                 "function": _single_function} for command_number in range(size)]
+    mast = MagnetSting(alias_file=alias_file, help_on_start=False)
+    start_time = time.perf_counter()
+    mast.register_commands(manifest=manifest)
+    return {"total_us": (time.perf_counter() - start_time) * 1e6}
+
+
+def dispatch_lines(mast: MagnetSting = None, lines: list = None) -> object:
+    """
+    Create a function that dispatches the next of several lines each time it is called. The dispatch plans of lines
+    are cached, so the cache is cleared before every line to measure the resolution of the command, not the cache.
+    :param mast: The instance.
+    :param lines: The lines, dispatched in turn.
+    :return: The function.
+    """
+    next_line = itertools.cycle(lines).__next__
+
+    def dispatch() -> None:
+        mast._parse_cache.clear()
+        mast._execute_input(usr_input=next_line())
+
+    return dispatch
+
+
+def measure(function: object = None, repeat: int = None) -> dict:
+    """
+    Call a function repeatedly and summarize how long each call took.
+    :param function: The function to call.
+    :param repeat: The number of calls.
+    :return: A `dict` of the mean, median, minimum and maximum time per call, in microseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start_time) * 1e6)
+
+    return {
+        "mean_us": statistics.fmean(timings),
+        "median_us": statistics.median(timings),
+        "min_us": min(timings),
+        "max_us": max(timings),
+        "calls": repeat,
+    }
+
+
+def bench_registry(size: int = None, repeat: int = None, work_dir: str = None) -> dict:
+    """
+    Run the registry benchmarks for one registry size.
+    :param size: The total number of commands.
+    :param repeat: The number of calls per measurement.
+    :param work_dir: The directory for the alias file.
+    :return: A `dict` of measurement names and their results.
+    """
+    alias_file = os.path.join(work_dir, f"alias_{size}.json")
+    alias_count = max(size // 10, 1)
+
+    results = {"register_single": measure_registration(size=size, alias_file=alias_file),
+               "register_manifest": measure_manifest(size=size, alias_file=alias_file)}
+
+    start_time = time.perf_counter()
+    mast = build_registry(size=size, alias_count=alias_count, alias_file=alias_file)
+    results["build_registry"] = {"total_us": (time.perf_counter() - start_time) * 1e6}
+
+    # The index used to suggest close names is built for the first suggestion, measure it before anything else uses it
+    results["suggest_first"] = measure(lambda: mast._execute_input(usr_input="cmd1x2"), 1)
+
+    last_command = f"cmd{size // 2 - 1}"
+    # Dispatch cycles through distinct commands, spread over the registry
+    line_count = min(repeat, 100)
+    single_commands = [f"cmd{command_number}" for command_number in range(0, size // 2, 2)]
+    args_commands = [f"cmd{command_number}" for command_number in range(1, size // 2, 2)]
+    deep_group = " ".join(f"nest{level}" for level in range(5))
+    results["dispatch_single"] = measure(dispatch_lines(mast=mast, lines=[
+        single_commands[line_number * len(single_commands) // line_count] for line_number in range(line_count)
+    ]), repeat)
+    results["dispatch_args"] = measure(dispatch_lines(mast=mast, lines=[
+        f"{args_commands[line_number * len(args_commands) // line_count]} a b c" for line_number in range(line_count)
+    ]), repeat)
+    members = [line_number * (size - size // 2) // line_count for line_number in range(line_count)]
+    results["dispatch_group"] = measure(dispatch_lines(mast=mast, lines=[
+        f"group{member_number % 10} member{member_number} a b c" for member_number in members
+    ]), repeat)
+    results["dispatch_deep_group"] = measure(dispatch_lines(mast=mast, lines=[
+        f"{deep_group} deep{line_number % max(size // 100, 1)} a b c" for line_number in range(line_count)
+    ]), repeat)
+    results["dispatch_alias"] = measure(dispatch_lines(mast=mast, lines=[
+        f"alias{line_number * alias_count // line_count} extra" for line_number in range(line_count)
+    ]), repeat)
+    results["dispatch_cached"] = measure(lambda: mast._execute_input(usr_input=f"{last_command} a b c"), repeat)
+    results["suggest_prefix"] = measure(lambda: mast._execute_input(usr_input="cm"), repeat)
+    results["suggest_no_match"] = measure(lambda: mast._execute_input(usr_input="zzz"), repeat)
+    results["suggest_group_miss"] = measure(lambda: mast._execute_input(usr_input="group0 member9"), repeat)
+    results["help_prefix"] = measure(lambda: mast._execute_input(usr_input="help cmd12"), repeat)
+    results["complete_prefix"] = measure(lambda: mast._completion_candidates(text="cmd12", line_tokens=[]), repeat)
+
+    # Help banners are cached, so measure the first render separately from repeated renders
+    mast._help_cache.clear()
+    results["help_first"] = measure(lambda: mast._execute_input(usr_input="help"), 1)
+    results["help_repeat"] = measure(lambda: mast._execute_input(usr_input="help"), repeat)
+    results["help_group_repeat"] = measure(lambda: mast._execute_input(usr_input="group0"), repeat)
+
+    results["alias_save"] = measure(lambda: mast._alias_store.compact(alias_dict=mast._alias_dict),
+                                    max(repeat // 10, 1))
+    results["alias_load"] = measure(mast._load_aliases, max(repeat // 10, 1))
+    results["alias_add"] = measure(lambda: mast._execute_input(usr_input=f"alias add bench {last_command} x"), repeat)
+
+    return results
+
+
+def bench_file_runners(repeat: int = None, work_dir: str = None) -> dict:
+    """
+    Measure the overhead of running an empty file with each file runner.
+    :param repeat: The number of calls per runner.
+    :param work_dir: The directory for the file and alias file.
+    :return: A `dict` of runner names and their results.
+    """
+    command_file = os.path.join(work_dir, "empty_command.py")
+    with open(command_file, "w") as file_write:
+        file_write.write("import sys\n")
+
+    results = {}
+    for file_runner in ("subprocess", "in-process", "fork-server"):
+        mast = MagnetSting(alias_file=os.path.join(work_dir, "alias_runners.json"), file_runner=file_runner)
+        mast.add_command_type_file(command_name="empty", command_help="empty file", command_file=command_file)
+        # The first call of the fork server starts its worker, leave it out of the measurement
+        mast._execute_input(usr_input="empty")
+        results[file_runner] = measure(lambda: mast._execute_input(usr_input="empty arg"), repeat)
+        mast._fork_server.close()
+
+    return results
+
+
+def compare(results: dict = None, baseline: dict = None) -> None:
+    """
+    Print how the results compare to the results of an earlier run.
+    :param results: The results of this run.
+    :param baseline: The results of the earlier run.
+    :return: None
+    """
+    print(f"  {'Benchmark':45} {'Baseline (us)':>14} {'Current (us)':>14} {'Ratio':>8}", file=sys.stderr)
+    print(f"  {'---------':45} {'-------------':>14} {'------------':>14} {'-----':>8}", file=sys.stderr)
+    for suite_name, suite in results["benchmarks"].items():
+        for benchmark_name, result in suite.items():
+            try:
+                baseline_result = baseline["benchmarks"][suite_name][benchmark_name]
+            except KeyError:
+                continue
+
+            metric = "median_us" if "median_us" in result else "total_us"
+            if metric not in baseline_result or baseline_result[metric] == 0:
+                continue
+
+            ratio = result[metric] / baseline_result[metric]
+            print(f"  {suite_name + '/' + benchmark_name:45} {baseline_result[metric]:>14.2f} {result[metric]:>14.2f} "
+                  f"{ratio:>7.2f}x", file=sys.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Headless MagnetSting benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="registry sizes to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per measurement (default: 200)")
+    parser.add_argument("--file-repeat", type=int, default=20, help="calls per file runner (default: 20)")
+    parser.add_argument("--skip-files", action="store_true", help="skip the file runner benchmarks")
+    parser.add_argument("--output", help="write the results to this JSON file instead of stdout")
+    parser.add_argument("--compare", help="compare the results to those in this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "repeat": args.repeat,
+        },
+        "benchmarks": {},
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, "w") as devnull:
+        # Everything MagnetSting prints goes to /dev/null, progress goes to stderr
+        for size in args.sizes:
+            print(f"[*] Registry of {size} commands", file=sys.stderr)
+            with contextlib.redirect_stdout(devnull):
+                results["benchmarks"][f"registry_{size}"] = bench_registry(size=size, repeat=args.repeat,
+                                                                           work_dir=work_dir)
+
+        if args.skip_files is False:
+            print("[*] File runners", file=sys.stderr)
+            with contextlib.redirect_stdout(devnull):
+                results["benchmarks"]["file_runners"] = bench_file_runners(repeat=args.file_repeat,
+                                                                           work_dir=work_dir)
+
+    if args.output is not None:
+        with open(args.output, "w") as output_write:
+            json.dump(results, output_write, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare, "r") as compare_read:
+            compare(results=results, baseline=json.load(compare_read))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,19 @@
-from .magnetsting import MagnetSting
+__all__ = ["MagnetSting", "PipeInput"]
+
+
+def __getattr__(name: str = None) -> object:
+    # The framework is only imported once it is used, so that the thin client (magnetsting.client) starts quickly
+    if name == "MagnetSting":
+        from .magnetsting import MagnetSting
+        return MagnetSting
+
+    elif name == "PipeInput":
+        from ._pipes import PipeInput
+        return PipeInput
+
+    # The submodule itself, for code that refers to it as an attribute of the package (ex. magnetsting.magnetsting)
+    elif name == "magnetsting":
+        import importlib
+        return importlib.import_module(f"{__name__}.magnetsting")
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,185 @@
+"""
+Crash-safe storage of the aliases used by `MagnetSting`.
+"""
+import json
+import os
+import stat
+import tempfile
+
+
+class _AliasStore:
+    """
+    Stores aliases as a JSON snapshot (the alias file) plus an append-only journal next to it. Adding or removing an
+    alias appends a single line to the journal, so the cost of saving a change does not depend on the number of
+    aliases and nothing is lost if the program is killed. Once the journal has grown large enough, it is compacted
+    into the snapshot, which is replaced atomically (written to a temporary file and renamed over the alias file).
+    Loading the aliases reads the snapshot and replays the journal on top of it.
+    """
+    def __init__(self, alias_file: str = None, compact_threshold: int = 100):
+        """
+        Initialize the alias store.
+        :param alias_file: The JSON file that holds the alias snapshot. The journal is kept in the same directory, in a
+                           file with the same name followed by ".journal".
+        :param compact_threshold: The minimum number of journal entries before the journal is compacted into the
+                                  snapshot. The journal is also allowed to grow up to the number of aliases, so that
+                                  compacting stays cheap relative to the changes it absorbs.
+        :return: None
+        """
+        self.alias_file = alias_file
+        self.journal_file = f"{alias_file}.journal"
+        self.compact_threshold = compact_threshold
+        self._journal_entries = 0
+
+    def load(self) -> dict:
+        """
+        Load the aliases from the snapshot and replay the journal on top of them.
+        :return: A `dict` of alias names and the commands assigned to them.
+        """
+        try:
+            with open(self.alias_file, "r") as jr:
+                alias_dict = json.load(jr)
+
+        except FileNotFoundError:
+            alias_dict = {}
+
+        self._journal_entries = 0
+        try:
+            with open(self.journal_file, "r") as journal_read:
+                for lines in journal_read:
+                    try:
+                        entry = json.loads(lines)
+
+                    # The last line can be incomplete if the program was killed while writing it
+                    except ValueError:
+                        continue
+
+                    if "add" in entry:
+                        alias_dict[entry["add"]] = entry["command"]
+                    else:
+                        alias_dict.pop(entry["remove"], None)
+
+                    self._journal_entries += 1
+
+        except FileNotFoundError:
+            pass
+
+        return alias_dict
+
+    def _append(self, entry: dict = None, alias_dict: dict = None) -> None:
+        """
+        Append an entry to the journal and make sure it reaches the disk, compacting the journal if it is large enough.
+        :param entry: The journal entry.
+        :param alias_dict: The `dict` of all aliases, after the change.
+        :return: None
+        """
+        with open(self.journal_file, "a") as journal_write:
+            journal_write.write(json.dumps(entry) + "\n")
+            journal_write.flush()
+            os.fsync(journal_write.fileno())
+
+        self._journal_entries += 1
+
+        if self._journal_entries >= max(self.compact_threshold, len(alias_dict)):
+            self.compact(alias_dict=alias_dict)
+        else:
+            pass
+
+    def record_add(self, alias_name: str = None, command_str: str = None, alias_dict: dict = None) -> None:
+        """
+        Record that an alias was added or edited.
+        :param alias_name: The name of the alias.
+        :param command_str: The command assigned to the alias.
+        :param alias_dict: The `dict` of all aliases, after the change.
+        :return: None
+        """
+        self._append(entry={"add": alias_name, "command": command_str}, alias_dict=alias_dict)
+
+    def record_remove(self, alias_name: str = None, alias_dict: dict = None) -> None:
+        """
+        Record that an alias was removed.
+        :param alias_name: The name of the alias.
+        :param alias_dict: The `dict` of all aliases, after the change.
+        :return: None
+        """
+        self._append(entry={"remove": alias_name}, alias_dict=alias_dict)
+
+    def compact(self, alias_dict: dict = None) -> None:
+        """
+        Write all aliases to the snapshot and empty the journal. The snapshot is written to a temporary file first and
+        then renamed over the alias file, so the alias file is never left half-written. If the program is killed before
+        the journal is removed, replaying it on top of the new snapshot gives the same aliases.
+        :param alias_dict: The `dict` of all aliases.
+        :return: None
+        """
+        alias_dir = os.path.dirname(os.path.abspath(self.alias_file))
+        file_mode = self._file_mode()
+        file_descriptor, temp_file = tempfile.mkstemp(dir=alias_dir, prefix=".alias-", suffix=".tmp")
+
+        try:
+            with os.fdopen(file_descriptor, "w") as jw:
+                json.dump(alias_dict, jw)
+                jw.flush()
+                os.fsync(jw.fileno())
+            # Temporary files are only readable by their owner, keep the permissions the alias file would otherwise have
+            os.chmod(temp_file, file_mode)
+            os.replace(temp_file, self.alias_file)
+
+        except BaseException:
+            os.unlink(temp_file)
+            raise
+
+        try:
+            os.unlink(self.journal_file)
+        except FileNotFoundError:
+            pass
+
+        self._journal_entries = 0
+
+    def _file_mode(self) -> int:
+        """
+        Get the permissions the snapshot is written with: those of the alias file if it exists, otherwise those of a
+        new file (read and write for everyone, minus the umask).
+        :return: The permission bits.
+        """
+        try:
+            return stat.S_IMODE(os.stat(self.alias_file).st_mode)
+
+        except FileNotFoundError:
+            # The umask can only be read by setting it, so it is set back right away
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    def close(self, alias_dict: dict = None) -> None:
+        """
+        Compact any outstanding journal entries into the snapshot. Does nothing if there are none and the snapshot
+        already exists.
+        :param alias_dict: The `dict` of all aliases.
+        :return: None
+        """
+        if self._journal_entries > 0 or not os.path.exists(self.alias_file):
+            self.compact(alias_dict=alias_dict)
+        else:
+            pass
+
+
+class _SessionAliasStore:
+    """
+    Stand-in for `_AliasStore` used by the sessions of a daemon and by child instances. Each session (or child) starts
+    with the aliases of the daemon (or parent), but the aliases it adds or removes only last as long as the session and
+    are not written to the alias file.
+    """
+    def load(self) -> dict:
+        return {}
+
+    def record_add(self, alias_name: str = None, command_str: str = None, alias_dict: dict = None) -> None:
+        pass
+
+    def record_remove(self, alias_name: str = None, alias_dict: dict = None) -> None:
+        pass
+
+    def compact(self, alias_dict: dict = None) -> None:
+        pass
+
+    def close(self, alias_dict: dict = None) -> None:
+        pass
@@ -0,0 +1,91 @@
+"""
+Memoization of command results used by `MagnetSting` for commands created with a cache.
+"""
+import collections
+import threading
+import time
+
+
+class _ResultCache:
+    """
+    Keeps the output and exit status of the most recent calls of a command, so that calling the command again with the
+    same arguments replays the output instead of running the command. The least recently used result is evicted once
+    the cache is full, and results expire once they are older than the time to live.
+    """
+    def __init__(self, max_size: int = None, ttl: float = None):
+        """
+        Initialize the cache.
+        :param max_size: The maximum number of results kept.
+        :param ttl: The number of seconds a result is kept, or None to keep results until they are evicted.
+        :return: None
+        """
+        if type(max_size) is not int or max_size < 1:
+            raise ValueError("The cache size must be a positive integer")
+        elif ttl is not None and ttl <= 0:
+            raise ValueError("The cache time to live must be a positive number of seconds")
+        else:
+            pass
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = collections.OrderedDict()
+        # Commands can be called from several threads at once, ex. by the sessions of a daemon
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple = None) -> tuple | None:
+        """
+        Look up the result of a call.
+        :param key: The key of the call.
+        :return: A tuple of the output and the exit status, or None if there is no (unexpired) result for the call.
+        """
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None and (result[0] is None or result[0] > time.monotonic()):
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result[1], result[2]
+
+            # Expired results are removed when they are found
+            elif result is not None:
+                del self._results[key]
+                self.evictions += 1
+            else:
+                pass
+
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple = None, output: str = None, status: int = None) -> None:
+        """
+        Keep the result of a call, evicting the least recently used result if the cache is full.
+        :param key: The key of the call.
+        :param output: The output of the call.
+        :param status: The exit status of the call.
+        :return: None
+        """
+        with self._lock:
+            expires = None if self.ttl is None else time.monotonic() + self.ttl
+            self._results[key] = (expires, output, status)
+            self._results.move_to_end(key)
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+            else:
+                pass
+
+    def clear(self) -> None:
+        """
+        Remove every result and reset the counters.
+        :return: None
+        """
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
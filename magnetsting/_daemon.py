@@ -0,0 +1,138 @@
+"""
+Daemon mode used by `MagnetSting` to serve command lines to clients over a Unix domain socket.
+
+The protocol is line based. A client sends one command line per line (UTF-8) and, for every line, the daemon replies
+with any number of output messages followed by a single status message, each a JSON object on its own line:
+{"output": "<text>"} and {"status": <exit status>}. Sending a break keyword, or closing the connection, ends the
+session.
+"""
+import json
+import os
+import socket
+import socketserver
+
+from ._output import _redirect_thread_stdout
+
+
+class _FrameWriter:
+    """
+    The stream that a session's output is redirected to. Output is sent to the client as soon as a line is complete,
+    so the client sees it while the command is still running, the same way a terminal would.
+    """
+    def __init__(self, wfile: object = None, buffer_size: int = 65536):
+        """
+        Initialize the writer.
+        :param wfile: The binary stream of the client connection.
+        :param buffer_size: The size of incomplete output that is sent without waiting for the end of the line.
+        :return: None
+        """
+        self._wfile = wfile
+        self._buffer = []
+        self._buffered = 0
+        self.buffer_size = buffer_size
+
+    def write(self, data: str = None) -> int:
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if "\n" in data or self._buffered >= self.buffer_size:
+            self.flush()
+        else:
+            pass
+
+        return len(data)
+
+    def flush(self) -> None:
+        if self._buffered > 0:
+            self.send(message={"output": "".join(self._buffer)})
+            self._buffer = []
+            self._buffered = 0
+        else:
+            pass
+
+    def send(self, message: dict = None) -> None:
+        """
+        Send a message to the client.
+        :param message: The message.
+        :return: None
+        """
+        self._wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self._wfile.flush()
+
+    @staticmethod
+    def isatty() -> bool:
+        return False
+
+
+class _SessionHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one client connection. Every connection gets its own session (see `MagnetSting._session`), so clients do
+    not see each other's alias changes, while the commands themselves are shared with the daemon.
+    """
+    def handle(self) -> None:
+        session = self.server.magnetsting._session()
+
+        for lines in self.rfile:
+            usr_input = lines.decode("utf-8", errors="replace").strip()
+
+            # End the session, but not the daemon, if the client sends a break keyword
+            if usr_input.split(" ")[0] in session.break_keywords:
+                break
+
+            writer = _FrameWriter(wfile=self.wfile)
+            try:
+                with _redirect_thread_stdout(writer):
+                    try:
+                        status = session._execute_input(usr_input=usr_input)
+
+                    except Exception as exc:
+                        print(f"[!] '{usr_input}' raised {type(exc).__name__}: {exc}\n")
+                        status = 1
+
+                    writer.flush()
+
+                writer.send(message={"status": status})
+
+            # The client went away
+            except OSError:
+                break
+
+
+class _DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """
+    A Unix domain socket server that handles every client in its own thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = None, magnetsting: object = None):
+        """
+        Initialize the server. The socket is only accessible to the user running the daemon, since clients can run
+        any command. A leftover socket file of a daemon that is no longer running is replaced.
+        :param socket_path: The path of the socket.
+        :param magnetsting: The instance of MagnetSting whose commands are served.
+        :return: None
+        """
+        self.magnetsting = magnetsting
+
+        if os.path.exists(socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(socket_path)
+                except OSError:
+                    os.unlink(socket_path)
+                else:
+                    raise OSError(f"A daemon is already listening on '{socket_path}'")
+        else:
+            pass
+
+        saved_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, _SessionHandler)
+        finally:
+            os.umask(saved_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
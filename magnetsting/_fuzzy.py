@@ -0,0 +1,205 @@
+"""
+Edit-distance index used by `MagnetSting` to suggest names that are close to a mistyped name.
+"""
+import collections
+import itertools
+import operator
+
+
+def _bigrams(name: str = None) -> set:
+    """
+    Split a name into its bigrams (pairs of adjacent characters), with markers for the start and end of the name so
+    the first and last characters count as much as the others.
+    :param name: The name.
+    :return: A `set` of bigrams.
+    """
+    padded = f"\x02{name}\x03"
+    return set(map(operator.add, padded, padded[1:]))
+
+
+def _pattern_bits(pattern: str = None) -> dict:
+    """
+    Create the bit masks of a pattern used by `_levenshtein`: for every character, the positions it appears at.
+    :param pattern: The pattern.
+    :return: A `dict` of characters and their bit masks.
+    """
+    bits = {}
+    for position, char in enumerate(pattern):
+        bits[char] = bits.get(char, 0) | (1 << position)
+
+    return bits
+
+
+def _levenshtein(pattern: str = None, pattern_bits: dict = None, text: str = None, limit: int = None) -> int:
+    """
+    Calculate the Levenshtein distance between a pattern and a text with Myers' bit-parallel algorithm, which handles
+    one character of the text per step rather than one pair of characters.
+    :param pattern: The pattern.
+    :param pattern_bits: The bit masks of the pattern, see `_pattern_bits`.
+    :param text: The text.
+    :param limit: Stop early once the distance is known to be at least this large, in which case the result is only
+                  guaranteed to be at least `limit`. Can be left as None to always get the exact distance.
+    :return: The distance.
+    """
+    length = len(pattern)
+    if length == 0:
+        return len(text)
+
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive = full
+    negative = 0
+    score = length
+    remaining = len(text)
+
+    for char in text:
+        eq = pattern_bits.get(char, 0)
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        ph = negative | (~(xh | positive) & full)
+        mh = positive & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        else:
+            pass
+
+        # The distance can drop by at most one for every character of the text that is left
+        remaining -= 1
+        if limit is not None and score - remaining >= limit:
+            return score - remaining
+
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        positive = mh | (~(xv | ph) & full)
+        negative = ph & xv
+
+    return score
+
+
+class _FuzzyIndex:
+    """
+    An index of names by their bigrams and lengths. A single edit changes at most two of the bigrams of a name, so a
+    name within `n` edits of the name looked up has at least one of any `2n + 1` of its bigrams, and its length differs
+    by at most `n`. Only the names in the shortest `2n + 1` bigram lists of the right lengths are candidates, those
+    sharing the most of these bigrams are compared character by character first, and the number of names scanned and
+    compared is capped, so a lookup takes about as long with a hundred thousand names as with a thousand. Building the
+    index is what takes time (about half a second for a hundred thousand names), which is why `_PrefixTrie` only builds
+    it for the first lookup.
+
+    Removed names are kept in the index (finding them would mean going through every bigram list they are in) and are
+    skipped when looking names up, until they are added again.
+    """
+    __slots__ = ("_postings", "_lengths", "_names", "_indexed")
+
+    # The largest number of entries of the bigram lists read, and of candidates compared, per lookup
+    SCAN_LIMIT = 8192
+    VERIFY_LIMIT = 256
+
+    def __init__(self, names: object = ()):
+        """
+        Initialize the index.
+        :param names: The names to add to the index.
+        :return: None
+        """
+        # The names of each (bigram, length of the names) pair
+        self._postings = collections.defaultdict(list)
+        # The names of each length, for names that are too short to have enough bigrams to narrow them down
+        self._lengths = collections.defaultdict(list)
+        self._names = set()
+        self._indexed = set()
+        for name in names:
+            self.insert(name)
+
+    def insert(self, name: str = None) -> None:
+        """
+        Add a name to the index. Adding a name that is already in the index does nothing.
+        :param name: The name.
+        :return: None
+        """
+        self._names.add(name)
+        if name in self._indexed:
+            return
+
+        length = len(name)
+        self._indexed.add(name)
+        self._lengths[length].append(name)
+        for bigrams in _bigrams(name):
+            self._postings[bigrams, length].append(name)
+
+    def remove(self, name: str = None) -> None:
+        """
+        Remove a name from the index.
+        :param name: The name.
+        :return: None
+        """
+        self._names.discard(name)
+
+    def search(self, name: str = None, tolerance: int = None) -> list:
+        """
+        Find the names within a Levenshtein distance of a name. When there are more candidates than can be compared
+        (see `VERIFY_LIMIT`), those most likely to be close are compared and the others are left out.
+        :param name: The name to look for.
+        :param tolerance: The largest distance of the names that are returned.
+        :return: A `list` of (distance, name) tuples, in no particular order.
+        """
+        # Closest lengths first, so they are the ones compared if there are too many candidates
+        lengths = sorted(range(max(len(name) - tolerance, 0), len(name) + tolerance + 1),
+                         key=lambda length: abs(length - len(name)))
+        name_bigrams = _bigrams(name)
+
+        if len(name_bigrams) > 2 * tolerance:
+            postings = sorted(([self._postings.get((bigrams, length), ()) for length in lengths]
+                               for bigrams in name_bigrams), key=lambda lists: sum(map(len, lists)))
+            scanned = itertools.chain.from_iterable(itertools.chain.from_iterable(postings[:2 * tolerance + 1]))
+            shared = collections.Counter(itertools.islice(scanned, self.SCAN_LIMIT))
+            candidates = (candidate for candidate, _ in shared.most_common())
+
+        else:
+            candidates = itertools.chain.from_iterable(self._lengths.get(length, ()) for length in lengths)
+
+        name_bits = _pattern_bits(name)
+        matches = []
+        for candidate in itertools.islice((candidate for candidate in itertools.islice(candidates, self.SCAN_LIMIT)
+                                           if candidate in self._names), self.VERIFY_LIMIT):
+            distance = _levenshtein(pattern=name, pattern_bits=name_bits, text=candidate, limit=tolerance + 1)
+            if distance <= tolerance:
+                matches.append((distance, candidate))
+            else:
+                pass
+
+        return matches
+
+    def closest(self, name: str = None, count: int = None) -> list:
+        """
+        Find the names closest to a name, ranked by their optimal string alignment distance and then by name: the
+        Levenshtein distance, with swapping two adjacent characters also counted as a single edit (so "sacn" is one edit
+        away from "scan"). Names are considered close if they are at most one edit away, or two for names of eight or
+        more characters. The name itself is left out.
+        :param name: The name to look for.
+        :param count: The maximum number of names returned.
+        :return: A `list` of (distance, name) tuples, closest first.
+        """
+        tolerance = 1 if len(name) < 8 else 2
+        distances = {names: distance for distance, names in self.search(name, tolerance)}
+
+        # Swapped characters are two edits apart by the Levenshtein distance, so they are looked up directly rather
+        # than searching with a larger tolerance, which would turn up many more candidates. A single swap is the only
+        # way for the optimal string alignment distance of a name found by the search to be lower than its Levenshtein
+        # distance, so no other distances have to be calculated again.
+        for index in range(len(name) - 1):
+            swapped = f"{name[:index]}{name[index + 1]}{name[index]}{name[index + 2:]}"
+            if swapped in self._names:
+                distances[swapped] = 1
+            else:
+                pass
+
+        distances.pop(name, None)
+        return sorted((distance, names) for names, distance in distances.items())[:count]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
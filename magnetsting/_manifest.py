@@ -0,0 +1,91 @@
+"""
+Command manifests read by `MagnetSting.register_commands` to register many commands and command groups at once.
+"""
+import collections.abc
+import contextlib
+import gc
+import json
+import os
+
+# The keys an entry of a manifest can have
+_ENTRY_KEYS = frozenset(("type", "name", "group", "help", "function", "additional", "file", "runner", "cache_size",
+                         "cache_ttl", "timeout", "schema"))
+
+
+@contextlib.contextmanager
+def _paused_gc():
+    """
+    Pause the garbage collector while a manifest is registered. Registering creates a large number of objects (records
+    and trie nodes), which would trigger many collections, none of which can free anything since the objects are all
+    kept. The collector is left alone if it was already disabled.
+    :return: A context manager.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled is True:
+            gc.enable()
+        else:
+            pass
+
+
+def _read_manifest_file(manifest_file: str | os.PathLike = None) -> object:
+    """
+    Read a JSON or TOML manifest file. Files ending in ".toml" are read as TOML, any other file as JSON.
+    :param manifest_file: The path of the file.
+    :return: The contents of the file.
+    """
+    if os.fspath(manifest_file).endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(f"Cannot read '{manifest_file}', TOML manifests need Python 3.11 or later") from None
+
+        with open(manifest_file, "rb") as tr:
+            return tomllib.load(tr)
+
+    else:
+        with open(manifest_file, "r") as jr:
+            return json.load(jr)
+
+
+def _manifest_entries(manifest: object = None) -> list:
+    """
+    Get the entries of a manifest, one `dict` per command or command group, in the format written by
+    `MagnetSting.save_registry`. A manifest is either the path of a JSON or TOML file, a `dict` with a "commands" list
+    of entries (which is what the files hold, in TOML as an array of tables) or an iterable of entries.
+    :param manifest: The manifest.
+    :return: A `list` of the entries. Entries read from a file have their additional data turned back into a tuple,
+             since JSON and TOML store tuples as lists.
+    """
+    from_file = isinstance(manifest, (str, os.PathLike))
+    if from_file is True:
+        manifest = _read_manifest_file(manifest_file=manifest)
+    else:
+        pass
+
+    if isinstance(manifest, collections.abc.Mapping):
+        if isinstance(manifest.get("commands"), list):
+            manifest = manifest["commands"]
+        else:
+            raise ValueError("The manifest must have a \"commands\" list of entries")
+
+    elif isinstance(manifest, collections.abc.Iterable):
+        pass
+
+    else:
+        raise ValueError("The manifest must be a file path, a dict with a \"commands\" list or an iterable of entries")
+
+    entries = list(manifest)
+    if from_file is True:
+        for entry in entries:
+            if isinstance(entry, dict) and type(entry.get("additional")) is list:
+                entry["additional"] = tuple(entry["additional"])
+            else:
+                pass
+    else:
+        pass
+
+    return entries
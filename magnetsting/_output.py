@@ -0,0 +1,296 @@
+"""
+Output helpers used by `MagnetSting` to capture what command functions print and to stream what they return.
+"""
+import asyncio
+import contextlib
+import inspect
+import io
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+
+class _ThreadLocalStdout:
+    """
+    A stand-in for `sys.stdout` that sends writes to a per-thread target when one is set, and to the original
+    `sys.stdout` otherwise. Unlike `contextlib.redirect_stdout`, which swaps `sys.stdout` for every thread at once, this
+    allows several threads to capture their own output at the same time.
+    """
+    def __init__(self, default: object = None):
+        """
+        Initialize the proxy.
+        :param default: The stream written to by threads that have no target set.
+        :return: None
+        """
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self) -> object:
+        target = getattr(self._local, "target", None)
+        return self._default if target is None else target
+
+    def write(self, data: str = None) -> int:
+        return self._target().write(data)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str = None) -> object:
+        # Anything else (fileno, isatty, encoding, ...) is looked up on the current target
+        return getattr(self._target(), name)
+
+
+def _thread_stdout() -> _ThreadLocalStdout:
+    """
+    Get the thread-local stdout proxy, installing it as `sys.stdout` if it is not installed yet.
+    :return: The proxy.
+    """
+    if type(sys.stdout) is not _ThreadLocalStdout:
+        sys.stdout = _ThreadLocalStdout(default=sys.stdout)
+    else:
+        pass
+
+    return sys.stdout
+
+
+def _stdout_redirected() -> bool:
+    """
+    Check if what the current thread prints is sent to a target stream by `_redirect_thread_stdout`.
+    :return: `True` if it is, `False` if it goes to the original `sys.stdout`.
+    """
+    return type(sys.stdout) is _ThreadLocalStdout and getattr(sys.stdout._local, "target", None) is not None
+
+
+def _thread_stdout_target() -> object | None:
+    """
+    Get the stream that what the current thread prints is sent to by `_redirect_thread_stdout`.
+    :return: The target stream, or None if it goes to the original `sys.stdout`.
+    """
+    return sys.stdout._local.target if _stdout_redirected() else None
+
+
+@contextlib.contextmanager
+def _redirect_thread_stdout(target: object = None):
+    """
+    Context manager that sends everything printed by the current thread to a target stream. Other threads are not
+    affected.
+    :param target: The stream to write to.
+    :return: A context manager yielding the target stream.
+    """
+    proxy = _thread_stdout()
+    previous = getattr(proxy._local, "target", None)
+    proxy._local.target = target
+
+    try:
+        yield target
+
+    finally:
+        proxy._local.target = previous
+
+
+class _TeeWriter:
+    """
+    A stream that writes to another stream while keeping a copy of everything written to it.
+    """
+    def __init__(self, stream: object = None):
+        self._stream = stream
+        self.copy = io.StringIO()
+
+    def write(self, data: str = None) -> int:
+        self.copy.write(data)
+        return self._stream.write(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    @staticmethod
+    def isatty() -> bool:
+        # Output that is being copied is never shown through a pager, so the copy holds all of it
+        return False
+
+
+@contextlib.contextmanager
+def _tee_thread_stdout():
+    """
+    Context manager that keeps a copy of everything printed by the current thread, while still printing it.
+    :return: A context manager yielding the `io.StringIO` holding the copy.
+    """
+    tee = _TeeWriter(stream=_thread_stdout()._target())
+    with _redirect_thread_stdout(tee):
+        yield tee.copy
+
+
+def _call_captured(function: object = None, function_kwargs: dict = None) -> str:
+    """
+    Call a command function and capture what it prints. Coroutine functions are run to completion. Used by the worker
+    threads and processes of the "parallel" built-in command, which is why it lives at module level (so it can be
+    pickled).
+    :param function: The function to call.
+    :param function_kwargs: The keyword arguments passed to the function.
+    :return: The captured output.
+    """
+    with _redirect_thread_stdout(io.StringIO()) as captured:
+        result = function(**function_kwargs)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+        else:
+            pass
+
+        # Lines returned (or yielded) by the function are captured as if they were printed
+        if hasattr(result, "__next__"):
+            for line in result:
+                captured.write(_format_line(line))
+        else:
+            pass
+
+    return captured.getvalue()
+
+
+def _format_line(line: object = None) -> str:
+    """
+    Turn an item returned (or yielded) by a command function into a line of output.
+    :param line: The item.
+    :return: The item as a string, ending in a line break.
+    """
+    if type(line) is str and line.endswith("\n"):
+        return line
+    else:
+        return f"{line}\n"
+
+
+def _write_chunks(lines: object = None, stream: object = None, chunk_size: int = 256,
+                  flush_interval: float = 0.05) -> None:
+    """
+    Write lines to a stream in chunks, so that writing many short lines does not cost one write (and flush) per line.
+    A chunk is written once it holds `chunk_size` lines, once `flush_interval` seconds have passed since the last write,
+    or right away if the last line took longer than `flush_interval` to produce, so slow output is not held back.
+    :param lines: The iterable of lines.
+    :param stream: The stream to write to.
+    :param chunk_size: The maximum number of lines written at once.
+    :param flush_interval: The maximum time in seconds between writes, as long as lines keep coming.
+    :return: None
+    """
+    chunk = []
+    last_write = time.monotonic()
+    pull_start = last_write
+
+    for line in lines:
+        now = time.monotonic()
+        chunk.append(_format_line(line))
+        if len(chunk) >= chunk_size or now - last_write >= flush_interval or now - pull_start >= flush_interval:
+            stream.write("".join(chunk))
+            stream.flush()
+            chunk = []
+            last_write = time.monotonic()
+        else:
+            pass
+
+        pull_start = time.monotonic()
+
+    if len(chunk) > 0:
+        stream.write("".join(chunk))
+        stream.flush()
+    else:
+        pass
+
+
+def _page_builtin(lines: object = None) -> None:
+    """
+    Show lines one screen at a time, asking whether to continue after each screen. Lines are only pulled from the
+    iterable as they are shown.
+    :param lines: The iterable of lines.
+    :return: None
+    """
+    page_size = max(shutil.get_terminal_size().lines - 1, 1)
+    shown = 0
+
+    for line in lines:
+        if shown == page_size:
+            sys.stdout.flush()
+            answer = input("-- More -- (Enter for the next page, q to quit) ")
+            # Remove the prompt so it does not end up between the lines
+            sys.stdout.write("\033[1A\033[2K")
+            if answer.strip().lower().startswith("q"):
+                return
+            else:
+                shown = 0
+
+        sys.stdout.write(_format_line(line))
+        shown += 1
+
+    sys.stdout.flush()
+
+
+def _page_command(lines: object = None, pager: str = None) -> None:
+    """
+    Show lines in an external pager such as "less". Lines are written to the pager while they are produced, so the
+    pager shows the first lines right away, and no more lines are pulled from the iterable once the pager exits.
+    :param lines: The iterable of lines.
+    :param pager: The pager command, which can include arguments (ex. "less -R").
+    :return: None
+    """
+    sys.stdout.flush()
+    process = subprocess.Popen(shlex.split(pager), stdin=subprocess.PIPE, text=True)
+
+    try:
+        _write_chunks(lines=lines, stream=process.stdin)
+
+    # The pager was closed before all lines were written
+    except BrokenPipeError:
+        pass
+
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        # Leave the pager open until it is closed, Ctrl-C is handled by the pager itself
+        while True:
+            try:
+                process.wait()
+                break
+            except KeyboardInterrupt:
+                continue
+
+
+def _stream_lines(lines: object = None, pager: str | None = None) -> int:
+    """
+    Stream the lines returned (or yielded) by a command function to stdout or to a pager. Lines are only pulled from
+    the iterable as they are written, and the iterable is closed as soon as the user presses Ctrl-C or quits the
+    pager, so generators stop producing output that would not be shown.
+    :param lines: The iterator of lines.
+    :param pager: The pager command (ex. "less -R"), an empty string for the built-in pager or None to write straight
+                  to stdout.
+    :return: The exit status, 0 if every line was shown or the pager was quit and 130 if Ctrl-C was pressed.
+    """
+    try:
+        if pager is None:
+            _write_chunks(lines=lines, stream=sys.stdout)
+
+        elif pager == "":
+            _page_builtin(lines=lines)
+
+        else:
+            try:
+                _page_command(lines=lines, pager=pager)
+
+            # Fall back to the built-in pager if the pager cannot be started
+            except (OSError, ValueError) as exc:
+                print(f"[!] Could not start pager '{pager}': {exc}")
+                _page_builtin(lines=lines)
+
+    except (KeyboardInterrupt, EOFError):
+        print("\n[*] Output stopped\n")
+        return 130
+
+    finally:
+        if hasattr(lines, "close"):
+            lines.close()
+        else:
+            pass
+
+    return 0
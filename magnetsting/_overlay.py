@@ -0,0 +1,97 @@
+"""
+Copy-on-write mappings used by child instances of `MagnetSting` (see `MagnetSting.create_child`) to share the commands,
+command groups and aliases of their parent.
+"""
+import collections
+
+
+class _Overlay(collections.ChainMap):
+    """
+    A layer over a parent mapping. Reads fall through to the parent, so nothing is copied and changes made to the
+    parent show up right away, while writes only go to the overlay's own layer. Deleting a key that comes from the
+    parent hides it from the overlay instead of deleting it from the parent.
+    """
+    # Marks the keys of the parent that were deleted from the overlay
+    _HIDDEN = object()
+
+    def __init__(self, parent: object = None):
+        """
+        Initialize the overlay.
+        :param parent: The mapping that the overlay is layered over.
+        :return: None
+        """
+        super().__init__({}, parent)
+
+    def __getitem__(self, key: object) -> object:
+        own = self.maps[0]
+        if key in own:
+            if own[key] is self._HIDDEN:
+                raise KeyError(key)
+
+            return own[key]
+
+        return self.maps[1][key]
+
+    def __contains__(self, key: object) -> bool:
+        own = self.maps[0]
+        if key in own:
+            return own[key] is not self._HIDDEN
+
+        return key in self.maps[1]
+
+    def get(self, key: object, default: object = None) -> object:
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        # The keys of the parent come first, in the parent's order, followed by the keys only the overlay has
+        own = self.maps[0]
+        for key in self.maps[1]:
+            if own.get(key) is not self._HIDDEN:
+                yield key
+
+        for key, value in own.items():
+            if value is not self._HIDDEN and key not in self.maps[1]:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return any(True for _ in self)
+
+    def __delitem__(self, key: object) -> None:
+        if key not in self:
+            raise KeyError(key)
+
+        elif key in self.maps[1]:
+            self.maps[0][key] = self._HIDDEN
+
+        else:
+            del self.maps[0][key]
+
+    def pop(self, key: object, *default: object) -> object:
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+
+        elif len(default) > 0:
+            return default[0]
+
+        else:
+            raise KeyError(key)
+
+    def popitem(self) -> tuple:
+        for key in self:
+            return key, self.pop(key)
+
+        raise KeyError("popitem(): overlay is empty")
+
+    def clear(self) -> None:
+        for key in list(self):
+            del self[key]
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    __copy__ = copy
@@ -0,0 +1,238 @@
+"""
+Pipelines used by `MagnetSting` to feed the output of one command into the next ("command1 args | command2 args").
+"""
+import asyncio
+import inspect
+import queue
+import threading
+
+from ._output import _redirect_thread_stdout
+
+
+def _split_pipeline(line: str = None) -> list:
+    """
+    Split a line of input at every pipe character that is not quoted or escaped, following the same quoting rules as
+    `shlex.split`.
+    :param line: The line of input.
+    :return: A `list` of the parts of the line, which is the line itself if it has no pipe characters.
+    """
+    segments = []
+    start = 0
+    quote = None
+    escaped = False
+
+    for index, char in enumerate(line):
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'":
+            escaped = True
+        elif quote is not None:
+            if char == quote:
+                quote = None
+            else:
+                pass
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "|":
+            segments.append(line[start:index])
+            start = index + 1
+        else:
+            pass
+
+    segments.append(line[start:])
+    return segments
+
+
+class PipeInput(list):
+    """
+    The `command_args` passed to an args-type command that receives the output of another command. The list itself
+    holds the arguments typed after the command name, as usual. Iterating over it yields those arguments followed by
+    the items of the upstream command, which are produced while they are read, so nothing is held in memory in
+    between. The upstream items alone can be iterated over through the `stream` attribute. Either way, the upstream
+    items can only be read once.
+    """
+    def __init__(self, command_args: list = None, stream: object = None):
+        """
+        Initialize the piped arguments.
+        :param command_args: The arguments typed after the command name.
+        :param stream: The iterable of items produced by the upstream command.
+        :return: None
+        """
+        super().__init__(command_args)
+        self.stream = stream
+
+    def __iter__(self):
+        yield from super().__iter__()
+        yield from self.stream
+
+
+class _LineWriter:
+    """
+    A write-only stream that passes each complete line written to it (without the line break) to a callback. Used to
+    turn what a command function prints into items of a pipeline.
+    """
+    def __init__(self, put: object = None):
+        self._put = put
+        self._partial = ""
+
+    def write(self, data: str = None) -> int:
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._put(line)
+
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        """
+        Pass on the last line if it did not end with a line break.
+        :return: None
+        """
+        if self._partial != "":
+            self._put(self._partial)
+            self._partial = ""
+        else:
+            pass
+
+
+class _PipeStage:
+    """
+    Runs a command function in a thread and makes its output available as an iterable. The items of an iterable
+    returned (or yielded) by the function are passed on as they are, while everything the function prints is passed on
+    line by line. Items are handed over in chunks through a bounded queue, so the function is paused whenever the next
+    command falls behind. A chunk is handed over once it is full or as soon as the next command is waiting for items,
+    which keeps the overhead per item low without holding back the output of slow functions. Once the stage is closed,
+    the function gets a `BrokenPipeError` the next time it writes, which is how a function finds out that nothing reads
+    its output anymore.
+    """
+    _END = object()
+
+    def __init__(self, function: object = None, function_kwargs: dict = None, chunk_size: int = 256,
+                 max_chunks: int = 16):
+        """
+        Initialize the stage and start its thread.
+        :param function: The command function.
+        :param function_kwargs: The keyword arguments passed to the function.
+        :param chunk_size: The maximum number of items handed over at once.
+        :param max_chunks: The number of chunks that can be waiting to be read before the function is paused.
+        :return: None
+        """
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._chunk = []
+        self._closed = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._produce, args=(function, function_kwargs), daemon=True)
+        self._thread.start()
+
+    def _put(self, item: object = None) -> None:
+        """
+        Add an item to the current chunk, handing the chunk over if it is full or the next command is waiting.
+        :param item: The item.
+        :return: None
+        """
+        self._chunk.append(item)
+        if len(self._chunk) >= self.chunk_size or self._queue.empty():
+            self._flush()
+        else:
+            pass
+
+    def _flush(self) -> None:
+        """
+        Hand the current chunk over to the next command, waiting while the queue is full.
+        :return: None
+        """
+        chunk = self._chunk
+        self._chunk = []
+        while True:
+            if self._closed.is_set():
+                raise BrokenPipeError("the next command in the pipeline stopped reading")
+
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+
+            except queue.Full:
+                continue
+
+    def _produce(self, function: object = None, function_kwargs: dict = None) -> None:
+        """
+        Call the function and pass on its output. Runs in the stage's thread.
+        :param function: The command function.
+        :param function_kwargs: The keyword arguments passed to the function.
+        :return: None
+        """
+        writer = _LineWriter(put=self._put)
+
+        try:
+            with _redirect_thread_stdout(writer):
+                result = function(**function_kwargs)
+                if inspect.iscoroutine(result):
+                    result = asyncio.run(result)
+                else:
+                    pass
+
+                # Strings are passed on whole rather than character by character
+                if result is None:
+                    pass
+
+                elif isinstance(result, (str, bytes)) or not hasattr(result, "__iter__"):
+                    self._put(result)
+
+                else:
+                    try:
+                        for items in result:
+                            self._put(items)
+                    finally:
+                        if hasattr(result, "close"):
+                            result.close()
+                        else:
+                            pass
+
+                writer.close()
+
+        except BrokenPipeError as exc:
+            # Only report the error if it was not caused by closing the stage
+            if self._closed.is_set():
+                pass
+            else:
+                self._error = exc
+
+        except BaseException as exc:
+            self._error = exc
+
+        finally:
+            try:
+                self._chunk.append(self._END)
+                self._flush()
+            except BrokenPipeError:
+                pass
+
+    def __iter__(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk[-1] is self._END:
+                yield from chunk[:-1]
+
+                # Re-raise anything the function raised in the command that reads its output
+                if self._error is not None:
+                    raise self._error
+                else:
+                    return
+
+            yield from chunk
+
+    def close(self) -> None:
+        """
+        Stop passing on the function's output, which makes the function stop at the next item it writes.
+        :return: None
+        """
+        self._closed.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
@@ -0,0 +1,97 @@
+"""
+Command records used by `MagnetSting` to hold the information of commands and command groups.
+"""
+import collections.abc
+import enum
+
+
+class _CommandType(str, enum.Enum):
+    """
+    The type of a command. There is only one member per type, so types can be compared by identity. Members are also
+    strings, so they compare equal to and print as the name of the type (ex. `_CommandType.SINGLE == "single"`).
+    """
+    SINGLE = "single"
+    ARGS = "args"
+    FILE = "file"
+    GROUP = "group"
+    BUILT_IN = "built-in"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# Looking a member up on the enum class goes through the enum's metaclass, which is several times slower than reading a
+# global, so dispatch compares types against these instead
+_SINGLE = _CommandType.SINGLE
+_ARGS = _CommandType.ARGS
+_FILE = _CommandType.FILE
+_GROUP = _CommandType.GROUP
+_BUILT_IN = _CommandType.BUILT_IN
+# The types of the commands that call a function
+_FUNCTION_TYPES = (_SINGLE, _ARGS)
+
+
+class _CommandRecord(collections.abc.Mapping):
+    """
+    The information of a command or command group. Records only have room for their fields, rather than the hash table
+    that a `dict` needs, and the fields are read as attributes, which is cheaper than looking up string keys. For code
+    that still reads the information by key (ex. `command_info["type"]`), a record is also a read-only mapping of the
+    keys that apply to its type of command.
+    """
+    __slots__ = ("type", "name", "help", "function", "additional", "import_path", "file", "runner", "cache", "timeout",
+                 "schema", "help_width")
+
+    # The keys of the mapping, by type of command
+    _KEYS = {
+        _SINGLE: ("type", "function", "help", "additional", "import_path", "cache", "timeout", "name"),
+        _ARGS: ("type", "function", "help", "additional", "import_path", "cache", "timeout", "schema", "name"),
+        _FILE: ("type", "file", "help", "runner", "cache", "timeout", "name"),
+        _GROUP: ("type", "help", "name"),
+        _BUILT_IN: ("type", "help", "name"),
+    }
+
+    def __init__(self, command_type: _CommandType = None, command_help: str = None, function: object = None,
+                 additional: tuple = None, import_path: str = None, file: str = None, runner: str = None,
+                 cache: object = None, timeout: float = None, schema: object = None):
+        """
+        Initialize the record. Its full name is set once the command is added, see `MagnetSting._add_command`.
+        :param command_type: The type of the command.
+        :param command_help: The description of the command.
+        :param function: The function of a `single-` or `args-type` command, or its import path.
+        :param additional: The additional data passed to the function.
+        :param import_path: The import path of the function, if it was registered by import path.
+        :param file: The file of a `file-type` command.
+        :param runner: The file runner of a `file-type` command, or None to use the instance's file runner.
+        :param cache: The result cache of the command, or None if it is not cached.
+        :param timeout: The timeout of the command in seconds, or None to use the instance's timeout.
+        :param schema: The compiled argument schema of an `args-type` command, or None if it has no schema.
+        :return: None
+        """
+        self.type = command_type
+        self.name = None
+        self.help = command_help
+        self.function = function
+        self.additional = additional
+        self.import_path = import_path
+        self.file = file
+        self.runner = runner
+        self.cache = cache
+        self.timeout = timeout
+        self.schema = schema
+        # The width of the description in the help banners
+        self.help_width = 0 if command_help is None else len(command_help)
+
+    def __getitem__(self, key: str) -> object:
+        if key in self._KEYS[self.type]:
+            return getattr(self, key)
+
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS[self.type])
+
+    def __len__(self) -> int:
+        return len(self._KEYS[self.type])
+
+    def __repr__(self) -> str:
+        return f"_CommandRecord({dict(self)!r})"
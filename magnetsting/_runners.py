@@ -0,0 +1,304 @@
+"""
+Execution strategies used by `MagnetSting` to run the Python files assigned to file-type commands.
+"""
+import importlib
+import json
+import os
+import runpy
+import signal
+import subprocess
+import sys
+import threading
+import traceback
+
+from ._watchdog import _ProcessWatchdog, _TIMED_OUT
+
+# Files run in-process share `sys.argv` and `sys.path`, so only one of them runs at a time (ex. when several daemon
+# sessions or background jobs run file-type commands at once)
+_IN_PROCESS_LOCK = threading.Lock()
+
+
+def _run_file_subprocess(command_file: str = None, file_args: list = None, capture: bool = False,
+                         timeout: float = None) -> int:
+    """
+    Run a file in a new Python interpreter, the same one (and so the same virtual environment) as the one running
+    MagnetSting. The argument list is passed to the interpreter as is, without going through a shell.
+    :param command_file: The path of the file.
+    :param file_args: The `list` of arguments passed to the file.
+    :param capture: Copy the output of the file to `sys.stdout` line by line, rather than letting the file write to
+                    the terminal directly. Used when `sys.stdout` is redirected, ex. in daemon sessions.
+    :param timeout: The number of seconds after which the interpreter is terminated (and killed if it does not exit),
+                    or None for no timeout.
+    :return: The exit status of the file, or `_TIMED_OUT` if it timed out.
+    """
+    if capture is False and timeout is None:
+        return subprocess.run([sys.executable, command_file, *file_args]).returncode
+
+    elif capture is False:
+        popen_kwargs = {}
+
+    else:
+        popen_kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.PIPE, "stderr": subprocess.STDOUT,
+                        "text": True}
+
+    with subprocess.Popen([sys.executable, command_file, *file_args], **popen_kwargs) as process, \
+            _ProcessWatchdog(timeout=timeout, terminate=process.terminate, kill=process.kill) as watchdog:
+        try:
+            if capture is True:
+                for lines in process.stdout:
+                    sys.stdout.write(lines)
+            else:
+                pass
+
+            process.wait()
+
+        # Like subprocess.run, do not leave the interpreter running if waiting for it is interrupted (ex. by Ctrl-C)
+        except BaseException:
+            process.kill()
+            raise
+
+    return _TIMED_OUT if watchdog.expired is True else process.returncode
+
+
+def _run_file_in_process(command_file: str = None, file_args: list = None) -> int:
+    """
+    Run a file in the current interpreter using `runpy`, as if it was executed with "python <file> <args>". `sys.argv`
+    and `sys.path` are swapped for the duration of the run, `SystemExit` is turned into an exit status and any other
+    exception is printed rather than raised, so a failing file cannot bring down the caller. Since `sys.argv` and
+    `sys.path` are shared by every thread, files run from several threads at once wait for each other.
+    :param command_file: The path of the file.
+    :param file_args: The `list` of arguments passed to the file.
+    :return: The exit status of the file.
+    """
+    with _IN_PROCESS_LOCK:
+        return _run_path(command_file=command_file, file_args=file_args)
+
+
+def _run_path(command_file: str = None, file_args: list = None) -> int:
+    """
+    Run a file with `runpy` for `_run_file_in_process`, which holds the lock that keeps other files from running at
+    the same time.
+    :param command_file: The path of the file.
+    :param file_args: The `list` of arguments passed to the file.
+    :return: The exit status of the file.
+    """
+    saved_argv = sys.argv
+    saved_path = sys.path[:]
+    sys.argv = [command_file, *file_args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(command_file)))
+
+    try:
+        runpy.run_path(command_file, run_name="__main__")
+
+    except SystemExit as exc:
+        # Mirror how the interpreter turns the SystemExit code into an exit status
+        if exc.code is None:
+            return 0
+        elif type(exc.code) is int:
+            return exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            return 1
+
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+    else:
+        return 0
+
+    finally:
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+
+
+class _ForkServer:
+    """
+    A pre-warmed worker process that runs files for file-type commands. The worker is forked from the interpreter
+    that runs `MagnetSting` (so everything it has imported is already loaded) and can import additional modules up
+    front. For every file, the worker forks again and runs the file in the fresh copy, which skips the start-up and
+    import cost of a new interpreter while keeping each run isolated in its own process. The worker handles one file
+    at a time, so runs from several threads (ex. background jobs) wait for each other.
+    """
+    def __init__(self, preload_modules: tuple = ()):
+        """
+        Initialize the fork server. The worker process is only started when the first file is run.
+        :param preload_modules: Names of modules the worker imports before accepting any files.
+        :return: None
+        """
+        self.preload_modules = preload_modules
+        self._pid = None
+        self._requests = None
+        self._responses = None
+        # Held while the worker is started and for a whole request, so each run reads its own process ID and status
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        """
+        Fork the worker process.
+        :return: None
+        """
+        request_read, request_write = os.pipe()
+        response_read, response_write = os.pipe()
+        pid = os.fork()
+
+        # === Worker process ===
+        if pid == 0:
+            os.close(request_write)
+            os.close(response_read)
+            # Ctrl-C is meant for the file that is running, not for the worker
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            for modules in self.preload_modules:
+                try:
+                    importlib.import_module(modules)
+                except ImportError:
+                    pass
+            self._serve(request_read, response_write)
+            os._exit(0)
+
+        # === Parent process ===
+        os.close(request_read)
+        os.close(response_write)
+        self._pid = pid
+        self._requests = os.fdopen(request_write, "w")
+        self._responses = os.fdopen(response_read, "r")
+
+    @staticmethod
+    def _serve(request_read: int = None, response_write: int = None) -> None:
+        """
+        Worker loop: read one JSON request per line, fork a child that runs the file and write back the child's process
+        ID (so the parent can stop it) and then its exit status, one per line. The loop ends once the parent closes its
+        end of the request pipe.
+        :param request_read: The file descriptor requests are read from.
+        :param response_write: The file descriptor exit statuses are written to.
+        :return: None
+        """
+        with os.fdopen(request_read, "r") as requests, os.fdopen(response_write, "w") as responses:
+            for line in requests:
+                request = json.loads(line)
+                pid = os.fork()
+
+                if pid == 0:
+                    # Make sure the child never returns into the worker loop, whatever happens in the file
+                    status = 1
+                    try:
+                        signal.signal(signal.SIGINT, signal.default_int_handler)
+                        os.chdir(request["cwd"])
+                        # The child is the only thread of its process, so it does not need the in-process lock (which
+                        # may have been copied in a locked state when the worker was forked)
+                        status = _run_path(command_file=request["file"], file_args=request["args"])
+                    except KeyboardInterrupt:
+                        status = 130
+                    finally:
+                        sys.stdout.flush()
+                        sys.stderr.flush()
+                        os._exit(status & 0xff)
+
+                responses.write(f"{pid}\n")
+                responses.flush()
+                _, wait_status = os.waitpid(pid, 0)
+                responses.write(f"{os.waitstatus_to_exitcode(wait_status)}\n")
+                responses.flush()
+
+    def run(self, command_file: str = None, file_args: list = None, timeout: float = None) -> int:
+        """
+        Run a file in a process forked from the worker, starting the worker first if needed.
+        :param command_file: The path of the file.
+        :param file_args: The `list` of arguments passed to the file.
+        :param timeout: The number of seconds after which the process is terminated (and killed if it does not exit),
+                        or None for no timeout.
+        :return: The exit status of the file, or `_TIMED_OUT` if it timed out.
+        """
+        # Flush any pending output so it is not duplicated or reordered with the output of the file
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        with self._lock:
+            return self._request(command_file=command_file, file_args=file_args, timeout=timeout)
+
+    def _request(self, command_file: str = None, file_args: list = None, timeout: float = None) -> int:
+        """
+        Send a file to the worker and wait for its exit status, for `run`, which holds the lock.
+        :param command_file: The path of the file.
+        :param file_args: The `list` of arguments passed to the file.
+        :param timeout: The number of seconds after which the process is terminated, or None for no timeout.
+        :return: The exit status of the file, or `_TIMED_OUT` if it timed out.
+        """
+        if self._pid is None:
+            self._start()
+        else:
+            pass
+
+        pid = None
+        try:
+            self._requests.write(json.dumps({"file": command_file, "args": file_args, "cwd": os.getcwd()}) + "\n")
+            self._requests.flush()
+            response = self._responses.readline()
+
+            if response != "":
+                pid = int(response)
+                with _ProcessWatchdog(timeout=timeout, terminate=lambda: self._signal(pid, signal.SIGTERM),
+                                      kill=lambda: self._signal(pid, signal.SIGKILL)) as watchdog:
+                    response = self._responses.readline()
+            else:
+                pass
+
+        except BrokenPipeError:
+            response = ""
+
+        except KeyboardInterrupt:
+            # Ctrl-C also reached the file, wait for its exit status so the next response belongs to the next request
+            if pid is None:
+                self._responses.readline()
+            else:
+                pass
+
+            self._responses.readline()
+            raise
+
+        # The worker died, start a new one on the next run
+        if response == "":
+            self._stop()
+            return 1
+
+        return _TIMED_OUT if watchdog.expired is True else int(response)
+
+    @staticmethod
+    def _signal(pid: int = None, signal_number: int = None) -> None:
+        """
+        Send a signal to a process forked from the worker, unless it has exited already.
+        :param pid: The process ID.
+        :param signal_number: The signal.
+        :return: None
+        """
+        try:
+            os.kill(pid, signal_number)
+        except ProcessLookupError:
+            pass
+
+    def close(self) -> None:
+        """
+        Stop the worker process, waiting for the file it is running (if any) to finish.
+        :return: None
+        """
+        with self._lock:
+            self._stop()
+
+    def _stop(self) -> None:
+        """
+        Stop the worker process, for `close` and `run`, which hold the lock.
+        :return: None
+        """
+        if self._pid is None:
+            return
+
+        for pipes in (self._requests, self._responses):
+            try:
+                pipes.close()
+            except OSError:
+                pass
+
+        os.waitpid(self._pid, 0)
+        self._pid = None
+        self._requests = None
+        self._responses = None
@@ -0,0 +1,490 @@
+"""
+Argument schemas used by `MagnetSting` to check and convert the arguments of args-type commands.
+"""
+import itertools
+import json
+
+# The keys an argument of a schema can have
+_ARGUMENT_KEYS = ("name", "short", "type", "default", "choices", "many", "help")
+# How the types of arguments are described in messages and usage lines
+_TYPE_NAMES = {str: "text", int: "integer", float: "number", bool: "flag"}
+# The types that can also be given by name, ex. in schemas loaded from JSON
+_TYPES_BY_NAME = {"str": str, "int": int, "float": float, "bool": bool}
+
+
+class _Argument:
+    """
+    A compiled argument of a schema.
+    """
+    __slots__ = ("name", "short", "dest", "convert", "type_name", "choices", "default", "required", "flag", "many",
+                 "help")
+
+    def __init__(self, spec: dict = None):
+        """
+        Compile an argument from its spec, see `_ArgSchema`.
+        :param spec: The spec of the argument.
+        :return: None
+        """
+        if type(spec) is not dict or type(spec.get("name")) is not str or spec["name"].strip("-") == "":
+            raise ValueError(f"Argument {spec!r} must be a dict with a 'name'")
+        else:
+            pass
+
+        unknown_keys = [keys for keys in spec if keys not in _ARGUMENT_KEYS]
+        if len(unknown_keys) > 0:
+            raise ValueError(f"Argument '{spec['name']}' has unknown key(s) {', '.join(map(repr, unknown_keys))}, use "
+                             f"{', '.join(map(repr, _ARGUMENT_KEYS))}")
+        else:
+            pass
+
+        argument_type = spec.get("type", str)
+        argument_type = _TYPES_BY_NAME.get(argument_type, argument_type) if type(argument_type) is str else \
+            argument_type
+        self.name = spec["name"]
+        self.short = spec.get("short")
+        # The key of the argument in the parsed arguments, ex. "--dry-run" becomes "dry_run"
+        self.dest = self.name.lstrip("-").replace("-", "_")
+        # Text is passed on as is, so it is not converted at all
+        self.convert = None if argument_type is str else argument_type
+        self.type_name = _TYPE_NAMES.get(argument_type, getattr(argument_type, "__name__", "value"))
+        self.choices = None if spec.get("choices") is None else tuple(spec["choices"])
+        self.flag = argument_type is bool
+        self.many = spec.get("many", False) is True
+        self.help = spec.get("help", "")
+
+        if self.is_option() is False and (self.flag is True or self.short is not None):
+            raise ValueError(f"Argument '{self.name}' is positional, only options (names starting with '-') can be "
+                             f"flags or have a short name")
+
+        elif self.short is not None and (type(self.short) is not str or self.short[:1] != "-"):
+            raise ValueError(f"The short name of argument '{self.name}' must start with '-'")
+
+        elif self.flag is True and (self.many is True or self.choices is not None):
+            raise ValueError(f"Argument '{self.name}' is a flag, it cannot take many values or have choices")
+
+        elif argument_type is not str and not callable(argument_type):
+            raise ValueError(f"The type of argument '{self.name}' must be callable or one of "
+                             f"{', '.join(map(repr, _TYPES_BY_NAME))}")
+
+        else:
+            pass
+
+        # Flags are off unless given, options are None unless given and arguments that take many values start empty,
+        # a positional argument without a default is required
+        if "default" in spec:
+            self.default = spec["default"]
+            self.required = False
+
+        else:
+            self.default = False if self.flag is True else None
+            self.required = self.is_option() is False
+
+        if self.choices is not None and self.default is not None and self.many is False and \
+                self.default not in self.choices:
+            raise ValueError(f"The default of argument '{self.name}' is not one of its choices")
+        else:
+            pass
+
+    def is_option(self) -> bool:
+        """
+        Check if the argument is an option (given by name) rather than a positional argument.
+        :return: `True` if it is an option, `False` if it is positional.
+        """
+        return self.name[:1] == "-"
+
+    def value(self, raw_value: object = None, given_as: str = None) -> object:
+        """
+        Convert a value given for the argument and check it against the argument's choices.
+        :param raw_value: The value as typed (or as produced by the upstream command of a pipeline).
+        :param given_as: How the argument was referred to, for messages.
+        :return: The converted value.
+        """
+        if self.convert is not None:
+            try:
+                raw_value = self.convert(raw_value)
+
+            except (TypeError, ValueError):
+                raise _ArgumentError(f"Argument '{given_as}' must be {_article(self.type_name)}, got '{raw_value}'")
+
+        else:
+            pass
+
+        if self.choices is not None and raw_value not in self.choices:
+            raise _ArgumentError(f"Argument '{given_as}' must be one of {', '.join(map(str, self.choices))}, got "
+                                 f"'{raw_value}'")
+        else:
+            pass
+
+        return raw_value
+
+    def usage(self) -> str:
+        """
+        Describe the argument for a usage line, ex. "<host>", "[--port <integer>]" or "[--mode {fast,slow}]".
+        :return: The description.
+        """
+        if self.choices is not None:
+            value = "{" + ",".join(map(str, self.choices)) + "}"
+        elif self.is_option() is True:
+            value = f"<{self.type_name}>"
+        else:
+            value = f"<{self.name}>"
+
+        if self.flag is True:
+            usage = self.name
+        elif self.is_option() is True:
+            usage = f"{self.name} {value}"
+        else:
+            usage = value
+
+        if self.many is True:
+            usage += " ..."
+        else:
+            pass
+
+        return usage if self.required is True else f"[{usage}]"
+
+
+class _ArgumentError(ValueError):
+    """
+    Raised while parsing when the arguments do not match the schema. Turned into a message by `_ArgSchema.parse`.
+    """
+    pass
+
+
+class _StreamArgumentError(_ArgumentError):
+    """
+    Raised while a command reads the items piped into it, when an item does not match the schema. The command is
+    already running by then, so the error goes through the command and is reported once the pipeline stops.
+    """
+    def __init__(self, message: str = None, schema: "_ArgSchema" = None):
+        """
+        Initialize the error.
+        :param message: The message.
+        :param schema: The schema of the command that the item was piped into.
+        :return: None
+        """
+        super().__init__(message)
+        self.schema = schema
+
+
+def _article(type_name: str = None) -> str:
+    return f"an {type_name}" if type_name[:1] in "aeiou" else f"a {type_name}"
+
+
+class _ArgSchema:
+    """
+    The argument schema of an args-type command, compiled when the command is created. A schema is a list of arguments,
+    each a dict with the following keys:
+    - "name": the name of the argument. Names starting with "-" are options (ex. "--port"), which are given by name
+      ("--port 80" or "--port=80"), every other argument is positional and is given by position, in schema order.
+    - "short": a short name of an option (ex. "-p"). Optional.
+    - "type": the type of the value, `str` (the default), `int`, `float` or any callable that takes the typed text and
+      raises `ValueError` or `TypeError` if it is not valid. Options of type `bool` are flags that take no value. The
+      built-in types can also be given by name (ex. "int").
+    - "default": the value used if the argument is not given. Positional arguments without a default are required.
+    - "choices": the values the argument is limited to, after conversion.
+    - "many": `True` to take any number of values. A positional argument that takes many values must come last, and
+      collects the remaining positional values. An option that takes many values can be given more than once.
+    - "help": a short description of the argument, shown by "<command> --help".
+
+    Everything that can be worked out ahead of time is done when compiling, so parsing only goes over the arguments
+    once, looking up each option in a dict.
+    """
+    __slots__ = ("_positionals", "_options", "_defaults", "_many", "_required", "spec", "stream_argument")
+
+    def __init__(self, spec: list | tuple = None):
+        """
+        Compile the schema, raising `ValueError` if it is not valid.
+        :param spec: The `list` of argument specs.
+        :return: None
+        """
+        if type(spec) not in (list, tuple):
+            raise ValueError("The argument schema must be a list of argument dicts")
+        else:
+            pass
+
+        self.spec = spec
+        self._positionals = []
+        self._options = {}
+        dests = set()
+
+        for arguments in map(_Argument, spec):
+            if arguments.dest in dests or arguments.dest in ("h", "help"):
+                raise ValueError(f"Argument name '{arguments.name}' is used more than once, or is reserved for help")
+            else:
+                dests.add(arguments.dest)
+
+            if arguments.is_option() is True:
+                for names in (arguments.name, arguments.short):
+                    if names is not None and names in self._options:
+                        raise ValueError(f"Option name '{names}' is used more than once")
+                    elif names is not None:
+                        self._options[names] = arguments
+                    else:
+                        pass
+
+            elif len(self._positionals) > 0 and self._positionals[-1].many is True:
+                raise ValueError(f"Argument '{self._positionals[-1].name}' takes many values, so it must be the last "
+                                 f"positional argument")
+
+            elif len(self._positionals) > 0 and arguments.required is True and self._positionals[-1].required is False:
+                raise ValueError(f"Required argument '{arguments.name}' cannot come after optional argument "
+                                 f"'{self._positionals[-1].name}'")
+
+            else:
+                self._positionals.append(arguments)
+
+        # The defaults of the parsed arguments, copied for every call (arguments that take many values get a new list)
+        self._defaults = {arguments.dest: arguments.default for arguments in self._arguments()}
+        self._many = [arguments.dest for arguments in self._arguments() if arguments.many is True]
+        self._required = sum(1 for arguments in self._positionals if arguments.required is True)
+        # The positional argument that takes many values, which also receives the items piped into the command
+        self.stream_argument = self._positionals[-1] if len(self._positionals) > 0 and \
+            self._positionals[-1].many is True else None
+
+    def snapshot(self) -> list | None:
+        """
+        Get the spec of the schema in a form that can be written to JSON, with the types given by name.
+        :return: The spec, or None if it has types other than the built-in ones or values that cannot be written to
+                 JSON.
+        """
+        snapshot = []
+        for arguments in self.spec:
+            argument_type = arguments.get("type", str)
+            type_name = argument_type if argument_type in _TYPES_BY_NAME else \
+                next((names for names, types in _TYPES_BY_NAME.items() if types is argument_type), None)
+            if type_name is None:
+                return None
+            else:
+                snapshot.append({**arguments, "type": type_name})
+
+        try:
+            json.dumps(snapshot)
+        except (TypeError, ValueError):
+            return None
+
+        return snapshot
+
+    def _arguments(self):
+        """
+        Yield every argument once, positional arguments first, in schema order.
+        :return: A generator of arguments.
+        """
+        yield from self._positionals
+        yield from dict.fromkeys(self._options.values())
+
+    def parse(self, tokens: list = None, stream: object = None) -> dict | str | None:
+        """
+        Check and convert the arguments of a call in a single pass.
+        :param tokens: The arguments typed after the command name.
+        :param stream: The items piped into the command, which are added to the values of the positional argument that
+                       takes many values. Can be left as None if nothing is piped into the command.
+        :return: A `dict` of the argument names (without leading dashes, with other dashes turned into underscores) and
+                 their values, a message if the arguments do not match the schema, or None if help was asked for.
+        """
+        values = self._defaults.copy()
+        for dests in self._many:
+            values[dests] = list(values[dests] or ())
+
+        position = 0
+        options_ended = False
+        index = 0
+
+        try:
+            while index < len(tokens):
+                token = tokens[index]
+                index += 1
+
+                if options_ended is False and token == "--":
+                    options_ended = True
+                    continue
+
+                # Options, unless they were ended with "--" or the token is a negative number
+                elif options_ended is False and token[:1] == "-" and len(token) > 1 and \
+                        (token.partition("=")[0] in self._options or not _is_number(token)):
+                    name, has_value, value = token.partition("=")
+                    argument = self._options.get(name)
+                    if argument is None and name in ("-h", "--help"):
+                        return None
+
+                    elif argument is None:
+                        raise _ArgumentError(f"Unknown option '{name}'")
+
+                    elif argument.flag is True and has_value != "":
+                        raise _ArgumentError(f"Option '{name}' does not take a value")
+
+                    elif argument.flag is True:
+                        values[argument.dest] = True
+                        continue
+
+                    elif has_value == "" and index == len(tokens):
+                        raise _ArgumentError(f"Option '{name}' requires a value")
+
+                    elif has_value == "":
+                        value = tokens[index]
+                        index += 1
+
+                    else:
+                        pass
+
+                    if argument.many is True:
+                        values[argument.dest].append(argument.value(raw_value=value, given_as=name))
+                    else:
+                        values[argument.dest] = argument.value(raw_value=value, given_as=name)
+
+                # Positional arguments
+                elif position < len(self._positionals):
+                    argument = self._positionals[position]
+                    if argument.many is True:
+                        values[argument.dest].append(argument.value(raw_value=token, given_as=argument.name))
+                    else:
+                        values[argument.dest] = argument.value(raw_value=token, given_as=argument.name)
+                        position += 1
+
+                else:
+                    raise _ArgumentError(f"Unexpected argument '{token}'")
+
+            # The positional argument that takes many values counts as given once it has a value (or is piped into)
+            if position < len(self._positionals) and self._positionals[position].many is True and \
+                    (len(values[self._positionals[position].dest]) > 0 or stream is not None):
+                position += 1
+            else:
+                pass
+
+            if position < self._required:
+                raise _ArgumentError(f"Argument '{self._positionals[position].name}' is required")
+            else:
+                pass
+
+        except _ArgumentError as exc:
+            return str(exc)
+
+        # Piped items are converted as they are read, so they are not held in memory in between
+        if stream is not None:
+            argument = self.stream_argument
+            values[argument.dest] = itertools.chain(
+                values[argument.dest],
+                stream if argument.convert is None and argument.choices is None else
+                self._check_stream(argument=argument, stream=stream),
+            )
+        else:
+            pass
+
+        return values
+
+    def _check_stream(self, argument: _Argument = None, stream: object = None):
+        """
+        Convert the items piped into an argument and check them against the argument's choices, as they are read.
+        :param argument: The argument.
+        :param stream: The iterable of piped items.
+        :return: A generator of the converted items. A `_StreamArgumentError` is raised at the first item that does not
+                 match the argument.
+        """
+        for items in stream:
+            try:
+                yield argument.value(raw_value=items, given_as=argument.name)
+
+            except _ArgumentError as exc:
+                raise _StreamArgumentError(str(exc), schema=self) from None
+
+    def usage(self, command_name: str = None) -> str:
+        """
+        Create the usage line of the command, ex. "scan <host> [--port <integer>]".
+        :param command_name: The full name of the command.
+        :return: The usage line.
+        """
+        return " ".join([command_name, *(arguments.usage() for arguments in self._arguments())])
+
+    def render_help(self, command_name: str = None, command_help: str = None) -> str:
+        """
+        Create the help banner of the command, shown by "<command> --help".
+        :param command_name: The full name of the command.
+        :param command_help: The description of the command.
+        :return: The help banner.
+        """
+        rows = []
+        for arguments in self._arguments():
+            names = arguments.name if arguments.short is None else f"{arguments.short}, {arguments.name}"
+            description = arguments.help
+            if arguments.default is not None and arguments.flag is False:
+                description = f"{description} (default: {arguments.default})".strip()
+            else:
+                pass
+            rows.append((names, description))
+
+        spacer = max((len(names) for names, _ in rows), default=0)
+        spacer = spacer + 12 if spacer < 5 else spacer + 5
+
+        help_lines = ["", f"  Usage: {self.usage(command_name=command_name)}", ""]
+        if command_help is not None and command_help != "":
+            help_lines.extend([f"  {command_help}", ""])
+        else:
+            pass
+
+        if len(rows) > 0:
+            help_lines.extend([
+                f"  {'Argument':{spacer}} Description",
+                f"  {'--------':{spacer}} -----------",
+                *(f"  {names:{spacer}} {description}" for names, description in rows),
+                "",
+            ])
+        else:
+            pass
+
+        return "\n".join(help_lines)
+
+    def complete(self, text: str = None, tokens: list = None) -> list:
+        """
+        Get the option names or values that can complete the argument currently being typed.
+        :param text: The argument currently being typed.
+        :param tokens: The arguments typed before it.
+        :return: A `list` of the possible completions.
+        """
+        # The value of an option
+        if len(tokens) > 0 and tokens[-1] in self._options and self._options[tokens[-1]].flag is False:
+            argument = self._options[tokens[-1]]
+
+        elif text[:1] == "-":
+            return [names for names in (*self._options, "--help") if names.startswith(text)]
+
+        else:
+            # Count the positional arguments typed so far, skipping options and their values
+            position = 0
+            index = 0
+            while index < len(tokens):
+                argument = self._options.get(tokens[index].partition("=")[0])
+                if argument is not None and argument.flag is False and "=" not in tokens[index]:
+                    index += 1
+                elif argument is None and tokens[index][:1] != "-":
+                    position += 1
+                else:
+                    pass
+                index += 1
+
+            if len(self._positionals) == 0:
+                return []
+
+            argument = self._positionals[min(position, len(self._positionals) - 1)]
+            if position >= len(self._positionals) and argument.many is False:
+                return []
+            else:
+                pass
+
+        if argument.choices is None:
+            return []
+
+        return [str(choices) for choices in argument.choices if str(choices).startswith(text)]
+
+
+def _is_number(token: str = None) -> bool:
+    """
+    Check if a token is a negative number (ex. "-5"), which is a value rather than an option.
+    :param token: The token.
+    :return: `True` if it is a number, `False` otherwise.
+    """
+    try:
+        float(token)
+    except ValueError:
+        return False
+
+    return True
@@ -0,0 +1,209 @@
+"""
+Latency instrumentation used by `MagnetSting` to time commands.
+"""
+import json
+import math
+import threading
+import time
+
+
+class _LatencyHistogram:
+    """
+    A log-scale histogram of latencies. Each doubling of latency is split into 8 buckets, so recording a value is a
+    single dict update and percentiles are accurate to within about 9%, no matter how many values are recorded.
+    """
+    __slots__ = ("count", "total", "max", "_buckets")
+
+    _SUB_BUCKETS = 8
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = {}
+
+    def record(self, seconds: float = None) -> None:
+        """
+        Record a latency.
+        :param seconds: The latency in seconds.
+        :return: None
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        else:
+            pass
+
+        # Bucket by the base 2 exponent of the latency in microseconds, split into equal-width sub-buckets
+        mantissa, exponent = math.frexp(max(seconds * 1e6, 1.0))
+        bucket = exponent * self._SUB_BUCKETS + int((mantissa - 0.5) * 2 * self._SUB_BUCKETS)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent: float = None) -> float:
+        """
+        Estimate a percentile of the recorded latencies.
+        :param percent: The percentile, between 0 and 100.
+        :return: The upper bound of the bucket the percentile falls in, in seconds (capped at the maximum latency).
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                exponent, sub_bucket = divmod(bucket, self._SUB_BUCKETS)
+                upper = math.ldexp(0.5 + (sub_bucket + 1) / (2 * self._SUB_BUCKETS), exponent) / 1e6
+                return min(upper, self.max)
+
+        return self.max
+
+
+class _CommandStats:
+    """
+    Collects the latency of each command, split into the time spent finding the command (resolve), running it
+    (execute) and printing built-in output such as help banners (render). Only the phases a command goes through are
+    recorded: what a command function prints (or returns to be printed) is produced while it runs, so it is part of
+    the execute phase and such commands have no render phase. Each record can also be exported to a JSONL file or
+    passed to a callback.
+    """
+    PHASES = ("resolve", "execute", "render", "total")
+
+    def __init__(self, export: str | object = None):
+        """
+        Initialize the collector.
+        :param export: Where to export each record: the path of a JSONL file that records are appended to, a callable
+                       that is called with each record as a `dict`, or None to not export records.
+        :return: None
+        """
+        self._histograms = {}
+        self._export_file = None
+        self._export_callback = None
+        # Commands can be recorded from several threads at once, ex. by the sessions of a daemon
+        self._lock = threading.Lock()
+
+        if type(export) is str:
+            self._export_file = open(export, "a", buffering=1)
+        elif export is not None:
+            self._export_callback = export
+        else:
+            pass
+
+    def record(self, command_name: str = None, status: int = None, resolve: float = None, execute: float = None,
+               render: float = None) -> None:
+        """
+        Record the latency of a command.
+        :param command_name: The name of the command ("<command group name> <command name>" for commands in groups).
+        :param status: The exit status of the command.
+        :param resolve: The time spent finding the command, in seconds. Can be left as None if it does not apply.
+        :param execute: The time spent running the command, in seconds. Can be left as None if it does not apply.
+        :param render: The time spent printing built-in output, in seconds. Can be left as None if it does not apply.
+        :return: None
+        """
+        total = sum(phases for phases in (resolve, execute, render) if phases is not None)
+        with self._lock:
+            if command_name not in self._histograms:
+                self._histograms[command_name] = {phases: _LatencyHistogram() for phases in self.PHASES}
+            else:
+                pass
+
+            histograms = self._histograms[command_name]
+            for phases, seconds in (("resolve", resolve), ("execute", execute), ("render", render)):
+                if seconds is not None:
+                    histograms[phases].record(seconds)
+                else:
+                    pass
+            histograms["total"].record(total)
+
+        if self._export_file is not None or self._export_callback is not None:
+            export_record = {
+                "time": time.time(),
+                "command": command_name,
+                "status": status,
+                "resolve": resolve,
+                "execute": execute,
+                "render": render,
+                "total": total,
+            }
+
+            if self._export_file is not None:
+                with self._lock:
+                    self._export_file.write(json.dumps(export_record) + "\n")
+            else:
+                self._export_callback(export_record)
+
+        else:
+            pass
+
+    def reset(self) -> None:
+        """
+        Remove all recorded latencies.
+        :return: None
+        """
+        with self._lock:
+            self._histograms = {}
+
+    def render(self, command_name: str = None) -> str:
+        """
+        Create a table of the recorded latencies.
+        :param command_name: Show the latency of each phase of this command (leaving out the phases it does not go
+                             through). Can be left as None to show the total latency of every command, slowest (by p95)
+                             first.
+        :return: The table.
+        """
+        # Commands can be recorded (or the latencies reset) by other threads while the table is created
+        with self._lock:
+            if command_name is None:
+                first_column = "Command"
+                rows = sorted(((commands, histograms["total"]) for commands, histograms in self._histograms.items()),
+                              key=lambda row: row[1].percentile(95), reverse=True)
+            else:
+                first_column = "Phase"
+                rows = [(phases, self._histograms[command_name][phases]) for phases in self.PHASES
+                        if self._histograms[command_name][phases].count > 0]
+
+            return self._render_rows(first_column=first_column, rows=rows)
+
+    @staticmethod
+    def _render_rows(first_column: str = None, rows: list = None) -> str:
+        """
+        Create a table of latencies.
+        :param first_column: The heading of the first column.
+        :param rows: A `list` of the names of the rows and their histograms.
+        :return: The table.
+        """
+        spacer = max([len(first_column), *(len(names) for names, _ in rows)]) + 5
+
+        stats_lines = [
+            "",
+            f"  {first_column:{spacer}} {'Count':>8} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} "
+            f"{'Max (ms)':>10}",
+            f"  {'-' * len(first_column):{spacer}} {'-----':>8} {'--------':>10} {'--------':>10} {'--------':>10} "
+            f"{'--------':>10}",
+        ]
+        for names, histogram in rows:
+            stats_lines.append(f"  {names:{spacer}} {histogram.count:>8} {histogram.percentile(50) * 1e3:>10.3f} "
+                               f"{histogram.percentile(95) * 1e3:>10.3f} {histogram.percentile(99) * 1e3:>10.3f} "
+                               f"{histogram.max * 1e3:>10.3f}")
+        stats_lines.extend(["", ""])
+
+        return "\n".join(stats_lines)
+
+    def __contains__(self, command_name: str) -> bool:
+        return command_name in self._histograms
+
+    def __len__(self) -> int:
+        return len(self._histograms)
+
+    def close(self) -> None:
+        """
+        Close the export file, if there is one.
+        :return: None
+        """
+        if self._export_file is not None:
+            self._export_file.close()
+            self._export_file = None
+        else:
+            pass
@@ -0,0 +1,276 @@
+"""
+Prefix trie used by `MagnetSting` to index command names, command group members and aliases.
+"""
+from ._fuzzy import _FuzzyIndex
+
+
+class _PrefixTrie:
+    """
+    A character-level prefix trie of names. Every name is stored together with the order in which it was first
+    inserted, so prefix queries can return their matches in registration order (the same order the help banners use).
+    Inserting and removing a name costs O(len(name)) and a prefix query costs O(len(prefix) + matches). Names that are
+    close to a mistyped name are looked up in an edit-distance index (see `_FuzzyIndex`). Building that index costs
+    far more than inserting a name, so it is only built for the first lookup and kept up to date from then on, which
+    keeps registering commands fast.
+
+    A trie can be layered over a parent trie, as done by child instances of `MagnetSting`. It then holds the names of
+    its parent as well as its own, without copying them: lookups go through both tries, the parent's names coming
+    first, while names are only inserted into the layer itself. Removing one of the parent's names hides it from the
+    layer.
+    """
+    __slots__ = ("_root", "_counter", "_size", "_fuzzy", "_parent", "_hidden")
+
+    def __init__(self, names: tuple | list = (), parent: "_PrefixTrie" = None):
+        """
+        Initialize the trie.
+        :param names: Names to insert into the trie, in registration order.
+        :param parent: The trie that this trie is layered over. Can be left as None.
+        :return: None
+        """
+        # Each node is a list of [children dict, insertion number or None, name or None]
+        self._root = [{}, None, None]
+        self._counter = 0
+        self._size = 0
+        # The edit-distance index of the names of this trie (leaving out the parent's), None until it is first needed
+        self._fuzzy = None
+        self._parent = parent
+        # The names of the parent that were removed from the layer
+        self._hidden = set()
+
+        for name in names:
+            self.insert(name)
+
+    def __len__(self) -> int:
+        if self._parent is None:
+            return self._size
+
+        else:
+            return sum(1 for _ in self.iter_prefix(""))
+
+    def __contains__(self, name: str) -> bool:
+        node = self._find(name)
+        if node is not None and node[1] is not None:
+            return True
+
+        return self._parent is not None and name not in self._hidden and name in self._parent
+
+    def _find(self, prefix: str) -> list | None:
+        """
+        Walk the trie along a prefix.
+        :param prefix: The prefix to walk.
+        :return: The node at the end of the prefix, or None if no name starts with the prefix.
+        """
+        node = self._root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node
+
+    def insert(self, name: str) -> None:
+        """
+        Insert a name into the trie. Inserting a name that already exists keeps its original position.
+        :param name: The name to insert.
+        :return: None
+        """
+        # Names of the parent are not inserted again, they only have to be shown if they were hidden
+        if self._parent is not None and name in self._parent:
+            self._hidden.discard(name)
+            return
+
+        node = self._root
+        for char in name:
+            children = node[0]
+            if char not in children:
+                children[char] = [{}, None, None]
+            node = children[char]
+
+        if node[1] is None:
+            node[1] = self._counter
+            node[2] = name
+            self._counter += 1
+            self._size += 1
+            if self._fuzzy is not None:
+                self._fuzzy.insert(name)
+            else:
+                pass
+        else:
+            pass
+
+    def update(self, names: list) -> None:
+        """
+        Insert many names into the trie in one pass, which is the same as inserting them one by one (in the same order)
+        without the cost of a method call and attribute lookups for every name.
+        :param names: The names to insert.
+        :return: None
+        """
+        if self._parent is not None:
+            for name in names:
+                self.insert(name)
+            return
+
+        root = self._root
+        counter = self._counter
+        inserted = []
+        for name in names:
+            node = root
+            for char in name:
+                children = node[0]
+                if char not in children:
+                    children[char] = [{}, None, None]
+                node = children[char]
+
+            if node[1] is None:
+                node[1] = counter
+                node[2] = name
+                counter += 1
+                inserted.append(name)
+            else:
+                pass
+
+        self._size += counter - self._counter
+        self._counter = counter
+        if self._fuzzy is not None:
+            for name in inserted:
+                self._fuzzy.insert(name)
+        else:
+            pass
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a name from the trie, pruning any branches that are left empty. Removing a name that does not exist does
+        nothing.
+        :param name: The name to remove.
+        :return: None
+        """
+        if self._parent is not None and name in self._parent:
+            self._hidden.add(name)
+        else:
+            pass
+
+        # Keep the path so empty nodes can be pruned bottom-up
+        path = [self._root]
+        for char in name:
+            node = path[-1][0].get(char)
+            if node is None:
+                return
+            path.append(node)
+
+        if path[-1][1] is None:
+            return
+
+        path[-1][1] = None
+        path[-1][2] = None
+        self._size -= 1
+        if self._fuzzy is not None:
+            self._fuzzy.remove(name)
+        else:
+            pass
+
+        for index in range(len(name), 0, -1):
+            node = path[index]
+            if node[0] or node[1] is not None:
+                break
+            del path[index - 1][0][name[index - 1]]
+
+    def clear(self) -> None:
+        """
+        Remove every name from the trie.
+        :return: None
+        """
+        self._root = [{}, None, None]
+        self._counter = 0
+        self._size = 0
+        self._fuzzy = None
+        self._hidden = set() if self._parent is None else set(self._parent.iter_prefix(""))
+
+    def _own_names(self):
+        """
+        Lazily yield every name inserted into this trie itself, leaving out the names of the parent.
+        :return: A generator of names.
+        """
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node[2] is not None:
+                yield node[2]
+            else:
+                pass
+            stack.extend(node[0].values())
+
+    def iter_prefix(self, prefix: str):
+        """
+        Lazily yield every name that starts with a prefix, in no particular order. Used where the order does not
+        matter and only a few matches may be consumed, such as tab completion.
+        :param prefix: The prefix to look for.
+        :return: A generator of names.
+        """
+        if self._parent is not None:
+            for names in self._parent.iter_prefix(prefix):
+                if names not in self._hidden:
+                    yield names
+                else:
+                    pass
+        else:
+            pass
+
+        node = self._find(prefix)
+        if node is None:
+            return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            # Skip names that were added to the parent after they were added to the layer
+            if node[2] is not None and (self._parent is None or node[2] not in self._parent):
+                yield node[2]
+            stack.extend(node[0].values())
+
+    def query(self, prefix: str) -> tuple:
+        """
+        Find every name that starts with a prefix.
+        :param prefix: The prefix to look for.
+        :return: A tuple of the list of matching names in registration order and the length of the longest match
+                 (0 if there are no matches).
+        """
+        node = self._find(prefix)
+        matches = []
+        max_width = 0
+        stack = [] if node is None else [node]
+        while stack:
+            node = stack.pop()
+            if node[1] is not None:
+                matches.append((node[1], node[2]))
+                if len(node[2]) > max_width:
+                    max_width = len(node[2])
+            stack.extend(node[0].values())
+
+        matches.sort()
+        if self._parent is None:
+            return [name for _, name in matches], max_width
+
+        # The names of the parent were registered first, so they come first
+        parent_matches, _ = self._parent.query(prefix)
+        names = [name for name in parent_matches if name not in self._hidden]
+        names.extend(name for _, name in matches if name not in self._parent)
+        return names, max(map(len, names), default=0)
+
+    def closest(self, name: str, count: int = 8) -> list:
+        """
+        Find the names that are a small number of edits away from a name, such as a name with a typo.
+        :param name: The name to look for.
+        :param count: The maximum number of names returned.
+        :return: A list of (distance, name) tuples, closest first.
+        """
+        if self._fuzzy is None:
+            self._fuzzy = _FuzzyIndex(self._own_names())
+        else:
+            pass
+
+        if self._parent is None:
+            return self._fuzzy.closest(name, count)
+
+        close_matches = [match for match in self._parent.closest(name, count + len(self._hidden))
+                         if match[1] not in self._hidden]
+        close_matches.extend(self._fuzzy.closest(name, count))
+        return sorted(set(close_matches))[:count]
@@ -0,0 +1,185 @@
+"""
+Timeouts used by `MagnetSting` to keep commands that hang from blocking the prompt.
+"""
+import contextlib
+import threading
+
+from ._output import _call_captured, _redirect_thread_stdout, _thread_stdout_target
+
+# The exit status of a command that timed out, the same as the one used by the "timeout" command of GNU coreutils
+_TIMED_OUT = 124
+# The number of seconds a process has to exit once it was asked to terminate, before it is killed
+_KILL_GRACE = 2.0
+
+
+def _report_timeout(timeout: float = None) -> None:
+    """
+    Tell the user that a command timed out.
+    :param timeout: The timeout of the command in seconds.
+    :return: None
+    """
+    print(f"[!] Command timed out after {timeout:g} second(s)\n")
+
+
+class _CommandTimeout(Exception):
+    """
+    Raised by `_call_with_timeout` when a function does not finish in time.
+    """
+
+
+def _call_with_timeout(function: object = None, function_kwargs: dict = None, timeout: float = None) -> object:
+    """
+    Call a function on a worker thread and wait for it for at most `timeout` seconds. If the function is still running
+    by then, or Ctrl-C is pressed while waiting for it (which raises `KeyboardInterrupt` here, as usual), the function
+    is abandoned: a thread cannot be stopped from the outside, so the function keeps running in the background, but
+    nothing waits for it anymore and whatever it returns is discarded. What the function prints goes to the same place
+    as what the calling thread prints.
+    :param function: The function to call.
+    :param function_kwargs: The keyword arguments passed to the function.
+    :param timeout: The timeout in seconds.
+    :return: The return value of the function. Exceptions raised by the function are raised again, and
+             `_CommandTimeout` is raised if it timed out.
+    """
+    target = _thread_stdout_target()
+    outcome = []
+    finished = threading.Event()
+
+    def worker() -> None:
+        try:
+            with contextlib.nullcontext() if target is None else _redirect_thread_stdout(target):
+                outcome.append((True, function(**function_kwargs)))
+
+        except BaseException as exc:
+            outcome.append((False, exc))
+
+        finally:
+            finished.set()
+
+    threading.Thread(target=worker, name="magnetsting-command", daemon=True).start()
+
+    if finished.wait(timeout) is False:
+        raise _CommandTimeout(timeout)
+
+    succeeded, result = outcome[0]
+    if succeeded is True:
+        return result
+
+    raise result
+
+
+def _run_with_timeout(function: object = None, function_kwargs: dict = None, timeout: float = None) -> object:
+    """
+    Call a function with `_call_with_timeout`, telling the user if it timed out.
+    :param function: The function to call.
+    :param function_kwargs: The keyword arguments passed to the function.
+    :param timeout: The timeout in seconds.
+    :return: The return value of the function, or `_TIMED_OUT` if it timed out. Exceptions raised by the function are
+             raised again.
+    """
+    try:
+        return _call_with_timeout(function=function, function_kwargs=function_kwargs, timeout=timeout)
+
+    except _CommandTimeout:
+        _report_timeout(timeout=timeout)
+        return _TIMED_OUT
+
+
+def _call_captured_with_timeout(function: object = None, function_kwargs: dict = None, timeout: float = None) -> str:
+    """
+    Call a command function with `_call_captured`, giving up on it after `timeout` seconds. Used by the workers of the
+    "parallel" built-in command, which is why it lives at module level (so it can be pickled).
+    :param function: The function to call.
+    :param function_kwargs: The keyword arguments passed to the function.
+    :param timeout: The timeout in seconds, or None for no timeout.
+    :return: The captured output. `_CommandTimeout` is raised if the function timed out.
+    """
+    if timeout is None:
+        return _call_captured(function=function, function_kwargs=function_kwargs)
+
+    return _call_with_timeout(function=_call_captured, timeout=timeout,
+                              function_kwargs={"function": function, "function_kwargs": function_kwargs})
+
+
+def _run_in_thread(loop: object = None, function: object = None, *args: object) -> object:
+    """
+    Asynchronous counterpart of `_run_with_timeout`: call a function on a worker thread of its own and get an
+    `asyncio.Future` of its return value. Unlike with the event loop's default executor, cancelling the future abandons
+    the function for good, as the worker is a daemon thread that neither the loop's shutdown nor the exit of the
+    interpreter waits for.
+    :param loop: The running event loop.
+    :param function: The function to call.
+    :param args: The arguments passed to the function.
+    :return: The future.
+    """
+    future = loop.create_future()
+
+    def settle(succeeded: bool = None, result: object = None) -> None:
+        if future.cancelled():
+            pass
+        elif succeeded is True:
+            future.set_result(result)
+        else:
+            future.set_exception(result)
+
+    def worker() -> None:
+        try:
+            outcome = (True, function(*args))
+        except BaseException as exc:
+            outcome = (False, exc)
+
+        # The loop is closed if the function was abandoned and MagnetSting exited in the meantime
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass
+
+    threading.Thread(target=worker, name="magnetsting-command", daemon=True).start()
+    return future
+
+
+class _ProcessWatchdog:
+    """
+    A thread that stops a process once its timeout expires, first asking it to terminate and then killing it if it is
+    still running `_KILL_GRACE` seconds later. Used as a context manager around waiting for the process: leaving the
+    context stops the watchdog. Without a timeout, no thread is started.
+    """
+    def __init__(self, timeout: float = None, terminate: object = None, kill: object = None):
+        """
+        Initialize the watchdog.
+        :param timeout: The timeout in seconds, or None for no timeout.
+        :param terminate: The function that asks the process to terminate.
+        :param kill: The function that kills the process.
+        :return: None
+        """
+        self.timeout = timeout
+        self.terminate = terminate
+        self.kill = kill
+        # Whether the process had to be stopped
+        self.expired = False
+        self._finished = threading.Event()
+
+    def _watch(self) -> None:
+        if self._finished.wait(self.timeout) is True:
+            return
+
+        self.expired = True
+        self.terminate()
+        if self._finished.wait(_KILL_GRACE) is False:
+            self.kill()
+        else:
+            pass
+
+    def __enter__(self) -> "_ProcessWatchdog":
+        if self.timeout is not None:
+            threading.Thread(target=self._watch, name="magnetsting-watchdog", daemon=True).start()
+        else:
+            pass
+
+        return self
+
+    def __exit__(self, exc_type: object = None, exc_value: object = None, exc_traceback: object = None) -> None:
+        self._finished.set()
+        if self.expired is True:
+            _report_timeout(timeout=self.timeout)
+        else:
+            pass
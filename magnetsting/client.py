@@ -0,0 +1,109 @@
+"""
+Thin client for a `MagnetSting` daemon (see `MagnetSting.magnetsting_serve`).
+
+Run a single command and exit with its exit status:
+
+    python3 -m magnetsting.client /tmp/mytool.sock mycommand foo bar
+
+Run the commands read from stdin (one per line), or typed at a prompt when stdin is a terminal:
+
+    python3 -m magnetsting.client /tmp/mytool.sock < commands.txt
+"""
+import json
+import socket
+import sys
+
+
+class MagnetStingClient:
+    """
+    A connection to a `MagnetSting` daemon. Every connection is a separate session on the daemon, with its own aliases.
+    """
+    def __init__(self, socket_path: str = None):
+        """
+        Connect to the daemon.
+        :param socket_path: The path of the daemon's socket.
+        :return: None
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._rfile = self._socket.makefile("rb")
+
+    def run(self, command: str = None, output: object = None) -> int:
+        """
+        Run a command on the daemon, writing its output while it is received.
+        :param command: The command line, as it would be typed at the prompt.
+        :param output: The stream the output is written to. Defaults to `sys.stdout`.
+        :return: The exit status of the command.
+        """
+        output = sys.stdout if output is None else output
+        self._socket.sendall(command.replace("\n", " ").encode("utf-8") + b"\n")
+
+        for lines in self._rfile:
+            message = json.loads(lines)
+            if "output" in message:
+                output.write(message["output"])
+                output.flush()
+            else:
+                return message["status"]
+
+        raise ConnectionError("The daemon closed the connection")
+
+    def close(self) -> None:
+        """
+        End the session and close the connection.
+        :return: None
+        """
+        self._rfile.close()
+        self._socket.close()
+
+    def __enter__(self) -> "MagnetStingClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 0:
+        print("usage: python3 -m magnetsting.client <socket path> [<command> [<args>]]", file=sys.stderr)
+        return 2
+
+    try:
+        client = MagnetStingClient(socket_path=argv[0])
+    except OSError as exc:
+        print(f"[!] Could not connect to '{argv[0]}': {exc}", file=sys.stderr)
+        return 1
+
+    with client:
+        status = 0
+        try:
+            # Arguments are joined with spaces, like ssh does, so quoting meant for MagnetSting can be passed as is
+            if len(argv) > 1:
+                return client.run(command=" ".join(argv[1:]))
+
+            while True:
+                if sys.stdin.isatty():
+                    usr_input = input(">> ")
+                else:
+                    usr_input = sys.stdin.readline()
+                    if usr_input == "":
+                        break
+
+                if usr_input.strip() != "":
+                    status = client.run(command=usr_input.strip())
+                else:
+                    pass
+
+        except (EOFError, KeyboardInterrupt):
+            print()
+
+        # The daemon ends the session when it receives a break keyword
+        except ConnectionError:
+            pass
+
+        return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,7 +19,38 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 import subprocess
 import readline
+import asyncio
+import inspect
+import concurrent.futures
+import shutil
+import pydoc
+import sys
+import os
+import shlex
+import importlib
+import threading
+import time
+import collections
+import collections.abc
 import json
+import copy
+import signal
+import weakref
+
+from ._trie import _PrefixTrie
+from ._runners import _run_file_subprocess, _run_file_in_process, _ForkServer
+from ._output import _stream_lines, _stdout_redirected, _tee_thread_stdout
+from ._aliasstore import _AliasStore, _SessionAliasStore
+from ._stats import _CommandStats
+from ._pipes import _split_pipeline, _PipeStage, PipeInput
+from ._daemon import _DaemonServer
+from ._cache import _ResultCache
+from ._records import _CommandRecord, _SINGLE, _ARGS, _FILE, _GROUP, _BUILT_IN, _FUNCTION_TYPES
+from ._overlay import _Overlay
+from ._watchdog import _run_with_timeout, _run_in_thread, _report_timeout, _TIMED_OUT, _CommandTimeout, \
+    _call_captured_with_timeout
+from ._schema import _ArgSchema, _StreamArgumentError
+from ._manifest import _manifest_entries, _paused_gc, _ENTRY_KEYS
 
 
 class MagnetSting:
@@ -62,10 +93,18 @@ class MagnetSting:
     The order in which the commands and command groups are created determines the order in which they appear in the help
     banner. The same applies for commands in command groups.
     """
+    # The number of lines whose dispatch plan is kept in the parse cache
+    PARSE_CACHE_SIZE = 1024
+    # The maximum number of close matches suggested for a mistyped command name
+    SUGGESTION_COUNT = 8
+
     def __init__(self, exit_description: str = "exit MAGNETSTING",
                  banner: tuple | str = ("=" * 35, "MAGNETSTING", "Data here", "=" * 35), cmd_prompt: str = ">> ",
                  exit_message: str = "[*] Exiting", break_keywords: tuple = ("q", "quit", "exit"),
-                 alias_file: str = ".alias.json", verbose: bool = True, help_on_start: bool = True):
+                 alias_file: str = ".alias.json", verbose: bool = True, help_on_start: bool = True,
+                 file_runner: str = "subprocess", preload_modules: tuple = (), help_pager: bool = False,
+                 prewarm_commands: bool | tuple = False, instrument: bool = False, stats_export: str | object = None,
+                 output_pager: bool = False, command_timeout: float = None):
         """
         Initialize instance of MagnetSting.
         :param exit_description: The description of the exit command.
@@ -81,12 +120,62 @@ class MagnetSting:
         :param help_on_start: Show the help banner on start or not. Setting it to `True` will show the help banner on
                               start while setting it to `False` will not. Even when set to `False`, the help banner
                               and help functionality can still be called using the "help" command.
+        :param file_runner: How the files of file-type commands are executed, unless a command specifies otherwise.
+                            `"subprocess"` runs each file in a new Python interpreter, `"in-process"` runs the file
+                            inside the interpreter running MagnetSting using `runpy` and `"fork-server"` runs each file
+                            in a process forked from a pre-warmed worker, which skips the interpreter start-up and the
+                            imports already done by MagnetSting's interpreter. In-process files that have a timeout
+                            are run by the fork server, since they could not be stopped otherwise.
+        :param preload_modules: A `tuple` of module names that the `"fork-server"` worker imports before running any
+                                files, ex. ("argparse", "requests").
+        :param help_pager: Show help banners that do not fit in the terminal through a pager (the one set in the
+                           `PAGER` environment variable, or "less" by default). Setting it to `False` always prints the
+                           help banners directly.
+        :param prewarm_commands: Import the functions of commands registered by import path (see
+                                 `add_command_type_single`) in a background thread once the prompt is shown, so that
+                                 the first call of these commands does not have to wait for the import. Set it to `True`
+                                 to import all of them or to a `tuple` of command names to import only those (use
+                                 "<command group name> <command name>" for commands in command groups).
+        :param instrument: Time every command, split into the time spent finding the command, running it and printing
+                           built-in output, and keep per-command latency histograms that can be viewed with the "stats"
+                           built-in command. Setting it to `False` (the default) adds no overhead.
+        :param stats_export: Where to export the timing of each command when `instrument` is `True`: the path of a
+                             JSONL file that one record per command is appended to, or a callable that is called with
+                             each record as a `dict`.
+        :param output_pager: Show the lines returned (or yielded) by command functions through a pager (the one set in
+                             the `PAGER` environment variable, or a built-in pager if it is not set) when writing to a
+                             terminal. Setting it to `False` streams the lines directly.
+        :param command_timeout: The number of `seconds` after which a command is stopped, unless the command sets its
+                                own timeout. File-type commands are terminated (and killed if they do not exit), while
+                                the functions of `single-` and `args-type` commands are abandoned, see the "Timeouts and
+                                Cancelling Commands" section of the README. Can be left as None for no timeout.
         """
 
         # Initialize dicts for commands, command groups and command aliases
         self._commands_info = {}
         self._groups_dict = {}
         self._alias_dict = {}
+        # Initialize prefix tries that index the top-level command names, the members of each command group and the
+        # alias names
+        self._commands_trie = _PrefixTrie()
+        self._group_tries = {}
+        self._alias_trie = _PrefixTrie()
+        # Initialize dict that caches compiled aliases, see the _compile_alias method
+        self._alias_cache = {}
+        # Initialize ordered dict that caches the dispatch plan of recently typed lines, see the _parse_input method
+        self._parse_cache = collections.OrderedDict()
+        # Initialize dicts that cache rendered help banners and the column widths used to render them, both are keyed
+        # by the command group name (or None for the main help banner)
+        self._help_cache = {}
+        self._help_widths = {}
+        # Initialize list that holds the matches of the current tab completion
+        self._completion_matches = []
+        # Initialize dict that holds the background jobs of the asynchronous mainloop
+        self._jobs = {}
+        self._job_counter = 0
+        # Initialize the parent of a child instance (see the create_child method) and the children of the instance
+        self._parent = None
+        self._children = weakref.WeakSet()
         self.exit_description = exit_description
         self.banner_data = banner
         self.cmd_prompt = cmd_prompt
@@ -95,6 +184,19 @@ class MagnetSting:
         self.alias_file = alias_file
         self.verbose = verbose
         self.help_on_start = help_on_start
+        self.help_pager = help_pager
+        self.output_pager = output_pager
+        self.prewarm_commands = prewarm_commands
+        self.command_timeout = command_timeout
+        # Initialize the task of the command running in the foreground of the asynchronous mainloop
+        self._foreground = None
+        # Initialize the readline completer and word delimiters that were set before the mainloop started
+        self._saved_readline = None
+        # Initialize the latency collector if instrumentation is enabled
+        self._stats = _CommandStats(export=stats_export) if instrument is True else None
+        self.file_runner = file_runner
+        # Initialize the pre-warmed worker used by the "fork-server" file runner, it is only started when first needed
+        self._fork_server = _ForkServer(preload_modules=preload_modules)
 
         # Check if file is a JSON file
         if self.alias_file[-5:] != ".json":
@@ -102,83 +204,129 @@ class MagnetSting:
         else:
             pass
 
-    def _help_command(self) -> None:
+        # Initialize the store that keeps the alias file and its journal up to date
+        self._alias_store = _AliasStore(alias_file=self.alias_file)
+
+        # Check if the file runner exists and the timeout is valid
+        self._check_file_runner(file_runner=self.file_runner)
+        self._check_timeout(timeout=self.command_timeout)
+
+    def _write_output(self, output: str = None) -> None:
         """
-        Print the help banner.
+        Write a block of text to stdout with a single write. If `help_pager` is enabled and the text does not fit in
+        the terminal, it is shown through a pager instead.
+        :param output: The text to write.
         :return: None
         """
-        # Calculate the amount of spacing needed between the commands and their help descriptions
-        spacing = 0
-        for commands in self._commands_info:
-            if len(commands) > spacing:
-                spacing = len(commands)
-            else:
-                pass
+        if self.help_pager is True and output.count("\n") >= shutil.get_terminal_size().lines:
+            pydoc.pager(output)
 
-        # Add additional spacing to the len of the longest command name to make the columns more distinct and readable
-        spacing += 5
+        else:
+            sys.stdout.write(output)
+            sys.stdout.flush()
 
-        # Print commands and their help descriptions
-        if self.verbose is False:
-            print()
-            print(f"  {'Command':{spacing}} {'Description'}")
-            print(f"  {'-------':{spacing}} {'-----------'}")
-            for commands in self._commands_info:
-                print(f"  {commands:{spacing}} {self._commands_info[commands]['help']}")
-            print()
+    def _stream_output(self, lines: object = None) -> int:
+        """
+        Stream the lines returned (or yielded) by a command function, through a pager if `output_pager` is enabled.
+        :param lines: The iterator of lines.
+        :return: The exit status, 130 if the output was stopped with Ctrl-C and 0 otherwise.
+        """
+        if self.output_pager is True and sys.stdout.isatty():
+            return _stream_lines(lines=lines, pager=os.environ.get("PAGER", ""))
 
-        # Print commands, their help descriptions and the commands types
         else:
-            # Calculate the amount of spacing needed between the command help descriptions and the types
-            type_spacing = 0
-            for command_types in self._commands_info:
-                if len(self._commands_info[command_types]["help"]) > type_spacing:
-                    type_spacing = len(self._commands_info[command_types]["help"])
-                else:
-                    pass
+            return _stream_lines(lines=lines)
 
-            # Add additional spacing to the len of the longest command description to make the columns more distinct
-            # and readable
-            type_spacing += 5
+    def _help_table_widths(self, help_scope: str = None) -> list:
+        """
+        Get the length of the longest command name and of the longest help description in the commands dict or in a
+        command group. The lengths are kept up to date as commands are added, they are only calculated here from
+        scratch if a command was replaced (which could make the longest name or description shorter).
+        :param help_scope: The name of the command group, or None for the commands dict.
+        :return: A `list` of the length of the longest command name and the length of the longest help description.
+        """
+        if help_scope not in self._help_widths:
+            commands_dict = self._commands_info if help_scope is None else self._groups_dict[help_scope]
+            self._help_widths[help_scope] = [
+                max((len(commands) for commands in commands_dict), default=0),
+                max((command_info.help_width for command_info in commands_dict.values()), default=0),
+            ]
 
-            print()
-            print(f"  {'Command':{spacing}} {'Description':{type_spacing}} {'Type'}")
-            print(f"  {'-------':{spacing}} {'-----------':{type_spacing}} {'----'}")
+        else:
+            pass
 
-            for commands in self._commands_info:
-                print(f"  {commands:{spacing}} {self._commands_info[commands]['help']:{type_spacing}} "
-                      f"{self._commands_info[commands]['type']}")
-            print()
+        return self._help_widths[help_scope]
 
-    def _specific_commands_help(self, command_name: str = None) -> None:
+    def _render_help_table(self, help_scope: str = None) -> str:
         """
-        Print a help banner containing specific commands.
-        :param command_name: The name or partial name of the command(s) to look for.
-        :return: None
+        Create the help banner of the commands dict or of a command group. The help banner is cached until a command is
+        added to the commands dict or the command group.
+        :param help_scope: The name of the command group, or None for the commands dict.
+        :return: The help banner.
         """
-        # Initialize dict to hold command names and their descriptions
-        command_help_dict = {}
-        # Initialize ints for calculating spacing
-        command_spacer = 0
-        type_spacer = 0
+        # Return the cached help banner if there is one
+        if (help_scope, self.verbose) in self._help_cache:
+            return self._help_cache[(help_scope, self.verbose)]
 
-        for commands in self._commands_info:
-            if commands.startswith(command_name):
-                command_help_dict[commands] = self._commands_info[commands]["help"]
+        else:
+            pass
 
-                # Calculate base spacing between commands names and descriptions
-                if len(commands) > command_spacer:
-                    command_spacer = len(commands)
+        commands_dict = self._commands_info if help_scope is None else self._groups_dict[help_scope]
+        spacing, type_spacing = self._help_table_widths(help_scope=help_scope)
 
-                else:
-                    pass
+        # Add additional spacing to the len of the longest command name and description to make the columns more
+        # distinct and readable
+        spacing += 5
+        type_spacing += 5
 
-                # Calculate base spacing between command descriptions and types
-                if len(self._commands_info[commands]['help']) > type_spacer:
-                    type_spacer = len(self._commands_info[commands]['help'])
+        # Create the rows of commands and their help descriptions
+        if self.verbose is False:
+            help_lines = [
+                "",
+                f"  {'Command':{spacing}} {'Description'}",
+                f"  {'-------':{spacing}} {'-----------'}",
+                *(f"  {commands:{spacing}} {command_info.help}" for commands, command_info in commands_dict.items()),
+                "",
+                "",
+            ]
+
+        # Create the rows of commands, their help descriptions and the commands types
+        else:
+            help_lines = [
+                "",
+                f"  {'Command':{spacing}} {'Description':{type_spacing}} {'Type'}",
+                f"  {'-------':{spacing}} {'-----------':{type_spacing}} {'----'}",
+                *(f"  {commands:{spacing}} {command_info.help:{type_spacing}} {command_info.type}"
+                  for commands, command_info in commands_dict.items()),
+                "",
+                "",
+            ]
+
+        self._help_cache[(help_scope, self.verbose)] = "\n".join(help_lines)
+        return self._help_cache[(help_scope, self.verbose)]
 
-                else:
-                    pass
+    def _help_command(self) -> None:
+        """
+        Print the help banner.
+        :return: None
+        """
+        self._write_output(output=self._render_help_table(help_scope=None))
+
+    def _specific_commands_help(self, command_name: str = None) -> None:
+        """
+        Print a help banner containing specific commands.
+        :param command_name: The name or partial name of the command(s) to look for.
+        :return: None
+        """
+        # Look up the commands that start with the given name, along with the base spacing between command names and
+        # descriptions
+        command_help_dict, command_spacer = self._commands_trie.query(command_name)
+
+        # Calculate base spacing between command descriptions and types
+        type_spacer = 0
+        for commands in command_help_dict:
+            if self._commands_info[commands].help_width > type_spacer:
+                type_spacer = self._commands_info[commands].help_width
 
             else:
                 pass
@@ -196,22 +344,35 @@ class MagnetSting:
 
         else:
             if self.verbose is False:
-                print()
-                print(f"  {'Command':{command_spacer}} Description")
-                print(f"  {'-------':{command_spacer}} -----------")
-                for command_help in command_help_dict:
-                    print(f"  {command_help:{command_spacer}} {self._commands_info[command_help]['help']}")
-                print()
+                help_lines = [
+                    "",
+                    f"  {'Command':{command_spacer}} Description",
+                    f"  {'-------':{command_spacer}} -----------",
+                    *(f"  {command_help:{command_spacer}} {self._commands_info[command_help].help}"
+                      for command_help in command_help_dict),
+                    "",
+                    "",
+                ]
 
             else:
-                print()
-                print(f"  {'Command':{command_spacer}} {'Description':{type_spacer}} {'Type'}")
-                print(f"  {'-------':{command_spacer}} {'-----------':{type_spacer}} {'----'}")
+                help_lines = [
+                    "",
+                    f"  {'Command':{command_spacer}} {'Description':{type_spacer}} {'Type'}",
+                    f"  {'-------':{command_spacer}} {'-----------':{type_spacer}} {'----'}",
+                    *(f"  {commands:{command_spacer}} {self._commands_info[commands].help:{type_spacer}} "
+                      f"{self._commands_info[commands].type}" for commands in command_help_dict),
+                    "",
+                    "",
+                ]
+
+            # Show the arguments of an args-type command with an argument schema when it is named in full
+            command_info = self._commands_info.get(command_name)
+            if command_info is not None and command_info.type is _ARGS and command_info.schema is not None:
+                help_lines.extend([*command_info.schema.render_help(command_name=command_name).split("\n")[1:], ""])
+            else:
+                pass
 
-                for commands in command_help_dict:
-                    print(f"  {commands:{command_spacer}} {self._commands_info[commands]['help']:{type_spacer}} "
-                          f"{self._commands_info[commands]['type']}")
-                print()
+            self._write_output(output="\n".join(help_lines))
 
     def _help_command_group(self, group_name: str = None) -> None:
         """
@@ -219,65 +380,38 @@ class MagnetSting:
         :param group_name: The name of the group.
         :return: None
         """
-        # Calculate the amount of spacing needed between the commands and their help descriptions
-        spacing = 0
-        for commands in self._groups_dict[group_name]:
-            if len(commands) > spacing:
-                spacing = len(commands)
-            else:
-                pass
-
-        # Add additional spacing to the len of the longest command name to make the columns more distinct and readable
-        spacing += 5
-
-        # Print commands and their help descriptions
-        if self.verbose is False:
-            print()
-            print(f"  {'Command':{spacing}} {'Description'}")
-            print(f"  {'-------':{spacing}} {'-----------'}")
-            for commands in self._groups_dict[group_name]:
-                print(f"  {commands:{spacing}} {self._groups_dict[group_name][commands]['help']}")
-            print()
-
-        # Print commands, their help descriptions and the commands types
-        else:
-            # Calculate the amount of spacing needed between the command help descriptions and the types
-            type_spacing = 0
-            for command_types in self._groups_dict[group_name]:
-                if len(self._groups_dict[group_name][command_types]["help"]) > type_spacing:
-                    type_spacing = len(self._groups_dict[group_name][command_types]["help"])
-                else:
-                    pass
-
-            # Add additional spacing to the len of the longest command description to make the columns more distinct
-            # and readable
-            type_spacing += 5
-
-            print()
-            print(f"  {'Command':{spacing}} {'Description':{type_spacing}} {'Type'}")
-            print(f"  {'-------':{spacing}} {'-----------':{type_spacing}} {'----'}")
-
-            for commands in self._groups_dict[group_name]:
-                print(f"  {commands:{spacing}} {self._groups_dict[group_name][commands]['help']:{type_spacing}} "
-                      f"{self._groups_dict[group_name][commands]['type']}")
-            print()
+        self._write_output(output=self._render_help_table(help_scope=group_name))
 
     def _possible_commands(self, command_name: str = None, command_group: str = None) -> None:
         """
         Pretty print possible command names that start with the user input should the input not be in the commands_info
-        dict. The output is displayed in columns, similar to how it would look if using the GNU "column" tool.
+        dict. If no command name starts with the input, the command names (and, outside of command groups, the aliases)
+        that are a typo away from it are printed instead, closest first. The output is displayed in columns, similar to
+        how it would look if using the GNU "column" tool.
         :param command_name: The input from the user.
         :param command_group: The name of the command group if checking commands in a group. If left as None, it will
                               look through the "self._commands_info" dict instead.
         :return: None
         """
 
-        # Initialize list that will hold the commands that start with the user input
+        # Look up the commands that start with the user input, along with the length of the longest one
         if command_group is None:
-            possible_commands_list = [commands for commands in self._commands_info if commands.startswith(command_name)]
+            possible_commands_list, block_spacers = self._commands_trie.query(command_name)
+        else:
+            possible_commands_list, block_spacers = self._group_tries[command_group].query(command_name)
+
+        # Fall back to the names that are closest to the user input
+        if len(possible_commands_list) == 0 and command_group is None:
+            close_matches = sorted([*self._commands_trie.closest(command_name, self.SUGGESTION_COUNT),
+                                    *self._alias_trie.closest(command_name, self.SUGGESTION_COUNT)])
+            possible_commands_list = [names for _, names in close_matches[:self.SUGGESTION_COUNT]]
+            block_spacers = max(map(len, possible_commands_list), default=0)
+        elif len(possible_commands_list) == 0 and command_group is not None:
+            close_matches = self._group_tries[command_group].closest(command_name, self.SUGGESTION_COUNT)
+            possible_commands_list = [names for _, names in close_matches]
+            block_spacers = max(map(len, possible_commands_list), default=0)
         else:
-            possible_commands_list = [commands for commands in self._groups_dict[command_group] if
-                                      commands.startswith(command_name)]
+            pass
 
         # No commands found
         if len(possible_commands_list) == 0 and command_group is None:
@@ -288,14 +422,6 @@ class MagnetSting:
             print(f"[!] No possible command(s) found in group '{command_group}'\n")
 
         else:
-            # Get the length of the longest command name
-            block_spacers = 0
-            for commands in possible_commands_list:
-                if len(commands) > block_spacers:
-                    block_spacers = len(commands)
-                else:
-                    pass
-
             # Add extra spacing to the length of the longest command to be able to better see the commands
             block_spacers += 12
 
@@ -359,23 +485,34 @@ class MagnetSting:
                 if alias_list[2] in self._commands_info or alias_list[2] in self.break_keywords:
                     print(f"[!] Cannot create alias, '{alias_list[2]}' is already in use as a command name\n")
 
-                elif alias_list[3] not in self._commands_info:
-                    print(f"[!] Cannot create alias, the command '{alias_list[3]}' does not exist\n")
+                else:
+                    # Compile the alias right away, which also checks that the aliased command exists
+                    command_str = shlex.join(alias_list[3:])
+                    compiled_alias = self._compile_alias(command_str=command_str)
 
-                elif alias_list[3] in self._groups_dict and alias_list[4] not in self._groups_dict[alias_list[3]]:
-                    print(f"[!] Cannot create alias, '{alias_list[4]}' does not exist as a command in the group "
-                          f"'{alias_list[3]}'\n")
+                    if type(compiled_alias) is str:
+                        print(f"[!] Cannot create alias, {compiled_alias}\n")
 
-                else:
-                    command_str = " ".join(alias_list[3:])
-                    self._alias_dict[alias_list[2]] = command_str
-                    print(f"[+] Added alias '{alias_list[2]}'\n")
+                    else:
+                        self._alias_dict[alias_list[2]] = command_str
+                        self._alias_trie.insert(alias_list[2])
+                        self._alias_cache[alias_list[2]] = compiled_alias
+                        self._parse_cache.clear()
+                        self._invalidate_children()
+                        self._alias_store.record_add(alias_name=alias_list[2], command_str=command_str,
+                                                     alias_dict=self._alias_dict)
+                        print(f"[+] Added alias '{alias_list[2]}'\n")
 
             # Remove a command alias
             elif alias_list[1] == "remove" and len(alias_list) >= 3:
                 for to_del in alias_list[2:]:
                     try:
                         del (self._alias_dict[to_del])
+                        self._alias_trie.remove(to_del)
+                        self._alias_cache.pop(to_del, None)
+                        self._parse_cache.clear()
+                        self._invalidate_children()
+                        self._alias_store.record_remove(alias_name=to_del, alias_dict=self._alias_dict)
 
                     except KeyError:
                         print(f"[!] Alias '{to_del}' does not exist")
@@ -388,8 +525,486 @@ class MagnetSting:
                 print("[*] Use 'alias add <alias name> <command>' to add/edit aliases or 'alias remove <alias name(s)>'"
                       " to remove aliases\n")
 
+    def _stats_command(self, stats_list: list = None) -> int:
+        """
+        Method to view and reset the command latencies collected when `instrument` is enabled.
+        :param stats_list: The user input split into a list
+        :return: The exit status of the command.
+        """
+        # Reset all latencies
+        if len(stats_list) > 1 and stats_list[1] == "reset":
+            self._stats.reset()
+            print("[-] Reset command latencies\n")
+
+        # View the latency of each phase of a command
+        elif len(stats_list) > 1:
+            command_name = " ".join(stats_list[1:])
+            if command_name not in self._stats:
+                print(f"[!] No latencies recorded for '{command_name}'\n")
+                return 1
+
+            self._write_output(output=self._stats.render(command_name=command_name))
+
+        elif len(self._stats) == 0:
+            print("[*] No latencies recorded yet\n")
+
+        # View the total latency of every command
+        else:
+            print("[*] Use 'stats <command>' to split a command's latency into phases or 'stats reset' to reset the "
+                  "latencies")
+            self._write_output(output=self._stats.render())
+
+        return 0
+
+    def _command_caches(self) -> dict:
+        """
+        Get the caches of the commands that were created with a cache.
+        :return: A `dict` of full command names and their caches, in the order the commands were created.
+        """
+        return {
+            command_info.name: command_info.cache
+            for commands_dict in (self._commands_info, *self._groups_dict.values())
+            for command_info in commands_dict.values() if command_info.cache is not None
+        }
+
+    def _cache_command(self, cache_list: list = None) -> int:
+        """
+        Method to view the caches of commands and to clear them.
+        :param cache_list: The user input split into a list
+        :return: The exit status of the command.
+        """
+        command_caches = self._command_caches()
+
+        # Clear the cache of every command or of specific commands
+        if len(cache_list) > 1 and cache_list[1] == "clear":
+            command_name = " ".join(cache_list[2:])
+            if command_name == "":
+                for caches in command_caches.values():
+                    caches.clear()
+                print("[-] Cleared all cached command output\n")
+
+            elif command_name in command_caches:
+                command_caches[command_name].clear()
+                print(f"[-] Cleared cached output of '{command_name}'\n")
+
+            else:
+                print(f"[!] Command '{command_name}' has no cache\n")
+                return 1
+
+        elif len(cache_list) > 1 and cache_list[1] != "stats":
+            print("[*] Use 'cache stats' to view the caches of commands or 'cache clear [<command>]' to clear them\n")
+            return 2
+
+        # View the caches of every command
+        else:
+            spacer = max([len("Command"), *(len(names) for names in command_caches)]) + 5
+            cache_lines = [
+                "",
+                f"  {'Command':{spacer}} {'Size':>8} {'Max':>8} {'TTL (s)':>10} {'Hits':>10} {'Misses':>10} "
+                f"{'Evictions':>10}",
+                f"  {'-------':{spacer}} {'----':>8} {'---':>8} {'-------':>10} {'----':>10} {'------':>10} "
+                f"{'---------':>10}",
+                *(f"  {names:{spacer}} {len(caches):>8} {caches.max_size:>8} "
+                  f"{'-' if caches.ttl is None else f'{caches.ttl:g}':>10} {caches.hits:>10} {caches.misses:>10} "
+                  f"{caches.evictions:>10}" for names, caches in command_caches.items()),
+                "",
+                "",
+            ]
+            self._write_output(output="\n".join(cache_lines))
+
+        return 0
+
+    def _compile_alias(self, command_str: str = None) -> tuple | str:
+        """
+        Compile the command assigned to an alias into the information of the command it runs and the tokens that are
+        placed before any arguments typed after the alias name. Compiled aliases are kept in the alias cache, so
+        running an alias does not have to split and look up its command again.
+        :param command_str: The full command assigned to the alias.
+        :return: A tuple of the record holding the aliased command's information and the `list` of tokens that start
+                 the full command list (the command name followed by the aliased arguments), or a `string` describing
+                 why the alias cannot be executed.
+        """
+        try:
+            alias_list = shlex.split(command_str)
+        except ValueError as exc:
+            return f"its command cannot be parsed ({exc})"
+
+        if len(alias_list) == 0:
+            return "the command or command group '' does not exist"
+
+        # Follow the command through its command groups
+        command_info, position, command_group = self._walk_command_path(split_command=alias_list)
+
+        # Check if first element in alias_list actually exists as a command or command group
+        if command_info is None and command_group is None:
+            return f"the command or command group '{alias_list[0]}' does not exist"
+
+        # Check if command exists in group
+        elif command_info is None:
+            return f"the command '{alias_list[position]}' does not exist in the group '{command_group}'"
+
+        # Check if only command group names were given
+        elif command_info.type is _GROUP:
+            return f"no command in the group '{command_info.name}' was given"
+
+        else:
+            return command_info, alias_list[position:]
+
+    def _parallel_command(self, parallel_list: list = None, cancelled: threading.Event = None) -> int:
+        """
+        Method to run an `args-type` command once for each of many argument sets, using a pool of worker threads (or
+        processes). The syntax is `parallel [-j <workers>] [--processes] <command> [<args>] ::: <arg> <arg> ...`, where
+        each value after ":::" is one argument set, or `... :::: <file>`, where each line of the file is one argument
+        set. Any arguments typed before the separator are passed before each argument set. The output of each call is
+        captured and printed as soon as the call finishes, and an exception in one call does not affect the others.
+        Calls still running once the timeout of the command expires are given up on and count as failed calls.
+        :param parallel_list: The user input split into a list.
+        :param cancelled: An event that cancels the calls when it is set, used when the command runs on a worker thread
+                          (where Ctrl-C is not raised). Can be left as None.
+        :return: The exit status of the command. 0 if every call succeeded, 1 if any call failed.
+        """
+        usage = ("[*] Use 'parallel [-j <workers>] [--processes] <command> [<args>] ::: <arg> <arg> ...' or "
+                 "'parallel [-j <workers>] [--processes] <command> [<args>] :::: <file>'\n")
+
+        # Get the options
+        parallel_tokens = [tokens for tokens in parallel_list[1:] if tokens != ""]
+        workers = os.cpu_count() or 1
+        use_processes = False
+        while len(parallel_tokens) > 0 and parallel_tokens[0] in ("-j", "--processes"):
+            if parallel_tokens[0] == "--processes":
+                use_processes = True
+                parallel_tokens = parallel_tokens[1:]
+
+            elif len(parallel_tokens) > 1 and parallel_tokens[1].isdigit() and int(parallel_tokens[1]) > 0:
+                workers = int(parallel_tokens[1])
+                parallel_tokens = parallel_tokens[2:]
+
+            else:
+                print(usage)
+                return 2
+
+        # Split the command from the argument sets
+        if ":::" in parallel_tokens:
+            separator = parallel_tokens.index(":::")
+            arg_sets = [[args] for args in parallel_tokens[separator + 1:]]
+
+        elif "::::" in parallel_tokens and len(parallel_tokens) > parallel_tokens.index("::::") + 1:
+            separator = parallel_tokens.index("::::")
+            try:
+                with open(parallel_tokens[separator + 1], "r") as args_read:
+                    arg_sets = [shlex.split(lines) for lines in args_read if lines.strip() != ""]
+
+            except (OSError, ValueError) as exc:
+                print(f"[!] Could not read argument sets: {exc}\n")
+                return 1
+
+        else:
+            print(usage)
+            return 2
+
+        if separator == 0 or len(arg_sets) == 0:
+            print(usage)
+            return 2
+
+        # Find the command, return early if it does not exist
+        resolved = self._resolve_command(split_command=parallel_tokens[:separator])
+        if type(resolved) is int:
+            return resolved
+
+        command_info, full_command_list = resolved
+        if command_info.type is not _ARGS:
+            print(f"[!] Cannot run '{full_command_list[0]}' in parallel, only args-type commands can be\n")
+            return 2
+
+        # Import the function if it was registered by import path
+        try:
+            function = self._command_function(command_info=command_info)
+
+        except (ImportError, AttributeError) as exc:
+            print(f"[!] Could not import '{command_info.import_path}': {exc}\n")
+            return 1
+
+        # Check and convert every argument set up front if the command has an argument schema, leaving out the sets
+        # that do not match it. Sets are kept by their position, so repeated sets are each called
+        calls = []
+        for index, args in enumerate(arg_sets):
+            if command_info.schema is None:
+                calls.append((index, args, full_command_list[1:] + args))
+                continue
+
+            parsed_args = command_info.schema.parse(tokens=full_command_list[1:] + args)
+            if type(parsed_args) is dict:
+                calls.append((index, args, parsed_args))
+            else:
+                print(f"[!] {shlex.join(args)}: {parsed_args or 'help cannot be shown in parallel'}")
+
+        # Run the command over every argument set, printing the results in the order the calls finish
+        if use_processes is True:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+        # Each call is stopped once the timeout of the command expires, and Ctrl-C (or cancelling the command in the
+        # asynchronous mainloop) cancels the calls that have not started yet rather than waiting for all of them
+        timeout = self._command_timeout(command_info=command_info)
+        succeeded = 0
+        try:
+            futures = {
+                executor.submit(_call_captured_with_timeout, function, {
+                    "command_args": command_args,
+                    "additional_data": command_info.additional,
+                }, timeout): index
+                for index, args, command_args in calls
+            }
+
+            pending = set(futures)
+            while len(pending) > 0:
+                done, pending = concurrent.futures.wait(pending, timeout=None if cancelled is None else 0.1,
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                if cancelled is not None and cancelled.is_set():
+                    raise KeyboardInterrupt
+                else:
+                    pass
+
+                for future in done:
+                    label = shlex.join(arg_sets[futures[future]])
+                    try:
+                        output = future.result()
+
+                    except _CommandTimeout:
+                        print(f"[!] {label}: timed out after {timeout:g} second(s)")
+
+                    except Exception as exc:
+                        print(f"[!] {label}: {type(exc).__name__}: {exc}")
+
+                    else:
+                        succeeded += 1
+                        print(f"[+] {label}")
+                        if output != "":
+                            print(output, end="" if output.endswith("\n") else "\n")
+                        else:
+                            pass
+
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        executor.shutdown(wait=True)
+        print(f"\n[*] {succeeded} of {len(arg_sets)} call(s) succeeded\n")
+        return 0 if succeeded == len(arg_sets) else 1
+
+    def _completion_candidates(self, text: str = None, line_tokens: list = None) -> list:
+        """
+        Get the names that can complete the word currently being typed. The names are taken from the prefix tries, so
+        the cost depends on the length of the word and the number of matches rather than on the number of commands.
+        :param text: The word currently being typed.
+        :param line_tokens: The words typed before the word currently being typed.
+        :return: A list of the possible completions.
+        """
+        # Completing the first word: command names, command group names, built-ins and aliases
+        if len(line_tokens) == 0:
+            return [*self._commands_trie.iter_prefix(text), *self._alias_trie.iter_prefix(text)]
+
+        # Commands (and command groups) within a command group, at any depth
+        elif " ".join(line_tokens) in self._group_tries:
+            return list(self._group_tries[" ".join(line_tokens)].iter_prefix(text))
+
+        else:
+            pass
+
+        # Option names and choices of args-type commands with an argument schema
+        command_info, position, _ = self._walk_command_path(split_command=line_tokens)
+        if command_info is not None and command_info.type is _ARGS and command_info.schema is not None:
+            return command_info.schema.complete(text=text, tokens=line_tokens[position + 1:])
+
+        # Completing the second word
+        elif len(line_tokens) == 1:
+            # Command names for "help <command name>"
+            if line_tokens[0] == "help":
+                return list(self._commands_trie.iter_prefix(text))
+
+            # Alias operations
+            elif line_tokens[0] == "alias":
+                return [operations for operations in ("add", "remove") if operations.startswith(text)]
+
+            else:
+                return []
+
+        # Alias names for "alias remove <alias name(s)>" and "alias add <alias name>"
+        elif line_tokens[0] == "alias" and (line_tokens[1] == "remove" or len(line_tokens) == 2):
+            return list(self._alias_trie.iter_prefix(text))
+
+        # The command for "alias add <alias name> <command>"
+        elif line_tokens[0] == "alias" and line_tokens[1] == "add":
+            return self._completion_candidates(text=text, line_tokens=line_tokens[3:])
+
+        else:
+            return []
+
+    def _complete(self, text: str = None, state: int = None) -> str | None:
+        """
+        Completer function registered with readline. Readline calls it with increasing values of `state` until it
+        returns None, so the matches are only looked up once, when `state` is 0.
+        :param text: The word currently being typed.
+        :param state: The index of the match to return.
+        :return: The match at index `state`, or None if there are no more matches.
+        """
+        if state == 0:
+            line_tokens = readline.get_line_buffer()[:readline.get_begidx()].split()
+            self._completion_matches = self._completion_candidates(text=text, line_tokens=line_tokens)
+
+        else:
+            pass
+
+        if state < len(self._completion_matches):
+            return self._completion_matches[state]
+
+        else:
+            return None
+
+    def _add_command(self, command_name: str = None, command_group: str = None,
+                     command_info: _CommandRecord = None) -> None:
+        """
+        Add a command's information to the commands dict (or to a command group) and to the matching prefix trie.
+        :param command_name: The `name` of the command.
+        :param command_group: The `group` the command belongs to. None if it does not belong to any group.
+        :param command_info: The record holding the command's information.
+        :return: None
+        """
+        # Compiled aliases and cached dispatch plans may refer to the command being replaced or to a command that did
+        # not exist until now
+        self._alias_cache.clear()
+        self._parse_cache.clear()
+        self._invalidate_children()
+
+        # Keep the full name of the command, which is used when reporting on the command
+        command_info.name = command_name.strip() if command_group is None else \
+            f"{' '.join(command_group.split())} {command_name.strip()}"
+
+        if command_group is None:
+            help_scope = None
+            commands_dict = self._commands_info
+            self._commands_trie.insert(command_name.strip())
+
+        else:
+            if " ".join(command_group.split()) in self._groups_dict:
+                help_scope = " ".join(command_group.split())
+                commands_dict, group_trie = self._group_layer(group_path=help_scope)
+                group_trie.insert(command_name.strip())
+
+            else:
+                raise NotImplementedError(f"Group '{command_group}' does not exist")
+
+        # Update the help banner column widths, replacing a command means they have to be calculated from scratch
+        if command_name.strip() in commands_dict:
+            self._help_widths.pop(help_scope, None)
+
+        elif help_scope in self._help_widths:
+            self._help_widths[help_scope][0] = max(self._help_widths[help_scope][0], len(command_name.strip()))
+            self._help_widths[help_scope][1] = max(self._help_widths[help_scope][1], command_info.help_width)
+
+        else:
+            pass
+
+        commands_dict[command_name.strip()] = command_info
+        self._help_cache.pop((help_scope, True), None)
+        self._help_cache.pop((help_scope, False), None)
+
+    def _group_layer(self, group_path: str = None) -> tuple:
+        """
+        Get the commands dict and prefix trie of a command group that commands are added to. A child instance adds
+        commands to a layer over the group of its parent, which is created the first time it adds a command to it.
+        :param group_path: The path of the group.
+        :return: A `tuple` of the commands dict and the prefix trie of the group.
+        """
+        if self._parent is not None and group_path not in self._groups_dict.maps[0]:
+            self._groups_dict[group_path] = _Overlay(parent=self._groups_dict[group_path])
+            self._group_tries[group_path] = _PrefixTrie(parent=self._group_tries[group_path])
+        else:
+            pass
+
+        return self._groups_dict[group_path], self._group_tries[group_path]
+
+    def _invalidate_children(self) -> None:
+        """
+        Clear the caches of the child instances (and their children), which may refer to commands and aliases of this
+        instance that were changed.
+        :return: None
+        """
+        # Called for every command that is registered, and copying the weak set is much slower than checking its size
+        if len(self._children) == 0:
+            return
+
+        for children in list(self._children):
+            children._alias_cache.clear()
+            children._parse_cache.clear()
+            children._help_cache.clear()
+            children._help_widths.clear()
+            children._invalidate_children()
+
+    @staticmethod
+    def _check_import_path(command_function: object = None) -> str | None:
+        """
+        Check the import path of a function registered by import path. Nothing is imported at this point.
+        :param command_function: The `function` assigned to the command, or its import path.
+        :return: The import path, or None if the function was not registered by import path.
+        """
+        if type(command_function) is not str:
+            return None
+
+        elif command_function.count(":") != 1 or "" in command_function.split(":"):
+            raise ValueError(f"Import path '{command_function}' is not in the form 'package.module:function'")
+
+        else:
+            return command_function
+
+    @staticmethod
+    def _command_function(command_info: _CommandRecord = None) -> object:
+        """
+        Get the function assigned to a `single-` or `args-type` command. Functions registered by import path are
+        imported the first time this is called and the function then replaces the import path in the command's
+        information, so the import only happens once.
+        :param command_info: The record holding the command's information.
+        :return: The function.
+        """
+        if type(command_info.function) is str:
+            module_name, function_name = command_info.function.split(":")
+            function = importlib.import_module(module_name)
+            for attributes in function_name.split("."):
+                function = getattr(function, attributes)
+            command_info.function = function
+
+        else:
+            pass
+
+        return command_info.function
+
+    def _prewarm(self) -> None:
+        """
+        Import the functions of the commands registered by import path, as selected by the `prewarm_commands`
+        parameter. Meant to run in a background thread, any import errors are left for when the command is called.
+        :return: None
+        """
+        # Gather the commands from the commands dict and the command groups, keyed by their full names
+        lazy_commands = {
+            command_info.name: command_info
+            for commands_dict in (self._commands_info, *self._groups_dict.values())
+            for command_info in commands_dict.values() if type(command_info.function) is str
+        }
+
+        for command_name, command_info in lazy_commands.items():
+            if self.prewarm_commands is True or command_name in self.prewarm_commands:
+                try:
+                    self._command_function(command_info=command_info)
+                except Exception:
+                    pass
+            else:
+                pass
+
     def add_command_type_single(self, command_name: str = None, command_help: str = None, command_group: str = None,
-                                command_function: object = None, additional_data: tuple = None) -> None:
+                                command_function: object = None, additional_data: tuple = None,
+                                cache_size: int = None, cache_ttl: float = None,
+                                command_timeout: float = None) -> None:
         """
         Create a `single-type` command. A single-type command consists only of a command name that when called,
         executes the function assigned to it. Anything typed after the command name is not passed to the function
@@ -398,70 +1013,86 @@ class MagnetSting:
         :param command_name: The `name` of the command.
         :param command_help: A short `descriptor` about what the command does.
         :param command_group: The `group` the command belongs to. Can be left as None if it does not belong to any
-                              group.
-        :param command_function: The `function` assigned to the command.
+                              group. Nested command groups are given by their path (ex. "parent child").
+        :param command_function: The `function` assigned to the command. Rather than the function itself, this can
+                                 also be the import path of the function as a `string` in the form
+                                 "package.module:function". The module is then only imported the first time the
+                                 command is called, which keeps start-up fast when there are many commands that rely on
+                                 heavy modules.
         :param additional_data: `Additional data` that gets sent over to the command's function.
+        :param cache_size: Keep the output of the last `cache_size` calls of the command, so that calling the command
+                           again with the same arguments replays its output rather than running it again. Only calls
+                           that succeed are kept. Can be left as None to not cache the command.
+        :param cache_ttl: The number of `seconds` the output of a call is kept. Can be left as None to keep it until it
+                          is evicted.
+        :param command_timeout: The number of `seconds` after which the command is stopped, overriding the
+                                `command_timeout` of the instance. Set it to 0 to never stop the command. Can be left
+                                as None to use the `command_timeout` of the instance.
         :return: None
         """
-        if command_group is None:
-            self._commands_info[command_name.strip()] = {
-                "type": "single",
-                "function": command_function,
-                "help": command_help,
-                "additional": additional_data,
-            }
-
-        else:
-            if command_group.strip() in self._groups_dict:
-                self._groups_dict[command_group.strip()][command_name.strip()] = {
-                    "type": "single",
-                    "function": command_function,
-                    "help": command_help,
-                    "additional": additional_data,
-                }
-
-            else:
-                raise NotImplementedError(f"Group '{command_group}' does not exist")
+        self._check_timeout(timeout=command_timeout)
+        self._add_command(command_name=command_name, command_group=command_group, command_info=_CommandRecord(
+            command_type=_SINGLE,
+            command_help=command_help,
+            function=command_function,
+            additional=additional_data,
+            import_path=self._check_import_path(command_function=command_function),
+            cache=None if cache_size is None else _ResultCache(max_size=cache_size, ttl=cache_ttl),
+            timeout=command_timeout,
+        ))
 
     def add_command_type_args(self, command_name: str = None, command_help: str = None, command_group: str = None,
-                              command_function: object = None, additional_data: tuple = None) -> None:
+                              command_function: object = None, additional_data: tuple = None,
+                              cache_size: int = None, cache_ttl: float = None,
+                              command_timeout: float = None, command_schema: list = None) -> None:
         """
         Create an `args-type` command. An args-type command differs from a `single-type` command by being able to take
         arguments after the command name. For example, if the command name is `foo`, then you can do: "foo bar baz",
         with "bar baz" being the argument(s). There are no limits on how many arguments there can be, they can be as
         long and as many as you would like. If you do not provide an argument to an args-type command, a message will be
         printed telling you that some form of an argument is required. Functions used in args-type commands **MUST**
-        have the following function parameters: `command_args: list` **AND** `additional_data: tuple`.
+        have the following function parameters: `command_args: list` **AND** `additional_data: tuple`. If the command
+        has an argument schema, `command_args` is a `dict` of the checked and converted arguments instead.
         :param command_name: The `name` of the command.
         :param command_help: A short `descriptor` about what the command does.
         :param command_group: The `group` the command belongs to. Can be left as None if it does not belong to any
-                              group.
-        :param command_function: The `function` assigned to the command.
+                              group. Nested command groups are given by their path (ex. "parent child").
+        :param command_function: The `function` assigned to the command. Rather than the function itself, this can
+                                 also be the import path of the function as a `string` in the form
+                                 "package.module:function", in which case the module is only imported the first time
+                                 the command is called.
         :param additional_data: 'Additional data' that gets sent over to the command's function.
+        :param cache_size: Keep the output of the last `cache_size` calls of the command, so that calling the command
+                           again with the same arguments replays its output rather than running it again. Only calls
+                           that succeed are kept. Can be left as None to not cache the command.
+        :param cache_ttl: The number of `seconds` the output of a call is kept. Can be left as None to keep it until it
+                          is evicted.
+        :param command_timeout: The number of `seconds` after which the command is stopped, overriding the
+                                `command_timeout` of the instance. Set it to 0 to never stop the command. Can be left
+                                as None to use the `command_timeout` of the instance.
+        :param command_schema: A `list` of the arguments the command takes, each a `dict` with a "name" and optionally a
+                               "short" name, "type", "default", "choices", "many" and "help" (see the "Argument
+                               Schemas" section of the README). The arguments are then checked and converted before
+                               the function is called, "<command> --help" shows them and tab completion suggests their
+                               names and choices. The schema is checked and compiled right away, a `ValueError` is
+                               raised if it is not valid. Can be left as None to pass the arguments as they are typed.
         :return: None
         """
-        if command_group is None:
-            self._commands_info[command_name.strip()] = {
-                "type": "args",
-                "function": command_function,
-                "help": command_help,
-                "additional": additional_data,
-            }
-
-        else:
-            if command_group.strip() in self._groups_dict:
-                self._groups_dict[command_group.strip()][command_name.strip()] = {
-                    "type": "args",
-                    "function": command_function,
-                    "help": command_help,
-                    "additional": additional_data,
-                }
-
-            else:
-                raise NotImplementedError(f"Group '{command_group}' does not exist")
+        self._check_timeout(timeout=command_timeout)
+        self._add_command(command_name=command_name, command_group=command_group, command_info=_CommandRecord(
+            command_type=_ARGS,
+            command_help=command_help,
+            function=command_function,
+            additional=additional_data,
+            import_path=self._check_import_path(command_function=command_function),
+            cache=None if cache_size is None else _ResultCache(max_size=cache_size, ttl=cache_ttl),
+            timeout=command_timeout,
+            schema=None if command_schema is None else _ArgSchema(spec=command_schema),
+        ))
 
     def add_command_type_file(self, command_name: str = None, command_help: str = None, command_group: str = None,
-                              command_file: str = None) -> None:
+                              command_file: str = None, command_runner: str = None, cache_size: int = None,
+                              cache_ttl: float = None, command_timeout: float = None) -> None:
         """
         Create a `file-type` command. A file-type command is different from the other commands. Rather than
         executing functions associated to command names like `single-` and `args-type` commands, instead executes
@@ -476,29 +1107,38 @@ class MagnetSting:
         :param command_name: The `name` of the command.
         :param command_help: A short `descriptor` about what the command does.
         :param command_group: The `group` the command belongs to. Can be left as None if it does not belong to any
-                              group.
+                              group. Nested command groups are given by their path (ex. "parent child").
         :param command_file: The name and (if needed) the `full or relative path` of the file assigned to the command.
+        :param command_runner: How the file is executed: `"subprocess"`, `"in-process"` or `"fork-server"` (see the
+                               `file_runner` parameter of the class initialization). Can be left as None to use the
+                               `file_runner` of the instance.
+        :param cache_size: Keep the output of the last `cache_size` runs of the file, so that calling the command again
+                           with the same arguments replays its output rather than running the file again, as long as
+                           the file has not been modified since. Only runs that succeed are kept. Can be left as None to
+                           not cache the command.
+        :param cache_ttl: The number of `seconds` the output of a run is kept. Can be left as None to keep it until it
+                          is evicted.
+        :param command_timeout: The number of `seconds` after which the command is stopped, overriding the
+                                `command_timeout` of the instance. Set it to 0 to never stop the command. Can be left
+                                as None to use the `command_timeout` of the instance.
         :return: None
         """
-        if command_group is None:
-            self._commands_info[command_name.strip()] = {
-                "type": "file",
-                "file": command_file,
-                "help": command_help,
-            }
-
+        if command_runner is not None:
+            self._check_file_runner(file_runner=command_runner)
         else:
-            if command_group.strip() in self._groups_dict:
-                self._groups_dict[command_group.strip()][command_name.strip()] = {
-                    "type": "file",
-                    "file": command_file,
-                    "help": command_help,
-                }
-
-            else:
-                raise NotImplementedError(f"Group '{command_group}' does not exist")
+            pass
 
-    def add_command_group(self, group_name: str = None, group_help: str = None) -> None:
+        self._check_timeout(timeout=command_timeout)
+        self._add_command(command_name=command_name, command_group=command_group, command_info=_CommandRecord(
+            command_type=_FILE,
+            command_help=command_help,
+            file=command_file,
+            runner=command_runner,
+            cache=None if cache_size is None else _ResultCache(max_size=cache_size, ttl=cache_ttl),
+            timeout=command_timeout,
+        ))
+
+    def add_command_group(self, group_name: str = None, group_help: str = None, parent_group: str = None) -> None:
         """
         Create a `command group`. A command group is, as the name suggests, a group of commands. Groups can be used to
         organize commands and to keep the main help banner from becoming too long and overwhelming. Any command can be
@@ -506,46 +1146,772 @@ class MagnetSting:
         show up in the main help banner, rather, only the command group is shown. To see all commands assigned to a
         group, enter the group name and a help banner containing only the commands in the group will be shown. The
         syntax to call a command in a command group is: <command group name> <command name>
-        <args (if args- or file-type)>.
+        <args (if args- or file-type)>. Command groups can also be created within other command groups, to any depth.
+        A nested command group is referred to by its path, which is the names of the groups leading up to it followed by
+        its own name (ex. "parent child"), and its commands are called with <parent name> <child name> <command name>.
         :param group_name: The `name` of the group.
         :param group_help: A short `description` of the group.
+        :param parent_group: The path of the `group` the group belongs to. Can be left as None if it does not belong to
+                             any group.
         :return: None
         """
-        # Add group to groups dict
-        self._groups_dict[group_name.strip()] = {}
-        # Add group info to commands dict
-        self._commands_info[group_name.strip()] = {
-            "type": "group",
-            "help": group_help,
-        }
+        # Add group info to commands dict (or to the parent group), its full name is the path of the group
+        group_info = _CommandRecord(command_type=_GROUP, command_help=group_help)
+        self._add_command(command_name=group_name, command_group=parent_group, command_info=group_info)
+        self._reset_group(group_path=group_info.name)
 
-    def magnetsting_mainloop(self) -> None:
+    def _reset_group(self, group_path: str = None) -> None:
         """
-        This method handles all `MagnetSting` operations. Call this method once all the commands and command
-        groups have been created.
+        Give a command group that was just added an empty commands dict, prefix trie and help banner, removing the
+        nested groups it had if it replaced a group of the same name.
+        :param group_path: The path of the group.
         :return: None
         """
-        # Add built-in commands to commands dict
-        self._commands_info["alias"] = {
-            "type": "built-in",
-            "help": "add, remove and view aliases",
-        }
+        # Remove the nested groups of a group that is being replaced, a new group cannot have any yet
+        if group_path in self._groups_dict:
+            for nested_groups in [groups for groups in self._groups_dict if groups.startswith(f"{group_path} ")]:
+                del self._groups_dict[nested_groups]
+                del self._group_tries[nested_groups]
+                self._help_widths.pop(nested_groups, None)
+                self._help_cache.pop((nested_groups, True), None)
+                self._help_cache.pop((nested_groups, False), None)
+        else:
+            pass
 
-        self._commands_info["clear"] = {
-            "type": "built-in",
-            "help": "clear the screen",
-        }
+        # Add group to groups dict, along with an empty index and help banner for its commands
+        self._groups_dict[group_path] = {}
+        self._group_tries[group_path] = _PrefixTrie()
+        self._help_widths[group_path] = [0, 0]
+        self._help_cache.pop((group_path, True), None)
+        self._help_cache.pop((group_path, False), None)
 
-        self._commands_info["help"] = {
-            "type": "built-in",
-            "help": "print this help banner",
-        }
+    @staticmethod
+    def _check_file_runner(file_runner: str = None) -> None:
+        """
+        Check that a file runner exists.
+        :param file_runner: The name of the file runner.
+        :return: None
+        """
+        if file_runner not in ("subprocess", "in-process", "fork-server"):
+            raise ValueError(f"File runner '{file_runner}' does not exist, use 'subprocess', 'in-process' or "
+                             f"'fork-server'")
+        else:
+            pass
 
-        self._commands_info[self.break_keywords[0]] = {
-            "type": "built-in",
-            "help": self.exit_description,
-        }
+    @staticmethod
+    def _check_timeout(timeout: float = None) -> None:
+        """
+        Check that a timeout is a number of seconds that is not negative.
+        :param timeout: The timeout.
+        :return: None
+        """
+        if timeout is not None and (type(timeout) not in (int, float) or timeout < 0):
+            raise ValueError(f"Timeout '{timeout}' is not a number of seconds")
+        else:
+            pass
+
+    def _command_timeout(self, command_info: _CommandRecord = None) -> float | None:
+        """
+        Get the timeout of a command: its own timeout if it has one, otherwise the timeout of the instance.
+        :param command_info: The record holding the command's information.
+        :return: The timeout in seconds, or None if the command is never stopped.
+        """
+        timeout = self.command_timeout if command_info.timeout is None else command_info.timeout
+        return None if timeout == 0 else timeout
+
+    def _run_file(self, command_info: _CommandRecord = None, file_args: list = None, timeout: float = None) -> int:
+        """
+        Execute the file of a file-type command with the command's file runner.
+        :param command_info: The record holding the command's information.
+        :param file_args: The `list` of arguments passed to the file.
+        :param timeout: The number of seconds after which the file is stopped, or None for no timeout.
+        :return: The exit status of the file.
+        """
+        file_runner = command_info.runner if command_info.runner is not None else self.file_runner
+
+        # Files run in this interpreter cannot be stopped, and abandoning one would leave it holding the swapped
+        # `sys.argv` and `sys.path`, so files that have a timeout run in their own process instead
+        if file_runner == "in-process" and timeout is not None:
+            file_runner = "fork-server"
+        else:
+            pass
+
+        # Files run in another process write to the terminal directly, so their output has to be copied over when the
+        # output of this thread is redirected
+        if file_runner != "in-process" and _stdout_redirected():
+            return _run_file_subprocess(command_file=command_info.file, file_args=file_args, capture=True,
+                                        timeout=timeout)
+
+        elif file_runner == "in-process":
+            return _run_file_in_process(command_file=command_info.file, file_args=file_args)
+
+        elif file_runner == "fork-server":
+            # The worker is forked from this process, which is not possible on every platform
+            if hasattr(os, "fork"):
+                return self._fork_server.run(command_file=command_info.file, file_args=file_args, timeout=timeout)
+            else:
+                return _run_file_subprocess(command_file=command_info.file, file_args=file_args, timeout=timeout)
+
+        else:
+            return _run_file_subprocess(command_file=command_info.file, file_args=file_args, timeout=timeout)
+
+    def _add_builtin_commands(self) -> None:
+        """
+        Add the built-in commands to the commands dict.
+        :return: None
+        """
+        self._add_command(command_name="alias", command_group=None, command_info=_CommandRecord(
+            command_type=_BUILT_IN,
+            command_help="add, remove and view aliases",
+        ))
+
+        self._add_command(command_name="clear", command_group=None, command_info=_CommandRecord(
+            command_type=_BUILT_IN,
+            command_help="clear the screen",
+        ))
+
+        self._add_command(command_name="help", command_group=None, command_info=_CommandRecord(
+            command_type=_BUILT_IN,
+            command_help="print this help banner",
+        ))
+
+        # A command of the user that is named "parallel" is left in place of the built-in command
+        if "parallel" not in self._commands_info or self._is_builtin(command_name="parallel"):
+            self._add_command(command_name="parallel", command_group=None, command_info=_CommandRecord(
+                command_type=_BUILT_IN,
+                command_help="run a command over many arguments",
+            ))
+
+        else:
+            pass
+
+        # Likewise for a command named "stats"
+        if self._stats is not None and ("stats" not in self._commands_info or self._is_builtin(command_name="stats")):
+            self._add_command(command_name="stats", command_group=None, command_info=_CommandRecord(
+                command_type=_BUILT_IN,
+                command_help="view command latencies",
+            ))
+
+        else:
+            pass
+
+        # Likewise for a command named "cache"
+        if len(self._command_caches()) > 0 and ("cache" not in self._commands_info or
+                                                self._is_builtin(command_name="cache")):
+            self._add_command(command_name="cache", command_group=None, command_info=_CommandRecord(
+                command_type=_BUILT_IN,
+                command_help="view and clear cached command output",
+            ))
+
+        else:
+            pass
+
+        # A child instance leaves out the exit command of its parent, unless the keyword also exits the child
+        if self._parent is not None and self._parent.break_keywords[0] not in self.break_keywords and \
+                self._parent.break_keywords[0] in self._commands_info:
+            del self._commands_info[self._parent.break_keywords[0]]
+            self._commands_trie.remove(self._parent.break_keywords[0])
+            self._help_widths.pop(None, None)
+        else:
+            pass
+
+        self._add_command(command_name=self.break_keywords[0], command_group=None, command_info=_CommandRecord(
+            command_type=_BUILT_IN,
+            command_help=self.exit_description,
+        ))
+
+    def _load_aliases(self) -> None:
+        """
+        Load the aliases from the alias file and its journal into the alias dict. Child instances use the aliases of
+        their parent instead.
+        :return: None
+        """
+        if self._parent is not None:
+            return
+
+        else:
+            pass
+
+        # If the alias file does not exist, it will be created when MagnetSting exits. The alias dict and trie are
+        # updated in place, since child instances are layered over them.
+        self._alias_dict.clear()
+        self._alias_dict.update(self._alias_store.load())
+        self._alias_trie.clear()
+        for alias_name in self._alias_dict:
+            self._alias_trie.insert(alias_name)
+
+        # Compile the aliases, reporting any that refer to commands that do not exist (anymore)
+        self._alias_cache = {}
+        self._parse_cache.clear()
+        self._invalidate_children()
+        for alias_name, command_str in self._alias_dict.items():
+            self._alias_cache[alias_name] = self._compile_alias(command_str=command_str)
+            if type(self._alias_cache[alias_name]) is str:
+                print(f"[!] Alias '{alias_name}' cannot be executed, {self._alias_cache[alias_name]}")
+            else:
+                pass
+
+    def _save_aliases(self) -> None:
+        """
+        Write the aliases in the alias dict to the alias file. Changes are already saved to the alias file's journal
+        as they are made, this only compacts the journal into the alias file.
+        :return: None
+        """
+        self._alias_store.close(alias_dict=self._alias_dict)
+
+    def _shutdown(self) -> None:
+        """
+        Write the aliases to the alias file, give back the readline completer and word delimiters, stop the file runner
+        worker and close the latency export file. Child instances leave the worker and the export file, which they
+        share with their parent, open.
+        :return: None
+        """
+        self._save_aliases()
+        if self._saved_readline is not None:
+            readline.set_completer(self._saved_readline[0])
+            readline.set_completer_delims(self._saved_readline[1])
+            self._saved_readline = None
+        else:
+            pass
+
+        if self._parent is not None:
+            return
+
+        else:
+            pass
+
+        self._fork_server.close()
+        if self._stats is not None:
+            self._stats.close()
+        else:
+            pass
+
+    def _is_builtin(self, command_name: str = None) -> bool:
+        """
+        Check if a name is the name of a built-in command.
+        :param command_name: The name.
+        :return: `True` if it is the name of a built-in command, `False` otherwise.
+        """
+        command_info = self._commands_info.get(command_name)
+        return command_info is not None and command_info.type is _BUILT_IN
+
+    def _execute_builtin(self, split_command: list = None) -> int | None:
+        """
+        Execute a built-in command, or show the commands of a command group if only a group name was typed.
+        :param split_command: The user input split into a list.
+        :return: The exit status of the built-in command, or None if the input is not a built-in command.
+        """
+        # Print help banner containing specific commands
+        if len(split_command) > 1 and split_command[0] == "help":
+            self._specific_commands_help(command_name=split_command[1])
+
+        # Print help banner
+        elif split_command[0] == "help":
+            self._help_command()
+
+        # Clear the command line
+        elif split_command[0] == "clear":
+            subprocess.run("clear", shell=True)
+
+        # Call self._alias_command method to handle alias operations
+        elif split_command[0] == "alias":
+            self._alias_command(alias_list=split_command)
+
+        # Call self._parallel_command method to run a command over many arguments at once
+        elif split_command[0] == "parallel" and self._is_builtin(command_name="parallel"):
+            return self._parallel_command(parallel_list=split_command)
+
+        # Call self._stats_command method to view command latencies
+        elif split_command[0] == "stats" and self._is_builtin(command_name="stats"):
+            return self._stats_command(stats_list=split_command)
+
+        # Call self._cache_command method to view and clear cached command output
+        elif split_command[0] == "cache" and self._is_builtin(command_name="cache"):
+            return self._cache_command(cache_list=split_command)
+
+        # Show commands in command group
+        elif " ".join(split_command) in self._groups_dict:
+            self._help_command_group(group_name=" ".join(split_command))
+
+        else:
+            return None
+
+        return 0
+
+    def _walk_command_path(self, split_command: list = None) -> tuple:
+        """
+        Follow the tokens of a command through the (nested) command groups, one group per token, until they reach a
+        command, a name that does not exist or the last token.
+        :param split_command: The tokens of the command.
+        :return: A tuple of the record holding the information of the command or command group the tokens reached (or
+                 None if the name does not exist), the index of the token that holds its name and the path of the
+                 command group that was searched for it (or None for the commands dict).
+        """
+        commands_dict = self._commands_info
+        command_group = None
+
+        for position, tokens in enumerate(split_command):
+            command_info = commands_dict.get(tokens)
+            if command_info is None or command_info.type is not _GROUP or \
+                    position == len(split_command) - 1:
+                return command_info, position, command_group
+
+            command_group = command_info.name
+            commands_dict = self._groups_dict[command_group]
+
+    def _resolve_command(self, split_command: list = None) -> tuple | int:
+        """
+        Find the command that the user input refers to, be it a command name, a command in a command group or an alias.
+        If the command cannot be found, a message is displayed.
+        :param split_command: The user input split into a list.
+        :return: A tuple of the record holding the command's information and the full command list (the command name
+                 followed by its arguments, with any alias expanded), or the exit status if the command was not found.
+        """
+        # Get the name of the command
+        check_name = split_command[0]
+
+        # Follow the command through its command groups, the full command is everything from the command name onwards
+        command_info, position, command_group = self._walk_command_path(split_command=split_command)
+        if command_info is not None and command_info.type is not _GROUP:
+            return command_info, split_command[position:]
+
+        # Only command group names were given, call self._possible_commands method to show the commands in the last
+        # group
+        elif command_info is not None:
+            self._possible_commands(command_name="", command_group=command_info.name)
+            return 127
+
+        # Command does not exist in group, call self._possible_commands method to show possible commands user may have
+        # meant
+        elif command_group is not None:
+            self._possible_commands(command_name=split_command[position], command_group=command_group)
+            return 127
+
+        # If first element is not a command or command group name, check if it is an alias
+        elif check_name in self._alias_dict:
+            # Get the compiled alias from the alias cache, compiling it first if it is not there
+            compiled_alias = self._alias_cache.get(check_name)
+            if compiled_alias is None:
+                compiled_alias = self._compile_alias(command_str=self._alias_dict[check_name])
+                self._alias_cache[check_name] = compiled_alias
+            else:
+                pass
+
+            # The aliased command does not exist, display message
+            if type(compiled_alias) is str:
+                print(f"[!] Cannot execute alias '{check_name}', {compiled_alias}\n")
+                return 127
+
+            # Add any arguments typed after the alias name to the aliased command
+            command_info, alias_prefix = compiled_alias
+            return command_info, alias_prefix + split_command[1:]
+
+        # Nothing matched the first element, call self._possible_commands method to show possible commands the user
+        # may have meant, does not include commands in command groups or aliases
+        else:
+            self._possible_commands(command_name=check_name)
+            return 127
+
+    def _parse_input(self, usr_input: str = None) -> tuple | int:
+        """
+        Split a line of input into tokens and find what it runs, in one pass. Tokens are split the way a shell would,
+        so quotes keep arguments together and backslashes escape characters. The resulting dispatch plan is kept in
+        the parse cache, which holds the most recently used lines and is cleared whenever a command or alias changes,
+        so a line that was typed before skips tokenizing and command lookup entirely.
+        :param usr_input: The line of input, with leading and trailing whitespace already stripped.
+        :return: A tuple of the tokens and either the resolved command (see the _resolve_command method), a `list` of
+                 resolved commands if the line is a pipeline or None if the line is a built-in command, or the exit
+                 status if there is nothing to run.
+        """
+        dispatch_plan = self._parse_cache.get(usr_input)
+        if dispatch_plan is not None:
+            self._parse_cache.move_to_end(usr_input)
+            return dispatch_plan
 
+        # Only lines with a pipe character can be pipelines
+        segments = _split_pipeline(line=usr_input) if "|" in usr_input else [usr_input]
+
+        try:
+            split_segments = [shlex.split(segment) for segment in segments]
+
+        except ValueError as exc:
+            print(f"[!] Could not parse command: {exc}\n")
+            return 2
+
+        split_command = split_segments[0]
+
+        # If nothing was typed, do nothing
+        if len(split_segments) == 1 and len(split_command) == 0:
+            return 0
+
+        # Find every command of a pipeline, the tokens of the commands are kept separated by "|"
+        elif len(split_segments) > 1:
+            resolved = self._resolve_pipeline(split_segments=split_segments)
+            if type(resolved) is int:
+                return resolved
+
+            dispatch_plan = ([tokens for segment in split_segments for tokens in (*segment, "|")][:-1], resolved)
+
+        # Built-in commands (and command group names typed on their own) are executed by the _execute_builtin method
+        elif (self._is_builtin(command_name=split_command[0]) and split_command[0] not in self.break_keywords) or \
+                " ".join(split_command) in self._groups_dict:
+            dispatch_plan = (split_command, None)
+
+        else:
+            # Commands that cannot be found are not cached, the possible commands are shown every time
+            resolved = self._resolve_command(split_command=split_command)
+            if type(resolved) is int:
+                return resolved
+
+            dispatch_plan = (split_command, resolved)
+
+        self._parse_cache[usr_input] = dispatch_plan
+        if len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+            self._parse_cache.popitem(last=False)
+        else:
+            pass
+
+        return dispatch_plan
+
+    def _resolve_pipeline(self, split_segments: list = None) -> list | int:
+        """
+        Find the commands of a pipeline and check that they can be piped. If they cannot, a message is displayed.
+        :param split_segments: The tokens of each command in the pipeline.
+        :return: A `list` of resolved commands (see the _resolve_command method), or the exit status if the pipeline
+                 cannot be run.
+        """
+        pipeline = []
+        for position, split_command in enumerate(split_segments):
+            if len(split_command) == 0:
+                print("[!] Missing command in pipeline\n")
+                return 2
+
+            elif self._is_builtin(command_name=split_command[0]):
+                print(f"[!] Cannot pipe built-in command '{split_command[0]}'\n")
+                return 2
+
+            resolved = self._resolve_command(split_command=split_command)
+            if type(resolved) is int:
+                return resolved
+
+            # Every command after the first receives the output of the command before it as its arguments
+            elif resolved[0].type not in _FUNCTION_TYPES or \
+                    (position > 0 and resolved[0].type is not _ARGS):
+                print(f"[!] Cannot pipe {resolved[0].type}-type command '{resolved[0].name}', only args-type "
+                      "commands can receive piped output\n" if position > 0 else
+                      f"[!] Cannot pipe {resolved[0].type}-type command '{resolved[0].name}', only single- and "
+                      "args-type commands can be piped\n")
+                return 2
+
+            # The items piped into a command with an argument schema go to its argument that takes many values
+            elif position > 0 and resolved[0].schema is not None and resolved[0].schema.stream_argument is None:
+                print(f"[!] Cannot pipe into '{resolved[0].name}', its argument schema has no positional argument that "
+                      "takes many values\n")
+                return 2
+
+            pipeline.append(resolved)
+
+        return pipeline
+
+    def _execute_pipeline(self, pipeline: list = None) -> int:
+        """
+        Execute a pipeline, stopping it once the smallest timeout of its commands expires.
+        :param pipeline: The `list` of resolved commands (see the _resolve_command method).
+        :return: The exit status of the pipeline.
+        """
+        timeouts = [timeouts for timeouts in (self._command_timeout(command_info=command_info)
+                                              for command_info, _ in pipeline) if timeouts is not None]
+        if len(timeouts) == 0:
+            return self._run_pipeline(pipeline=pipeline)
+        else:
+            return _run_with_timeout(function=self._run_pipeline, function_kwargs={"pipeline": pipeline},
+                                     timeout=min(timeouts))
+
+    def _run_pipeline(self, pipeline: list = None) -> int:
+        """
+        Run a pipeline. Every command except for the last runs in its own thread, and whatever it returns (or yields)
+        or prints is passed on to the next command while it is being produced. The last command runs as it would outside
+        a pipeline, so only the lines of an iterator it returns (or yields) are printed.
+        :param pipeline: The `list` of resolved commands (see the _resolve_command method).
+        :return: The exit status of the pipeline.
+        """
+        stages = []
+        stream = None
+
+        try:
+            for position, (command_info, full_command_list) in enumerate(pipeline):
+                # Import the function if it was registered by import path
+                try:
+                    function = self._command_function(command_info=command_info)
+
+                except (ImportError, AttributeError) as exc:
+                    print(f"[!] Could not import '{command_info.import_path}': {exc}\n")
+                    return 1
+
+                function_kwargs = self._function_kwargs(command_info=command_info, full_command_list=full_command_list,
+                                                        stream=stream)
+                if type(function_kwargs) is int:
+                    return function_kwargs
+
+                if position < len(pipeline) - 1:
+                    stream = _PipeStage(function=function, function_kwargs=function_kwargs)
+                    stages.append(stream)
+                    continue
+
+                # Run the last command here, the same way it runs outside a pipeline
+                return self._call_function(function=function, function_kwargs=function_kwargs)
+
+        # Piped items are only checked against the argument schema of the command they are piped into while the command
+        # reads them, report the first one that does not match the same way as arguments that were typed
+        except _StreamArgumentError as exc:
+            command_name = next(command_info.name for command_info, _ in pipeline if command_info.schema is exc.schema)
+            print(f"[!] {exc}")
+            print(f"[*] Usage: {exc.schema.usage(command_name=command_name)}\n")
+            return 2
+
+        finally:
+            # Stop the commands that are still producing output
+            for stages_left in stages:
+                stages_left.close()
+
+        return 0
+
+    @staticmethod
+    def _function_kwargs(command_info: _CommandRecord = None, full_command_list: list = None,
+                         stream: object = None) -> dict | int:
+        """
+        Create the keyword arguments passed to the function of a `single-` or `args-type` command. If the arguments of
+        an args-type command are missing or do not match its argument schema, a message is displayed, and if they ask
+        for the help of its argument schema, the help is displayed.
+        :param command_info: The record holding the command's information.
+        :param full_command_list: The command name followed by its arguments.
+        :param stream: The items piped into an args-type command by the command before it in a pipeline. Can be left as
+                       None if nothing is piped into the command.
+        :return: A `dict` of keyword arguments, or the exit status if the function is not to be called.
+        """
+        # === Single Commands ===
+        if command_info.type is _SINGLE:
+            # Pass on any additional data specified with the command
+            return {"additional_data": command_info.additional}
+
+        # === Args Commands with an argument schema ===
+        elif command_info.schema is not None:
+            command_args = command_info.schema.parse(tokens=full_command_list[1:], stream=stream)
+            if command_args is None:
+                print(command_info.schema.render_help(command_name=command_info.name, command_help=command_info.help))
+                return 0
+
+            elif type(command_args) is str:
+                print(f"[!] {command_args}")
+                print(f"[*] Usage: {command_info.schema.usage(command_name=command_info.name)}\n")
+                return 2
+
+            else:
+                return {"command_args": command_args, "additional_data": command_info.additional}
+
+        # === Args Commands receiving piped output ===
+        elif stream is not None:
+            return {"command_args": PipeInput(command_args=full_command_list[1:], stream=stream),
+                    "additional_data": command_info.additional}
+
+        # === Args Commands ===
+        # Check if there is at least one argument supplied after command name, display message if there is nothing
+        elif len(full_command_list) == 1 or full_command_list[1].isspace() or full_command_list[1] == "":
+            print("[!] Argument required\n")
+            return 2
+
+        else:
+            # Pass on list of everything after command name and any additional data specified with the command
+            return {"command_args": full_command_list[1:], "additional_data": command_info.additional}
+
+    def _execute_command(self, command_info: _CommandRecord = None, full_command_list: list = None) -> int:
+        """
+        Execute a command.
+        :param command_info: The record holding the command's information.
+        :param full_command_list: The command name followed by its arguments.
+        :return: The exit status of the command.
+        """
+        # Replay the output of cached commands, or run them and keep their output
+        if command_info.cache is not None:
+            return self._execute_cached(command_info=command_info, full_command_list=full_command_list)
+
+        else:
+            return self._execute_uncached(command_info=command_info, full_command_list=full_command_list)
+
+    def _execute_cached(self, command_info: _CommandRecord = None, full_command_list: list = None) -> int:
+        """
+        Execute a command that was created with a cache. Calls are keyed on the arguments and the identity of the
+        additional data (or the modification time of the file, for file-type commands). If the same call is in the
+        cache, its output is replayed. Otherwise the command is executed while its output is copied, and the output is
+        kept if the command succeeds.
+        :param command_info: The record holding the command's information.
+        :param full_command_list: The command name followed by its arguments.
+        :return: The exit status of the command.
+        """
+        if command_info.type is _FILE:
+            try:
+                cache_key = (tuple(full_command_list[1:]), os.stat(command_info.file).st_mtime_ns)
+
+            # Let the file runner report a missing file
+            except OSError:
+                return self._execute_uncached(command_info=command_info, full_command_list=full_command_list)
+
+        elif command_info.type is _ARGS:
+            cache_key = (tuple(full_command_list[1:]), id(command_info.additional))
+
+        else:
+            cache_key = ((), id(command_info.additional))
+
+        cached_result = command_info.cache.get(cache_key)
+        if cached_result is not None:
+            sys.stdout.write(cached_result[0])
+            sys.stdout.flush()
+            return cached_result[1]
+
+        with _tee_thread_stdout() as output_copy:
+            status = self._execute_uncached(command_info=command_info, full_command_list=full_command_list)
+
+        if status == 0:
+            command_info.cache.put(key=cache_key, output=output_copy.getvalue(), status=status)
+        else:
+            pass
+
+        return status
+
+    def _execute_uncached(self, command_info: _CommandRecord = None, full_command_list: list = None) -> int:
+        """
+        Execute a command without looking at its cache.
+        :param command_info: The record holding the command's information.
+        :param full_command_list: The command name followed by its arguments.
+        :return: The exit status of the command.
+        """
+        # === Single and Args Commands ===
+        if command_info.type in _FUNCTION_TYPES:
+            function_kwargs = self._function_kwargs(command_info=command_info, full_command_list=full_command_list)
+            if type(function_kwargs) is int:
+                return function_kwargs
+
+            # Import the function if it was registered by import path
+            try:
+                function = self._command_function(command_info=command_info)
+
+            except (ImportError, AttributeError) as exc:
+                print(f"[!] Could not import '{command_info.import_path}': {exc}\n")
+                return 1
+
+            # Call the function on a worker thread if the command has a timeout, so that it can be abandoned
+            timeout = self._command_timeout(command_info=command_info)
+            if timeout is None:
+                return self._call_function(function=function, function_kwargs=function_kwargs)
+            else:
+                return _run_with_timeout(function=self._call_function, timeout=timeout,
+                                         function_kwargs={"function": function, "function_kwargs": function_kwargs})
+
+        # === File Commands ===
+        elif command_info.type is _FILE:
+            # Execute file with (or without) arguments typed after command name
+            return self._run_file(command_info=command_info, file_args=full_command_list[1:],
+                                  timeout=self._command_timeout(command_info=command_info))
+
+        # === Aliased alias commands ===
+        elif full_command_list[0] == "alias":
+            self._alias_command(alias_list=full_command_list)
+
+        return 0
+
+    def _call_function(self, function: object = None, function_kwargs: dict = None) -> int:
+        """
+        Call the function of a `single-` or `args-type` command, running it to completion if it is a coroutine
+        function and streaming the lines of functions that return an iterator (including generator functions).
+        :param function: The function.
+        :param function_kwargs: The keyword arguments passed to the function.
+        :return: The exit status of the command.
+        """
+        result = function(**function_kwargs)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+        else:
+            pass
+
+        if hasattr(result, "__next__"):
+            return self._stream_output(lines=result)
+        else:
+            return 0
+
+    def _execute_input(self, usr_input: str = None) -> int:
+        """
+        Parse a line of input and execute it, be it a built-in command, a command group, a command or an alias. Break
+        keywords are not handled here, it is up to the caller to check for them.
+        :param usr_input: The line of input, with leading and trailing whitespace already stripped.
+        :return: The exit status of the line. 0 if it ran successfully, 1 if it failed, 2 if it was used incorrectly
+                 (ex. an args-type command without arguments) and 127 if the command does not exist. File-type commands
+                 return the exit status of the file.
+        """
+        # Time the command if instrumentation is enabled
+        if self._stats is not None:
+            return self._execute_input_timed(usr_input=usr_input)
+
+        else:
+            pass
+
+        # Split the input and find the command, return early if there is nothing to run
+        dispatch_plan = self._parse_input(usr_input=usr_input)
+        if type(dispatch_plan) is int:
+            return dispatch_plan
+
+        split_command, resolved = dispatch_plan
+        if resolved is None:
+            return self._execute_builtin(split_command=split_command)
+
+        elif type(resolved) is list:
+            return self._execute_pipeline(pipeline=resolved)
+
+        return self._execute_command(*resolved)
+
+    def _execute_input_timed(self, usr_input: str = None) -> int:
+        """
+        Version of the `_execute_input` method that records the latency of each phase of the command.
+        :param usr_input: The line of input, with leading and trailing whitespace already stripped.
+        :return: The exit status of the line.
+        """
+        # Commands that do not exist are recorded together, their time is spent showing possible commands
+        start_time = time.perf_counter()
+        dispatch_plan = self._parse_input(usr_input=usr_input)
+        resolved_time = time.perf_counter()
+        if type(dispatch_plan) is int:
+            if dispatch_plan == 127:
+                self._stats.record(command_name="<not found>", status=dispatch_plan, render=resolved_time - start_time)
+            else:
+                pass
+            return dispatch_plan
+
+        # Built-in commands only print their output, so their time is counted as rendering. Other commands print
+        # while they run, so their output is part of their execute time
+        split_command, resolved = dispatch_plan
+        if resolved is None:
+            status = self._execute_builtin(split_command=split_command)
+            self._stats.record(command_name=split_command[0], status=status, resolve=resolved_time - start_time,
+                               render=time.perf_counter() - resolved_time)
+            return status
+
+        # Pipelines are recorded under the names of their commands, ex. "command1 | command2"
+        elif type(resolved) is list:
+            status = self._execute_pipeline(pipeline=resolved)
+            command_name = " | ".join(command_info.name for command_info, _ in resolved)
+
+        else:
+            status = self._execute_command(*resolved)
+            command_name = resolved[0].name
+
+        self._stats.record(command_name=command_name, status=status, resolve=resolved_time - start_time,
+                           execute=time.perf_counter() - resolved_time)
+        return status
+
+    def _print_banner(self) -> None:
+        """
+        Print the opening banner and, if enabled, the help banner.
+        :return: None
+        """
         # Print custom banner
         if type(self.banner_data) is str:
             print(self.banner_data)
@@ -571,171 +1937,863 @@ class MagnetSting:
             else:
                 pass
 
+    def _setup_readline(self) -> None:
+        """
+        Register the tab completer with readline, keeping the completer and word delimiters that were set before (ex.
+        by the instance this one was started from, or by the application running MagnetSting) so `_shutdown` can give
+        them back.
+        :return: None
+        """
+        self._saved_readline = (readline.get_completer(), readline.get_completer_delims())
+        readline.set_completer(self._complete)
+        readline.set_completer_delims(" ")
+        if readline.__doc__ is not None and "libedit" in readline.__doc__:
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+
+    def magnetsting_mainloop(self) -> None:
+        """
+        This method handles all `MagnetSting` operations. Call this method once all the commands and command
+        groups have been created.
+        :return: None
+        """
+        # Add built-in commands to commands dict
+        self._add_builtin_commands()
+
+        # Print the opening banner and help banner, load aliases from the alias file and set up tab completion
+        self._print_banner()
+        self._load_aliases()
+        self._setup_readline()
+
+        # Import the functions of commands registered by import path in the background
+        if self.prewarm_commands is not False:
+            threading.Thread(target=self._prewarm, daemon=True).start()
+        else:
+            pass
+
         try:
-            # Open json file and load aliases into dict
-            with open(self.alias_file, "r") as jr:
-                json_alias = json.load(jr)
-                self._alias_dict = json_alias
+            while True:
+                # Get user input, strip both leading and trailing whitespace. Ctrl-C discards the line, as in a shell.
+                try:
+                    usr_input = str(input(self.cmd_prompt)).strip()
 
-        except FileNotFoundError:
-            # Do nothing if file does not exist, it will be created when MagnetSting exits
+                except KeyboardInterrupt:
+                    print()
+                    continue
+
+                # Check if first element is a break keyword
+                if usr_input.split(" ")[0] in self.break_keywords:
+                    # Show exit message and break out of loop, exiting MagnetSting
+                    print(self.exit_message)
+                    break
+
+                # Ctrl-C cancels the command that is running rather than MagnetSting
+                try:
+                    self._execute_input(usr_input=usr_input)
+
+                except KeyboardInterrupt:
+                    print("\n[*] Command cancelled\n")
+
+        finally:
+            # Write aliases to json file, give tab completion back and release resources, however the loop was left
+            self._shutdown()
+
+    def _get_job_id(self, jobs_list: list = None) -> int | None:
+        """
+        Get the job ID used with the "fg" and "kill" built-in commands. If the ID is missing or does not belong to a
+        background job, a message is displayed.
+        :param jobs_list: The user input split into a list.
+        :return: The job ID, or None if it is not valid.
+        """
+        if len(jobs_list) < 2 or not jobs_list[1].isdigit() or int(jobs_list[1]) not in self._jobs:
+            print(f"[!] Use '{jobs_list[0]} <job ID>', see 'jobs' for the IDs of the background jobs\n")
+            return None
+
+        else:
+            return int(jobs_list[1])
+
+    def _jobs_command(self, jobs_list: list = None) -> int:
+        """
+        Method to view and cancel background jobs started with a trailing "&" in `magnetsting_mainloop_async`.
+        :param jobs_list: The user input split into a list. Its first element is either "jobs" or "kill".
+        :return: The exit status of the command.
+        """
+        # View all background jobs
+        if jobs_list[0] == "jobs":
+            if len(self._jobs) == 0:
+                print("[*] No background jobs\n")
+                return 0
+
+            print()
+            print(f"  {'Job':5} {'Status':10} Command")
+            print(f"  {'---':5} {'------':10} -------")
+            for job_id, (job_task, job_input) in self._jobs.items():
+                if not job_task.done():
+                    job_status = "running"
+                elif job_task.cancelled():
+                    job_status = "killed"
+                else:
+                    job_status = "done"
+
+                print(f"  {job_id:<5} {job_status:10} {job_input}")
+            print()
+            return 0
+
+        job_id = self._get_job_id(jobs_list=jobs_list)
+        if job_id is None:
+            return 2
+
+        job_task, job_input = self._jobs[job_id]
+
+        # Cancel a job. A coroutine command is stopped right away, while a regular command can only be abandoned as
+        # the thread running it cannot be interrupted
+        if job_task.done():
+            print(f"[!] Job {job_id} has already finished\n")
+            return 1
+
+        else:
+            job_task.cancel()
+            del self._jobs[job_id]
+            print(f"[-] Killed job {job_id} '{job_input}'\n")
+            return 0
+
+    async def _execute_input_async(self, usr_input: str = None) -> int:
+        """
+        Asynchronous version of the `_execute_input` method. Functions that are coroutine functions are awaited on the
+        event loop, while every other command is run on a worker thread so that it does not block the loop.
+        :param usr_input: The line of input, with leading and trailing whitespace already stripped.
+        :return: The exit status of the line.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Split the input and find the command, return early if there is nothing to run
+        start_time = time.perf_counter()
+        dispatch_plan = self._parse_input(usr_input=usr_input)
+        resolved_time = time.perf_counter()
+        if type(dispatch_plan) is int:
+            return dispatch_plan
+
+        split_command, resolved = dispatch_plan
+
+        # Bring a background job to the foreground by waiting for it to finish
+        if split_command[0] == "fg" and self._is_builtin(command_name="fg"):
+            job_id = self._get_job_id(jobs_list=split_command)
+            if job_id is None:
+                return 2
+
+            # Finished jobs are removed from the jobs dict once they have been brought to the foreground
+            job_task, job_input = self._jobs.pop(job_id)
+            print(f"[*] {job_input}")
+            try:
+                return await job_task
+            except asyncio.CancelledError:
+                return 1
+
+        # View or cancel background jobs
+        elif split_command[0] in ("jobs", "kill") and self._is_builtin(command_name=split_command[0]):
+            return self._jobs_command(jobs_list=split_command)
+
+        # Wait for the worker pool of the "parallel" built-in command on a worker thread, cancelling its calls if the
+        # command is cancelled
+        elif split_command[0] == "parallel" and resolved is None:
+            cancelled = threading.Event()
+            try:
+                return await _run_in_thread(loop, self._parallel_command, split_command, cancelled)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        # Execute built-in commands, timing them if instrumentation is enabled
+        elif resolved is None:
+            status = self._execute_builtin(split_command=split_command)
+            if self._stats is not None:
+                self._stats.record(command_name=split_command[0], status=status, resolve=resolved_time - start_time,
+                                   render=time.perf_counter() - resolved_time)
+            else:
+                pass
+            return status
+
+        # Run pipelines on a worker thread, their commands pass items to each other through threads
+        elif type(resolved) is list:
+            status = await _run_in_thread(loop, self._execute_pipeline, resolved)
+            command_name = " | ".join(command_info.name for command_info, _ in resolved)
+
+        else:
+            status = await self._execute_command_async(*resolved)
+            command_name = resolved[0].name
+
+        if self._stats is not None:
+            self._stats.record(command_name=command_name, status=status, resolve=resolved_time - start_time,
+                               execute=time.perf_counter() - resolved_time)
+        else:
             pass
 
-        while True:
-            # Get user input, strip both leading and trailing whitespace
-            usr_input = str(input(self.cmd_prompt)).strip()
+        return status
 
-            # Create list by splitting user input string
-            split_command = usr_input.split(" ")
+    async def _execute_command_async(self, command_info: _CommandRecord = None, full_command_list: list = None) -> int:
+        """
+        Asynchronous version of the `_execute_command` method.
+        :param command_info: The record holding the command's information.
+        :param full_command_list: The command name followed by its arguments.
+        :return: The exit status of the command.
+        """
+        loop = asyncio.get_running_loop()
 
-            # Check if first element is a break keyword
-            if split_command[0] in self.break_keywords:
-                # Write aliases to json file
-                with open(self.alias_file, "w") as jw:
-                    json.dump(self._alias_dict, jw)
+        # Import the function if it was registered by import path, doing so in the executor as it can take a while
+        if command_info.type in _FUNCTION_TYPES and type(command_info.function) is str:
+            try:
+                await loop.run_in_executor(None, self._command_function, command_info)
 
-                # Show exit message and break out of loop, exiting MagnetSting
-                print(self.exit_message)
-                break
+            except (ImportError, AttributeError) as exc:
+                print(f"[!] Could not import '{command_info.import_path}': {exc}\n")
+                return 1
 
-            # Print help banner containing specific commands
-            elif len(split_command) > 1 and split_command[0] == "help":
-                self._specific_commands_help(command_name=split_command[1])
+        else:
+            pass
 
-            # === Begin built-in commands functionality ===
+        # Await coroutine functions on the event loop
+        if command_info.type in _FUNCTION_TYPES and \
+                inspect.iscoroutinefunction(command_info.function) and command_info.cache is None:
+            function_kwargs = self._function_kwargs(command_info=command_info, full_command_list=full_command_list)
+            if type(function_kwargs) is int:
+                return function_kwargs
 
-            # Print help banner
-            elif split_command[0] == "help":
-                self._help_command()
+            # Coroutines can be cancelled, so they are stopped once their timeout expires
+            timeout = self._command_timeout(command_info=command_info)
+            try:
+                result = await asyncio.wait_for(command_info.function(**function_kwargs), timeout)
 
-            # Clear the command line
-            elif split_command[0] == "clear":
-                subprocess.run("clear", shell=True)
+            except asyncio.TimeoutError:
+                _report_timeout(timeout=timeout)
+                return _TIMED_OUT
 
-            # Call self._alias_command method to handle alias operations
-            elif split_command[0] == "alias":
-                self._alias_command(alias_list=split_command)
+            if hasattr(result, "__next__"):
+                return await loop.run_in_executor(None, self._stream_output, result)
+            else:
+                return 0
+
+        # Run every other command on a worker thread, which is abandoned if the command is cancelled
+        else:
+            return await _run_in_thread(loop, self._execute_command, command_info, full_command_list)
+
+    async def _background_job(self, job_id: int = None, usr_input: str = None) -> int:
+        """
+        Run a line of input as a background job, reporting exceptions and the job's completion.
+        :param job_id: The ID of the job.
+        :param usr_input: The line of input, without the trailing "&".
+        :return: The exit status of the line.
+        """
+        try:
+            status = await self._execute_input_async(usr_input=usr_input)
 
-            # === End built-in commands functionality ===
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as exc:
+            print(f"\n[!] Job {job_id} '{usr_input}' raised {type(exc).__name__}: {exc}")
+            return 1
+
+        print(f"\n[+] Job {job_id} '{usr_input}' finished with exit status {status}")
+        return status
+
+    def _cancel_foreground(self) -> None:
+        """
+        Cancel the command running in the foreground of the asynchronous mainloop, if there is one. Called when Ctrl-C
+        is pressed. Commands run on worker threads are abandoned rather than stopped, see `_run_in_thread`.
+        :return: None
+        """
+        if self._foreground is not None:
+            self._foreground.cancel()
+        else:
+            pass
 
-            # Show commands in command group
-            elif len(split_command) == 1 and split_command[0] in self._groups_dict:
-                self._help_command_group(group_name=split_command[0])
+    async def magnetsting_mainloop_async(self) -> None:
+        """
+        Asynchronous version of the `magnetsting_mainloop` method, run it with `asyncio.run()`. On top of regular
+        functions, `single-` and `args-type` commands can be assigned coroutine functions (`async def`), which are
+        awaited on the event loop. Regular functions and file-type commands are run on worker threads. Adding a
+        trailing "&" to a command runs it as a background job, so the prompt is available again right away. Background
+        jobs are managed with the "jobs", "fg <job ID>" and "kill <job ID>" built-in commands. Ctrl-C cancels the
+        command running in the foreground.
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+
+        # Add built-in commands to commands dict, including those to manage background jobs. Commands of the user that
+        # have the same name as one of them are left in place of the built-in command
+        self._add_builtin_commands()
+        for command_name, command_help in (("jobs", "view background jobs"),
+                                           ("fg", "wait for a background job to finish"),
+                                           ("kill", "cancel a background job")):
+            if command_name not in self._commands_info or self._is_builtin(command_name=command_name):
+                self._add_command(command_name=command_name, command_group=None, command_info=_CommandRecord(
+                    command_type=_BUILT_IN,
+                    command_help=command_help,
+                ))
 
             else:
-                # Get the name of the command
-                check_name = split_command[0]
-
-                # Check if command exists as a name, group name or alias
-                if check_name in self._commands_info or check_name in self._alias_dict or check_name in \
-                        self._groups_dict:
-                    # Initialize list to hold full command after determining if it is an alias or an actual command name
-                    full_command_list = None
-
-                    # Initialize dict to hold specific command info
-                    command_dict = {}
-
-                    # Check if command is a command name or a group name
-                    if check_name in self._commands_info and self._commands_info[check_name]["type"] != "group":
-                        # First element is not a group name
-                        full_command_list = split_command
-
-                        # Add command information from self._commands_info to command_dict
-                        command_dict[check_name] = self._commands_info[check_name]
-
-                    elif check_name in self._commands_info and self._commands_info[check_name]["type"] == "group":
-                        try:
-                            # First element is a group name, create list including everything except for the first
-                            # element
-                            full_command_list = split_command[1:]
-
-                            # Add command information from self._commands_info to command_dict
-                            command_dict[split_command[1]] = self._groups_dict[check_name][split_command[1]]
-
-                        # Command does not exist in group, call self._possible_commands method to show possible commands
-                        # user may have meant and continue to start
-                        except KeyError:
-                            self._possible_commands(command_name=split_command[1], command_group=check_name)
-                            continue
-
-                    # If first element is not a command or command group name, check if it is an alias
-                    elif check_name in self._alias_dict:
-                        alias_list = f"{self._alias_dict[check_name]} {' '.join(split_command[1:])}".split()
-
-                        # Check if first element in alias_list actually exists as a command or command group
-                        if alias_list[0] in self._commands_info:
-
-                            # Check if name is a group name
-                            if self._commands_info[alias_list[0]]["type"] == "group":
-
-                                # Check if command exists in group, if it does, add information to dict and full command
-                                # to list
-                                if alias_list[1] in self._groups_dict[alias_list[0]]:
-                                    command_dict[alias_list[1]] = self._groups_dict[alias_list[0]][alias_list[1]]
-                                    full_command_list = alias_list[1:]
-
-                                # Command does not exist in group, display message and continue to start
-                                else:
-                                    print(f"[!] Cannot execute alias '{check_name}', the command '{alias_list[1]}' "
-                                          f"does not exist in the group '{alias_list[0]}'\n")
-                                    continue
-
-                            else:
-                                full_command_list = (f"{self._alias_dict[check_name]} "
-                                                     f"{' '.join(split_command[1:])}").split()
-                                command_dict[alias_list[0]] = self._commands_info[alias_list[0]]
-
-                        # First element of aliased command does not exist as a command or command group, display message
-                        # and continue to start
-                        else:
-                            print(f"[!] Could not execute alias '{check_name}', the command or command group "
-                                  f"'{alias_list[0]}' does not exist\n")
-                            continue
-
-                    # === Single Commands ===
-                    if command_dict[full_command_list[0]]["type"] == "single":
-                        # Call the function assigned to command, passing on any additional data specified with the
-                        # command
-                        command_dict[full_command_list[0]]["function"](additional_data=command_dict
-                                                                       [full_command_list[0]]["additional"])
-
-                    # === Args Commands ===
-                    elif command_dict[full_command_list[0]]["type"] == "args":
-                        # Check if there is at least one argument supplied after command name, display message if
-                        # there is nothing
-                        if len(full_command_list) == 1 or full_command_list[1].isspace() or full_command_list[1] == "":
-                            print("[!] Argument required\n")
+                pass
 
-                        else:
-                            # Create list of everything after command name
-                            get_arg = full_command_list[1:]
+        # Print the opening banner and help banner, load aliases from the alias file and set up tab completion
+        self._print_banner()
+        self._load_aliases()
+        self._setup_readline()
+
+        # Import the functions of commands registered by import path in the background
+        if self.prewarm_commands is not False:
+            threading.Thread(target=self._prewarm, daemon=True).start()
+        else:
+            pass
+
+        # Ctrl-C cancels the command running in the foreground rather than the mainloop, on platforms that support it
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._cancel_foreground)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+        try:
+            while True:
+                # Get user input without blocking the event loop, strip both leading and trailing whitespace
+                usr_input = str(await loop.run_in_executor(None, input, self.cmd_prompt)).strip()
+
+                # Check if first element is a break keyword
+                if usr_input.split(" ")[0] in self.break_keywords:
+                    # Show exit message and break out of loop, exiting MagnetSting
+                    print(self.exit_message)
+                    break
+
+                # Run the command as a background job
+                elif usr_input.endswith("&"):
+                    usr_input = usr_input[:-1].strip()
+                    self._job_counter += 1
+                    self._jobs[self._job_counter] = (
+                        asyncio.ensure_future(self._background_job(job_id=self._job_counter, usr_input=usr_input)),
+                        usr_input,
+                    )
+                    print(f"[+] Started job {self._job_counter} '{usr_input}'\n")
+
+                else:
+                    self._foreground = asyncio.ensure_future(self._execute_input_async(usr_input=usr_input))
+                    try:
+                        await self._foreground
+
+                    except asyncio.CancelledError:
+                        print("\n[*] Command cancelled\n")
+
+                    finally:
+                        self._foreground = None
+
+        finally:
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except NotImplementedError:
+                pass
+
+            # Cancel any jobs that are still running, write aliases to json file and release resources
+            for job_task, _ in self._jobs.values():
+                job_task.cancel()
+            self._jobs.clear()
+            self._shutdown()
+
+    def magnetsting_batch(self, commands: str | object = None, stop_on_error: bool = False) -> list:
+        """
+        Execute commands non-interactively. The commands go through the same parsing as in `magnetsting_mainloop`
+        (aliases, command groups and all command types), but no banner, help banner or prompt is shown. Empty lines
+        and lines starting with "#" are skipped. Reaching a break keyword stops the batch. Aliases are loaded before
+        the first command and written back to the alias file once the batch is done.
+        :param commands: Where the commands are read from. Either the path of a file with one command per line, an open
+                         file object (ex. `sys.stdin`) or any iterable of command strings.
+        :param stop_on_error: Stop executing commands once a command returns a non-zero exit status or raises an
+                              exception. When set to `False`, the remaining commands are still executed.
+        :return: A `list` of (line number, command, exit status) tuples, one for each command that was executed. The
+                 exit statuses are the same as those of the `_execute_input` method, with exceptions raised by command
+                 functions reported as 1.
+        """
+        # Add built-in commands to commands dict and load aliases from the alias file
+        self._add_builtin_commands()
+        self._load_aliases()
+
+        # Open the file if the commands are given as a path, otherwise read them straight from the object
+        if type(commands) is str:
+            commands_file = open(commands, "r")
+            commands = commands_file
+        else:
+            commands_file = None
+
+        statuses = []
+        try:
+            for line_number, line in enumerate(commands, start=1):
+                usr_input = line.strip()
 
-                            # Call function assigned to command, passing on list of arguments and any additional data
-                            # specified with the command
-                            command_dict[full_command_list[0]]["function"](command_args=get_arg,
-                                                                           additional_data=command_dict
-                                                                           [full_command_list[0]]["additional"])
+                # Skip empty lines and comments
+                if usr_input == "" or usr_input.startswith("#"):
+                    continue
 
-                    # === File Commands ===
-                    elif command_dict[full_command_list[0]]["type"] == "file":
-                        # Create string from the list sans the first element
-                        parser_args = " ".join(full_command_list[1:])
+                # Stop executing commands once a break keyword is reached
+                elif usr_input.split(" ")[0] in self.break_keywords:
+                    break
 
-                        # Execute file with (or without) arguments typed after command name
-                        subprocess.run(f"python3 {command_dict[full_command_list[0]]['file']} {parser_args}",
-                                       shell=True)
+                try:
+                    status = self._execute_input(usr_input=usr_input)
 
-                    # === Aliased alias commands ===
-                    elif full_command_list[0] == "alias":
-                        self._alias_command(alias_list=full_command_list)
+                except Exception as exc:
+                    print(f"[!] Line {line_number}: '{usr_input}' raised {type(exc).__name__}: {exc}\n")
+                    status = 1
+
+                statuses.append((line_number, usr_input, status))
+
+                if status != 0 and stop_on_error is True:
+                    break
 
                 else:
-                    # If nothing was typed, do nothing
-                    if usr_input == "" or usr_input.isspace():
-                        pass
+                    pass
+
+        finally:
+            if commands_file is not None:
+                commands_file.close()
+
+            # Write aliases to json file and release resources
+            self._shutdown()
+
+        return statuses
+
+    def magnetsting_run(self, argv: list = None) -> int:
+        """
+        Execute a single command given on the command line (ex. "mytool mycommand foo bar") and return its exit status,
+        without showing a banner or prompt. The arguments go through the same parsing as in `magnetsting_mainloop`
+        (aliases, command groups and all command types), but they are taken as they are, since the shell that started
+        the program has already split (and unquoted) them. Without any arguments, or with "-h" or "--help", the help
+        banner is shown. Aliases are loaded before the command runs and written back to the alias file afterwards.
+        :param argv: The command name followed by its arguments. Defaults to `sys.argv[1:]`.
+        :return: The exit status of the command, see the `magnetsting_batch` method. Pass it to `sys.exit` to exit with
+                 it.
+        """
+        argv = sys.argv[1:] if argv is None else list(argv)
+
+        # Add built-in commands to commands dict and load aliases from the alias file
+        self._add_builtin_commands()
+        self._load_aliases()
+
+        try:
+            if len(argv) == 0 or argv[0] in ("-h", "--help"):
+                self._help_command()
+                return 0
+
+            # Quote the arguments so that they come out of the tokenizer unchanged, which also keeps a "|" argument from
+            # being taken as a pipe
+            return self._execute_input(usr_input=shlex.join(argv))
+
+        finally:
+            # Write aliases to json file and release resources
+            self._shutdown()
+
+    @staticmethod
+    def _function_import_path(command_function: object = None) -> str | None:
+        """
+        Get the import path of a command function, in the form "package.module:function".
+        :param command_function: The function, or its import path if it was registered by import path.
+        :return: The import path, or None if the function cannot be imported by name (ex. a lambda, a function defined
+                 inside another function or a method bound to an instance).
+        """
+        if type(command_function) is str:
+            return command_function
+
+        # Importing a method by name gives the function defined in the class, without the instance it was bound to.
+        # Methods bound to a class (class methods) are bound to it again when they are imported.
+        elif inspect.ismethod(command_function) and not inspect.isclass(command_function.__self__):
+            return None
+
+        else:
+            pass
+
+        module_name = getattr(command_function, "__module__", None)
+        function_name = getattr(command_function, "__qualname__", None)
+        if module_name is None or function_name is None or "<" in function_name:
+            return None
+
+        else:
+            return f"{module_name}:{function_name}"
+
+    def save_registry(self, registry_file: str = None) -> None:
+        """
+        Write a snapshot of the commands and command groups to a JSON file: their names, descriptions, types and the
+        import paths of their functions (or the files of file-type commands). Loading the snapshot with
+        `load_registry` registers every command by import path, so the help banners, command suggestions and a single
+        command (see `magnetsting_run`) can be used without importing every command module. Functions must be
+        importable by name (defined at the top level of a module, or as static or class methods of top-level classes,
+        but not methods bound to an instance) and additional data must be JSON serializable, otherwise a `ValueError`
+        listing the commands that cannot be saved is raised.
+        :param registry_file: The JSON file that the snapshot is written to.
+        :return: None
+        """
+        entries = []
+        errors = []
+
+        def add_entries(commands_dict: dict = None, command_group: str = None) -> None:
+            for command_name, command_info in commands_dict.items():
+                if command_info.type is _BUILT_IN:
+                    continue
+
+                entry = {"type": command_info.type.value, "name": command_name, "group": command_group,
+                         "help": command_info.help}
+
+                if command_info.type in _FUNCTION_TYPES:
+                    entry["function"] = self._function_import_path(command_function=command_info.function)
+                    entry["additional"] = command_info.additional
+                    if entry["function"] is None:
+                        errors.append(f"'{command_info.name}': its function cannot be imported by name")
+                        continue
+
+                    elif command_info.schema is not None and command_info.schema.snapshot() is None:
+                        errors.append(f"'{command_info.name}': its argument schema has types other than str, int, "
+                                      f"float and bool or values that are not JSON serializable")
+                        continue
+
+                    elif command_info.schema is not None:
+                        entry["schema"] = command_info.schema.snapshot()
 
-                    # If something was typed but nothing matched the first element, call self._possible_commands method
-                    # to show possible commands the user may have meant, does not include commands in command groups or
-                    # aliases
                     else:
-                        self._possible_commands(command_name=check_name)
+                        pass
+
+                    try:
+                        json.dumps(entry["additional"])
+                    except (TypeError, ValueError):
+                        errors.append(f"'{command_info.name}': its additional data is not JSON serializable")
+                        continue
+
+                elif command_info.type is _FILE:
+                    entry["file"] = command_info.file
+                    entry["runner"] = command_info.runner
+
+                else:
+                    pass
+
+                if command_info.cache is not None:
+                    entry["cache_size"] = command_info.cache.max_size
+                    entry["cache_ttl"] = command_info.cache.ttl
+                else:
+                    pass
+
+                if command_info.type is not _GROUP and command_info.timeout is not None:
+                    entry["timeout"] = command_info.timeout
+                else:
+                    pass
+
+                entries.append(entry)
+
+                # A group's commands come right after the group, so the group exists before they are registered
+                if command_info.type is _GROUP:
+                    add_entries(commands_dict=self._groups_dict[command_info.name], command_group=command_info.name)
+                else:
+                    pass
+
+        add_entries(commands_dict=self._commands_info)
+
+        if len(errors) > 0:
+            raise ValueError("Cannot save the registry, " + "; ".join(errors))
+
+        with open(registry_file, "w") as jw:
+            json.dump({"commands": entries}, jw)
+
+    def load_registry(self, registry_file: str = None) -> bool:
+        """
+        Register the commands and command groups saved in a snapshot by `save_registry`. Functions are registered by
+        import path, so nothing is imported until a command is called.
+        :param registry_file: The JSON file that holds the snapshot.
+        :return: `True` if the snapshot was loaded, `False` if the file does not exist (ex. so the commands can be
+                 registered as usual and the snapshot saved).
+        """
+        try:
+            self.register_commands(manifest=registry_file)
+
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def _manifest_record(self, entry: dict = None) -> tuple:
+        """
+        Check an entry of a manifest and create the record of its command or command group.
+        :param entry: The entry, a `dict` in the format written by `save_registry`.
+        :return: A tuple of the name of the command, the path of its group (or None) and its record. A `ValueError` is
+                 raised if the entry is not valid.
+        """
+        # Checked for every entry, so the cheap checks come first
+        if type(entry) is not dict and not isinstance(entry, collections.abc.Mapping):
+            raise ValueError("it is not a dict")
+
+        unknown_keys = [] if _ENTRY_KEYS.issuperset(entry) else [keys for keys in entry if keys not in _ENTRY_KEYS]
+        command_name = entry.get("name")
+        command_group = entry.get("group")
+        command_type = entry.get("type")
+        # Entries can leave out the description, TOML has no null value to give instead
+        command_help = "" if entry.get("help") is None else entry["help"]
+
+        if len(unknown_keys) > 0:
+            raise ValueError(f"it has unknown key(s) {', '.join(map(repr, unknown_keys))}")
+
+        elif type(command_name) is not str or command_name.strip() == "":
+            raise ValueError("it has no name")
+
+        elif command_group is not None and (type(command_group) is not str or command_group.strip() == ""):
+            raise ValueError(f"its group '{command_group}' is not a group path")
+
+        elif command_type == "group":
+            command_info = _CommandRecord(command_type=_GROUP, command_help=command_help)
+
+        elif command_type in ("single", "args"):
+            if entry.get("function") is None:
+                raise ValueError("it has no function")
+
+            elif command_type == "single" and entry.get("schema") is not None:
+                raise ValueError("only args-type commands can have an argument schema")
+
+            else:
+                pass
+
+            self._check_timeout(timeout=entry.get("timeout"))
+            command_info = _CommandRecord(
+                command_type=_SINGLE if command_type == "single" else _ARGS,
+                command_help=command_help,
+                function=entry["function"],
+                additional=entry.get("additional"),
+                import_path=self._check_import_path(command_function=entry["function"]),
+                cache=None if entry.get("cache_size") is None else _ResultCache(max_size=entry["cache_size"],
+                                                                                ttl=entry.get("cache_ttl")),
+                timeout=entry.get("timeout"),
+                schema=None if entry.get("schema") is None else _ArgSchema(spec=entry["schema"]),
+            )
+
+        elif command_type == "file":
+            if entry.get("file") is None:
+                raise ValueError("it has no file")
+
+            elif entry.get("runner") is not None:
+                self._check_file_runner(file_runner=entry["runner"])
+
+            else:
+                pass
+
+            self._check_timeout(timeout=entry.get("timeout"))
+            command_info = _CommandRecord(
+                command_type=_FILE,
+                command_help=command_help,
+                file=entry["file"],
+                runner=entry.get("runner"),
+                cache=None if entry.get("cache_size") is None else _ResultCache(max_size=entry["cache_size"],
+                                                                                ttl=entry.get("cache_ttl")),
+                timeout=entry.get("timeout"),
+            )
+
+        else:
+            raise ValueError(f"its type '{command_type}' is not 'single', 'args', 'file' or 'group'")
+
+        return command_name.strip(), None if command_group is None else " ".join(command_group.split()), command_info
+
+    def register_commands(self, manifest: object = None) -> None:
+        """
+        Register many commands and command groups at once. Every entry of the manifest is checked before anything is
+        registered, and if any of them are not valid, a `ValueError` listing all the problems (including names that
+        are defined more than once, names of commands or command groups that already exist and groups that do not
+        exist) is raised and nothing is registered. Otherwise the records of the commands are created first and each
+        prefix trie is then filled in one pass, while the caches and help banners are only updated once rather than
+        once per command, which keeps start-up fast when there are thousands of commands.
+        :param manifest: The path of a JSON or TOML file (read as TOML if it ends in ".toml", which needs Python 3.11 or
+                         later), a `dict` with a "commands" list of entries or an iterable of entries. Each entry is a
+                         `dict` in the format written by `save_registry`, with a "type" ("single", "args", "file" or
+                         "group"), a "name" and optionally a "group" (the path of the group the command belongs to),
+                         "help", "function" (the function or its import path), "additional", "file", "runner",
+                         "cache_size", "cache_ttl", "timeout" and "schema". The keys match the parameters of the
+                         `add_command_type_*` and `add_command_group` methods. Groups can come before or after their
+                         commands.
+        :return: None
+        """
+        with _paused_gc():
+            self._register_entries(entries=_manifest_entries(manifest=manifest))
+
+    def _register_entries(self, entries: list = None) -> None:
+        """
+        Check and register the entries of a manifest, see `register_commands`.
+        :param entries: The `list` of entries.
+        :return: None
+        """
+        records = []
+        errors = []
+        defined = set()
+
+        for index, entry in enumerate(entries):
+            try:
+                command_name, command_group, command_info = self._manifest_record(entry=entry)
+
+            except ValueError as exc:
+                name = entry.get("name") if isinstance(entry, collections.abc.Mapping) else None
+                errors.append(f"{f'entry {index}' if type(name) is not str else repr(name.strip())}: {exc}")
+                continue
+
+            full_name = command_name if command_group is None else f"{command_group} {command_name}"
+            if full_name in defined:
+                errors.append(f"'{full_name}': it is defined more than once")
+            else:
+                defined.add(full_name)
+                records.append((command_name, command_group, command_info))
+
+        # The groups that exist once the manifest is registered
+        new_paths = {
+            command_name if command_group is None else f"{command_group} {command_name}"
+            for command_name, command_group, command_info in records if command_info.type is _GROUP
+        }
+
+        for command_name, command_group, command_info in records:
+            if command_group is None and command_name in self._commands_info:
+                errors.append(f"'{command_name}': a command or command group with this name already exists")
+
+            elif command_group is None or command_group in new_paths:
+                pass
+
+            elif command_group not in self._groups_dict:
+                errors.append(f"'{command_group} {command_name}': group '{command_group}' does not exist")
+
+            elif command_name in self._groups_dict[command_group]:
+                errors.append(f"'{command_group} {command_name}': a command or command group with this name already "
+                              f"exists")
+
+            else:
+                pass
+
+        if len(errors) > 0:
+            raise ValueError("Cannot register the commands, " + "; ".join(errors))
+
+        # Create the groups first, parents before their nested groups, so every command has a group to go to
+        for group_paths in sorted(new_paths, key=lambda paths: paths.count(" ")):
+            self._reset_group(group_path=group_paths)
+
+        # Sort the records by the group they go to, keeping their order within each group
+        scope_records = collections.defaultdict(dict)
+        for command_name, command_group, command_info in records:
+            command_info.name = command_name if command_group is None else f"{command_group} {command_name}"
+            scope_records[command_group][command_name] = command_info
+
+        for command_group, scope_infos in scope_records.items():
+            if command_group is None:
+                commands_dict, command_trie = self._commands_info, self._commands_trie
+            else:
+                commands_dict, command_trie = self._group_layer(group_path=command_group)
+
+            command_trie.update(scope_infos)
+            commands_dict.update(scope_infos)
+
+        # Everything derived from the commands is updated once, the help banner widths are calculated again when needed
+        for help_scope in scope_records:
+            self._help_widths.pop(help_scope, None)
+            self._help_cache.pop((help_scope, True), None)
+            self._help_cache.pop((help_scope, False), None)
+
+        self._alias_cache.clear()
+        self._parse_cache.clear()
+        self._invalidate_children()
+
+    def create_child(self, exit_description: str = None, banner: tuple | str = None, cmd_prompt: str = None,
+                     exit_message: str = None, break_keywords: tuple = None, verbose: bool = None,
+                     help_on_start: bool = None) -> "MagnetSting":
+        """
+        Create a child instance, ex. for a sub-shell that is started from one of this instance's commands by calling the
+        child's `magnetsting_mainloop`. The child has all the commands, command groups and aliases of this instance, and
+        commands and command groups can be added to it (or replaced) as with any other instance, without changing this
+        instance. Nothing is copied when the child is created: the child is layered over this instance's commands,
+        command groups and aliases, so it is created in constant time however many commands there are, and commands
+        added to this instance later on show up in the child as well. Aliases added or removed in the child only apply
+        to the child and are not written to the alias file. Exiting the child returns to this instance.
+        :param exit_description: The description of the exit command. Can be left as None to use this instance's.
+        :param banner: The banner of the child, see `MagnetSting`. Can be left as None to use this instance's.
+        :param cmd_prompt: The `prompt` of the input. Can be left as None to use this instance's.
+        :param exit_message: The `message` printed out upon exiting the child. Can be left as None to use this
+                             instance's.
+        :param break_keywords: A `tuple` of keywords used to exit the child. Can be left as None to use this instance's.
+        :param verbose: Show command types in the help banner or not. Can be left as None to use this instance's.
+        :param help_on_start: Show the help banner on start or not. Can be left as None to use this instance's.
+        :return: The child instance.
+        """
+        child = copy.copy(self)
+        child._parent = self
+        child._children = weakref.WeakSet()
+        child._commands_info = _Overlay(parent=self._commands_info)
+        child._groups_dict = _Overlay(parent=self._groups_dict)
+        child._alias_dict = _Overlay(parent=self._alias_dict)
+        child._commands_trie = _PrefixTrie(parent=self._commands_trie)
+        child._group_tries = _Overlay(parent=self._group_tries)
+        child._alias_trie = _PrefixTrie(parent=self._alias_trie)
+        child._alias_cache = {}
+        child._alias_store = _SessionAliasStore()
+        child._parse_cache = collections.OrderedDict()
+        child._help_cache = {}
+        child._help_widths = {}
+        child._completion_matches = []
+        child._jobs = {}
+        child._job_counter = 0
+        child._saved_readline = None
+
+        child.exit_description = self.exit_description if exit_description is None else exit_description
+        child.banner_data = self.banner_data if banner is None else banner
+        child.cmd_prompt = self.cmd_prompt if cmd_prompt is None else cmd_prompt
+        child.exit_message = self.exit_message if exit_message is None else exit_message
+        child.break_keywords = self.break_keywords if break_keywords is None else break_keywords
+        child.verbose = self.verbose if verbose is None else verbose
+        child.help_on_start = self.help_on_start if help_on_start is None else help_on_start
+
+        self._children.add(child)
+        return child
+
+    def _session(self) -> "MagnetSting":
+        """
+        Create a session for a client of the daemon. A session is a shallow copy of the instance, so it shares the
+        commands, command groups and help banners with the daemon, but it has its own aliases (starting with the
+        daemon's aliases) and parse cache. Alias changes made in a session are not written to the alias file.
+        :return: The session.
+        """
+        session = copy.copy(self)
+        session._alias_dict = dict(self._alias_dict)
+        session._alias_trie = _PrefixTrie(session._alias_dict)
+        session._alias_cache = dict(self._alias_cache)
+        session._alias_store = _SessionAliasStore()
+        session._parse_cache = collections.OrderedDict()
+        session._completion_matches = []
+        session._jobs = {}
+        session._job_counter = 0
+
+        return session
+
+    def magnetsting_serve(self, socket_path: str = None) -> None:
+        """
+        Run `MagnetSting` as a daemon that executes command lines sent by clients over a Unix domain socket, so that
+        running a command costs a round trip over the socket rather than starting an interpreter and registering every
+        command. Clients are served at the same time, each in its own session with its own aliases (see the
+        `magnetsting.client` module). The output of each command is sent back to the client while it is produced.
+        Call this method, instead of `magnetsting_mainloop`, once all the commands and command groups have been created.
+        The daemon runs until it is interrupted with Ctrl-C or receives SIGTERM.
+        :param socket_path: The path of the socket. The socket is only accessible to the user running the daemon.
+        :return: None
+        """
+        # Add built-in commands to commands dict and load aliases from the alias file
+        self._add_builtin_commands()
+        self._load_aliases()
+
+        server = _DaemonServer(socket_path=socket_path, magnetsting=self)
+        print(f"[*] Listening on '{socket_path}'")
+
+        # Stop the same way on SIGTERM (ex. from a service manager) as on Ctrl-C
+        saved_handler = signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            signal.signal(signal.SIGTERM, saved_handler)
+            server.server_close()
+
+            # Write aliases to json file and release resources
+            self._shutdown()
+            print(self.exit_message)